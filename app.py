@@ -5,10 +5,11 @@ import csv
 import io
 import time
 from urllib.parse import urlparse
-import pandas as pd
 from backend.ai_interpreter import pattern_based_interpreter
 from backend.crawler import crawl_website
 from backend.ai_enhancer import ai_enhancer
+from backend.fetcher import fetch
+from backend.export import export_bytes
 
 # Configure Streamlit page
 st.set_page_config(
@@ -44,8 +45,9 @@ def validate_url(url: str) -> bool:
         return False
 
 def convert_to_format(data, format_type):
-    """Convert data to selected format"""
-    # ... (keep existing implementation) ...
+    """Convert data to selected format; returns (content, mime type, file extension)"""
+    body, mime_type, file_ext = export_bytes(data, format_type)
+    return body.decode("utf-8"), mime_type, file_ext
 
 def main():
     st.markdown('<div class="header"><h1>🌐 WebToAPI Converter Pro</h1><p>Extract data from single pages or entire websites</p></div>', 
@@ -70,11 +72,19 @@ def main():
     with st.expander("⚙️ Advanced Options"):
         col1, col2 = st.columns(2)
         with col1:
-            output_format = st.selectbox("Output Format", ["JSON", "CSV"])
+            output_format = st.selectbox("Output Format", ["JSON", "CSV", "NDJSON"])
+            extraction_mode = st.selectbox(
+                "Extraction Mode", ["precise", "balanced", "fast"],
+                help="fast skips trafilatura, which suits large crawls"
+            )
         with col2:
             if extraction_type == "Whole Website":
                 max_pages = st.slider("Max Pages to Crawl", 5, 100, 20)
                 max_depth = st.slider("Max Depth", 1, 5, 2)
+                crawl_strategy = st.selectbox(
+                    "Crawl Strategy", ["best_first", "bfs"],
+                    help="best_first follows the links most relevant to your query first"
+                )
     
     # Action button
     if st.button("✨ Extract Data", use_container_width=True, type="primary"):
@@ -91,25 +101,26 @@ def main():
                         
                         # Perform extraction
                         if extraction_type == "Single Page":
-                            # Single page extraction (existing logic)
+                            # Single page extraction over the shared connection pool
                             headers = {
                                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-                                "Accept-Language": "en-US,en;q=0.9",
                             }
                             
-                            response = requests.get(url, headers=headers, timeout=30)
-                            response.raise_for_status()
+                            response = fetch(url, headers=headers, timeout=30)
                             
                             # Extract data
                             from backend.scraper import extract_data
-                            results = extract_data(url, extraction_plan)
+                            results = extract_data(url, extraction_plan, response=response,
+                                                   extraction_mode=extraction_mode)
                             
                         else:
                             # Whole website crawling
                             results = crawl_website(
                                 url, query, 
                                 max_pages=max_pages, 
-                                max_depth=max_depth
+                                max_depth=max_depth,
+                                strategy=crawl_strategy,
+                                extraction_mode=extraction_mode
                             )
                         
                         # Store results
@@ -172,8 +183,7 @@ def main():
                     })
                 
                 if df_data:
-                    df = pd.DataFrame(df_data)
-                    st.dataframe(df)
+                    st.dataframe(df_data)
                 
                 # Show detailed data for the first few pages
                 with st.expander("View Detailed Data for First 3 Pages"):
@@ -191,7 +201,7 @@ def main():
             )
             
             if st.session_state.output_format == "JSON":
-                st.json(st.session_state.extracted_data)
+                st.json(formatted_data)
             else:
                 st.text(formatted_data)
             
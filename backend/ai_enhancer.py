@@ -1,31 +1,66 @@
 import logging
 import requests
 import os
-from transformers import pipeline
+import threading
 from typing import Dict, Any
 import json
+from .metrics import stage
+from .nlp_summarizer import summarize_data
 
 logger = logging.getLogger("webtapi.ai_enhancer")
 
+SUMMARIZER_MODEL = "sshleifer/distilbart-cnn-12-6"
+QA_MODEL = "distilbert-base-cased-distilled-squad"
+SUMMARY_KWARGS = {"max_length": 150, "min_length": 30, "do_sample": False}
+
+# "torch" runs the float32 PyTorch pipelines, "onnx" int8-quantized ONNX Runtime sessions
+AI_BACKEND = os.getenv("WEBTAPI_AI_BACKEND", "torch")
+# With models disabled, summaries come from the extractive summarizer and no torch is loaded
+MODELS_DISABLED = os.getenv("WEBTAPI_DISABLE_MODELS", "0") == "1"
+# Extractive scoring: "centroid", or "textrank" (needs scipy)
+SUMMARY_METHOD = os.getenv("WEBTAPI_SUMMARY_METHOD", "centroid")
+# Inference threads per worker; defaults to the cores divided among uvicorn workers
+AI_THREADS = int(os.getenv("WEBTAPI_AI_THREADS", "0")) or max(
+    1, (os.cpu_count() or 1) // int(os.getenv("WEB_CONCURRENCY", "1"))
+)
+
+def load_torch_pipelines(threads=AI_THREADS):
+    """Return (summarizer, question_answerer) PyTorch pipelines"""
+    import torch
+    from transformers import pipeline
+    torch.set_num_threads(threads)
+    # Use smaller models that can run on CPU
+    summarizer = pipeline("summarization", model=SUMMARIZER_MODEL, tokenizer=SUMMARIZER_MODEL)
+    question_answerer = pipeline("question-answering", model=QA_MODEL)
+    return summarizer, question_answerer
+
 class AIEnhancer:
     def __init__(self):
         self.summarizer = None
         self.question_answerer = None
-        self.init_models()
+        self.models_loaded = False
+        self._lock = threading.Lock()
     
     def init_models(self):
-        """Initialize AI models"""
+        """Initialize AI models; called on first use (or by backend.warmup), not at import"""
+        if self.models_loaded or MODELS_DISABLED:
+            return
+        with self._lock:
+            if not self.models_loaded:
+                self._load_models()
+                self.models_loaded = True
+    
+    def _load_models(self):
+        if AI_BACKEND == "onnx":
+            try:
+                from .onnx_models import load_onnx_pipelines
+                self.summarizer, self.question_answerer = load_onnx_pipelines(AI_THREADS)
+                logger.info(f"ONNX int8 models initialized with {AI_THREADS} threads")
+                return
+            except Exception as e:
+                logger.warning(f"ONNX backend unavailable, falling back to PyTorch: {str(e)}")
         try:
-            # Use smaller models that can run on CPU
-            self.summarizer = pipeline(
-                "summarization", 
-                model="sshleifer/distilbart-cnn-12-6",
-                tokenizer="sshleifer/distilbart-cnn-12-6"
-            )
-            self.question_answerer = pipeline(
-                "question-answering",
-                model="distilbert-base-cased-distilled-squad"
-            )
+            self.summarizer, self.question_answerer = load_torch_pipelines(AI_THREADS)
             logger.info("AI models initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize AI models: {str(e)}")
@@ -35,22 +70,23 @@ class AIEnhancer:
     def generate_natural_summary(self, data: Dict[str, Any], query: str) -> str:
         """Generate natural language summary from extracted data"""
         try:
+            if MODELS_DISABLED or not isinstance(data, dict):
+                # Crawls go to the extractive summarizer too: it ranks sentences across all pages
+                return self._generate_extractive_summary(data, query)
+
             # Convert data to text for summarization
             text_content = self._extract_text_content(data)
+            self.init_models()
             
             if self.summarizer and text_content:
                 # Generate summary
-                summary = self.summarizer(
-                    text_content,
-                    max_length=150,
-                    min_length=30,
-                    do_sample=False
-                )[0]['summary_text']
+                with stage("summarize"):
+                    summary = self.summarizer(text_content, **SUMMARY_KWARGS)[0]['summary_text']
                 
                 return f"Based on your query '{query}', here's what I found:\n\n{summary}"
             
             # Fallback if AI is not available
-            return self._generate_fallback_summary(data, query)
+            return self._generate_extractive_summary(data, query)
             
         except Exception as e:
             logger.error(f"Natural language generation failed: {str(e)}")
@@ -59,6 +95,7 @@ class AIEnhancer:
     def answer_question(self, data: Dict[str, Any], question: str) -> str:
         """Answer specific questions about the extracted data"""
         try:
+            self.init_models()
             if not self.question_answerer:
                 return "AI question answering is not available at the moment."
             
@@ -67,7 +104,8 @@ class AIEnhancer:
             if not context:
                 return "I couldn't find enough information to answer your question."
             
-            result = self.question_answerer(question=question, context=context)
+            with stage("question_answering"):
+                result = self.question_answerer(question=question, context=context)
             return result['answer']
             
         except Exception as e:
@@ -78,7 +116,8 @@ class AIEnhancer:
         """Extract text content from structured data"""
         text_parts = []
         
-        if "content" in data:
+        # Crawl results (lists or CompactCrawl) have no top-level content
+        if isinstance(data, dict) and "content" in data:
             content = data["content"]
             
             # Extract article text
@@ -100,8 +139,19 @@ class AIEnhancer:
         
         return " ".join(text_parts)
     
+    def _generate_extractive_summary(self, data, query: str) -> str:
+        """Summarize with the model-free extractive summarizer"""
+        with stage("summarize_extractive"):
+            summary = summarize_data(data, query, method=SUMMARY_METHOD)
+        if not summary:
+            return self._generate_fallback_summary(data, query)
+        return f"Based on your query '{query}', here's what I found:\n\n{summary}"
+    
     def _generate_fallback_summary(self, data: Dict[str, Any], query: str) -> str:
         """Generate a fallback summary without AI"""
+        if not isinstance(data, dict):
+            return (f"Based on your query '{query}', I found {len(data)} pages.\n"
+                    "\nThe structured data is available in JSON format for technical use.")
         content = data.get("content", {})
         summary_parts = [f"Based on your query '{query}', I found:"]
         
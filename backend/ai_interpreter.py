@@ -13,6 +13,7 @@ def pattern_based_interpreter(query: str) -> dict:
     # Price and product detection
     if any(word in query_lower for word in ['price', 'cost', '$', 'buy', 'purchase', 'product']):
         return {
+            "intent": "product",
             "elements": ["text"],
             "filters": {
                 "include_selectors": [".price", ".cost", "[class*='price']", "[class*='cost']", 
@@ -26,6 +27,7 @@ def pattern_based_interpreter(query: str) -> dict:
     # Image detection
     elif any(word in query_lower for word in ['image', 'picture', 'photo', 'img', 'gallery']):
         return {
+            "intent": "images",
             "elements": ["images"],
             "filters": {
                 "include_selectors": ["img", "[class*='image']", "[class*='photo']", "[class*='gallery']"],
@@ -37,6 +39,7 @@ def pattern_based_interpreter(query: str) -> dict:
     # Table detection
     elif any(word in query_lower for word in ['table', 'chart', 'data', 'statistics', 'figure']):
         return {
+            "intent": "tables",
             "elements": ["tables"],
             "filters": {
                 "include_selectors": ["table", "[class*='table']", "[class*='data']", "[class*='chart']"]
@@ -47,6 +50,7 @@ def pattern_based_interpreter(query: str) -> dict:
     # Contact information
     elif any(word in query_lower for word in ['contact', 'email', 'phone', 'address', 'tel']):
         return {
+            "intent": "contact",
             "elements": ["text", "links"],
             "filters": {
                 "include_selectors": ["[href*='mailto:']", "[href*='tel:']", "[class*='contact']", 
@@ -63,6 +67,7 @@ def pattern_based_interpreter(query: str) -> dict:
     # News/articles
     elif any(word in query_lower for word in ['news', 'article', 'blog', 'post', 'headline']):
         return {
+            "intent": "news",
             "elements": ["text", "links"],
             "filters": {
                 "include_selectors": [".article", ".post", ".blog", ".news", "h1", "h2", "h3", "p",
@@ -75,6 +80,7 @@ def pattern_based_interpreter(query: str) -> dict:
     # Social media elements
     elif any(word in query_lower for word in ['comment', 'like', 'share', 'follower', 'social']):
         return {
+            "intent": "social",
             "elements": ["text"],
             "filters": {
                 "include_selectors": [".comment", ".like", ".share", ".follower", ".social",
@@ -87,6 +93,7 @@ def pattern_based_interpreter(query: str) -> dict:
     # Default extraction - more focused
     else:
         return {
+            "intent": "general",
             "elements": ["text"],
             "filters": {
                 "include_selectors": ["h1", "h2", "h3", "p", "ul", "ol"],
@@ -102,6 +109,6 @@ def parse_query(query: str) -> dict:
     Using enhanced pattern matching instead of AI model
     """
     logger.info(f"Parsing query: {query}")
-    result = enhanced_pattern_interpreter(query)
+    result = pattern_based_interpreter(query)
     logger.info(f"Extraction plan: {result}")
     return result
\ No newline at end of file
@@ -0,0 +1,206 @@
+"""
+Record and replay raw HTTP responses as WARC files.
+
+Every response is written as its own gzip member (the usual .warc.gz layout),
+so records can be read back by offset without decompressing the whole file.
+Set WEBTAPI_FETCH_MODE=record or replay and WEBTAPI_ARCHIVE=path.warc.gz to
+make the shared fetch client archive live responses or serve them back.
+
+    python -m backend.archive reextract pages.warc.gz --query "news" > results.ndjson
+"""
+import argparse
+import gzip
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import uuid
+import zlib
+from datetime import datetime, timezone
+from http.client import responses as HTTP_REASONS
+import requests
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger("webtapi.archive")
+
+# Headers that describe the wire encoding; the archived body is already decoded
+WIRE_HEADERS = {"content-encoding", "transfer-encoding", "content-length"}
+FINAL_URI_FIELD = "WebTapi-Final-URI"
+
+
+def _http_block(response):
+    reason = response.reason or HTTP_REASONS.get(response.status_code, "")
+    lines = [f"HTTP/1.1 {response.status_code} {reason}"]
+    for name, value in response.headers.items():
+        if name.lower() not in WIRE_HEADERS:
+            lines.append(f"{name}: {value}")
+    lines.append(f"Content-Length: {len(response.content)}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1", "replace") + response.content
+
+
+class WarcWriter:
+    """Append response records to a .warc.gz file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write_response(self, url, response):
+        """Write one response record; returns its byte offset in the file"""
+        block = _http_block(response)
+        fields = [
+            "WARC/1.0",
+            "WARC-Type: response",
+            f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>",
+            f"WARC-Date: {datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}",
+            f"WARC-Target-URI: {url}",
+            "Content-Type: application/http;msgtype=response",
+            f"Content-Length: {len(block)}",
+        ]
+        if response.url and response.url != url:
+            fields.append(f"{FINAL_URI_FIELD}: {response.url}")
+        record = ("\r\n".join(fields) + "\r\n\r\n").encode("utf-8") + block + b"\r\n\r\n"
+
+        with self._lock, open(self.path, "ab") as f:
+            offset = f.tell()
+            f.write(gzip.compress(record))
+        return offset
+
+
+def _parse_record(data):
+    """Split a decompressed WARC record into (fields, block)"""
+    head, _, rest = data.partition(b"\r\n\r\n")
+    fields = {}
+    for line in head.decode("utf-8", "replace").split("\r\n")[1:]:
+        name, _, value = line.partition(":")
+        fields[name.strip()] = value.strip()
+    length = int(fields.get("Content-Length", len(rest)))
+    return fields, rest[:length]
+
+
+def _read_member(f):
+    """Decompress one gzip member from the current position; returns (data, compressed size)"""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    chunks = []
+    consumed = 0
+    while not decompressor.eof:
+        chunk = f.read(65536)
+        if not chunk:
+            break
+        chunks.append(decompressor.decompress(chunk))
+        consumed += len(chunk) - len(decompressor.unused_data)
+    if decompressor.unused_data:
+        f.seek(-len(decompressor.unused_data), io.SEEK_CUR)
+    return b"".join(chunks), consumed
+
+
+def build_response(url, block, final_url=None):
+    """Turn an archived HTTP block back into a requests.Response"""
+    head, _, body = block.partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status_parts = lines[0].split(" ", 2)
+    response = requests.Response()
+    response.status_code = int(status_parts[1])
+    response.reason = status_parts[2] if len(status_parts) > 2 else ""
+    response.headers = CaseInsensitiveDict()
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        response.headers[name.strip()] = value.strip()
+    response._content = body
+    response.url = final_url or url
+    return response
+
+
+class WarcArchive:
+    """Offset index over a .warc.gz file for replaying responses by URL"""
+
+    def __init__(self, path):
+        self.path = path
+        self.index = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            self._build_index()
+
+    def _build_index(self):
+        with open(self.path, "rb") as f:
+            offset = 0
+            while True:
+                data, size = _read_member(f)
+                if not size:
+                    break
+                fields, _ = _parse_record(data)
+                if fields.get("WARC-Type") == "response" and "WARC-Target-URI" in fields:
+                    self.index[fields["WARC-Target-URI"]] = offset
+                offset += size
+        logger.info(f"Indexed {len(self.index)} archived responses in {self.path}")
+
+    def add(self, url, offset):
+        with self._lock:
+            self.index[url] = offset
+
+    def urls(self):
+        return list(self.index)
+
+    def get(self, url):
+        """Return the archived requests.Response for a URL, or None"""
+        offset = self.index.get(url)
+        if offset is None:
+            return None
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data, _ = _read_member(f)
+        fields, block = _parse_record(data)
+        return build_response(url, block, fields.get(FINAL_URI_FIELD))
+
+
+class ArchiveRecorder:
+    """Write-through recorder used by the fetch client in record mode"""
+
+    def __init__(self, path):
+        self.writer = WarcWriter(path)
+        self.archive = WarcArchive(path)
+
+    def record(self, url, response):
+        self.archive.add(url, self.writer.write_response(url, response))
+
+
+def replay_extract(archive_path, query, extraction_mode="precise"):
+    """
+    Re-run extract_data over every archived page without network access.
+    Yields {"url", "data"} or {"url", "error"} per page.
+    """
+    from .ai_interpreter import parse_query
+    from .scraper import extract_data
+
+    archive = WarcArchive(archive_path)
+    plan = parse_query(query)
+    for url in archive.urls():
+        try:
+            data = extract_data(url, plan, response=archive.get(url), extraction_mode=extraction_mode)
+            yield {"url": url, "data": data}
+        except Exception as e:
+            yield {"url": url, "error": str(e)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-extract archived pages without refetching")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    reextract = subparsers.add_parser("reextract")
+    reextract.add_argument("archive")
+    reextract.add_argument("--query", required=True)
+    reextract.add_argument("--extraction-mode", default="precise")
+    subparsers.add_parser("list").add_argument("archive")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for url in WarcArchive(args.archive).urls():
+            print(url)
+        return
+    for result in replay_extract(args.archive, args.query, args.extraction_mode):
+        sys.stdout.write(json.dumps(result, default=str) + "\n")
+
+
+if __name__ == "__main__":
+    main()
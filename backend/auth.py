@@ -1,17 +1,23 @@
 """
 API Key authentication and management
 """
+import hashlib
 import os
 import secrets
-from datetime import datetime, timedelta
-from cachetools import TTLCache
+from datetime import datetime
 import logging
+from .ratelimit import limiter
 
 logger = logging.getLogger("webtapi.auth")
 
-# In-memory storage (replace with database in production)
-api_keys = TTLCache(maxsize=1000, ttl=86400)  # 24-hour TTL
-key_usage = TTLCache(maxsize=1000, ttl=86400)  # 24-hour TTL
+# In-memory key registry (replace with database in production); usage lives in the rate limiter
+api_keys = {}
+
+# Require X-API-Key on every API request; when off, requests without a key are limited per client IP
+REQUIRE_API_KEY = os.getenv("WEBTAPI_REQUIRE_API_KEY", "0") == "1"
+
+# Paths that never need a key
+PUBLIC_PATHS = {"/health", "/metrics", "/docs", "/openapi.json", "/docs/oauth2-redirect"}
 
 # Default rate limits
 DEFAULT_RATE_LIMITS = {
@@ -21,6 +27,10 @@ DEFAULT_RATE_LIMITS = {
     "enterprise": 100000
 }
 
+# Optional daily limit for requests without an API key, per client IP; unset means keyless
+# clients are not limited (clients behind one NAT or proxy would share a single bucket)
+ANONYMOUS_RATE_LIMIT = int(os.getenv("WEBTAPI_ANONYMOUS_RATE_LIMIT", "0")) or None
+
 # Persistent demo key that doesn't change between restarts
 DEMO_API_KEY = "demo_key_12345"
 
@@ -31,7 +41,6 @@ def initialize_auth():
         "created_at": datetime.now(),
         "rate_limit": DEFAULT_RATE_LIMITS["free"]
     }
-    key_usage[DEMO_API_KEY] = 0
     logger.info(f"Demo API key initialized: {DEMO_API_KEY}")
 
 def generate_api_key(plan="free"):
@@ -42,35 +51,56 @@ def generate_api_key(plan="free"):
         "created_at": datetime.now(),
         "rate_limit": DEFAULT_RATE_LIMITS.get(plan, 100)
     }
-    key_usage[key] = 0
     return key
 
+def check_api_key(api_key, cost=1):
+    """
+    Check an API key and consume cost requests from its daily budget.
+    Returns (status_code, message, decision); decision is None for unknown keys.
+    """
+    key_info = api_keys.get(api_key)
+    if key_info is None:
+        return 401, "Invalid API key", None
+    decision = limiter.check(api_key, key_info["rate_limit"], cost)
+    if not decision.allowed:
+        return 429, "Rate limit exceeded", decision
+    return 200, "OK", decision
+
+def check_anonymous(client_ip, cost=1):
+    """
+    Rate-limit a request without an API key by client IP; returns (status_code, message, decision).
+    decision is None when ANONYMOUS_RATE_LIMIT is not set.
+    """
+    if ANONYMOUS_RATE_LIMIT is None:
+        return 200, "OK", None
+    decision = limiter.check(f"ip:{client_ip}", ANONYMOUS_RATE_LIMIT, cost)
+    if not decision.allowed:
+        return 429, "Rate limit exceeded", decision
+    return 200, "OK", decision
+
+def key_owner(api_key):
+    """Stable id for the owner of an API key, stored with its endpoints instead of the key itself"""
+    if api_key is None:
+        return None
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
 def validate_api_key(api_key):
     """Validate an API key and check rate limits"""
-    if api_key not in api_keys:
-        return False, "Invalid API key"
-    
-    # Check rate limits
-    usage = key_usage.get(api_key, 0)
-    limit = api_keys[api_key]["rate_limit"]
-    
-    if usage >= limit:
-        return False, "Rate limit exceeded"
-    
-    # Increment usage
-    key_usage[api_key] = usage + 1
-    return True, "OK"
+    status, message, _ = check_api_key(api_key)
+    return status == 200, message
 
 def get_usage_stats(api_key):
-    """Get usage statistics for an API key"""
+    """Get usage statistics for an API key over the rolling 24-hour window"""
     if api_key not in api_keys:
         return None
     
+    limit = api_keys[api_key]["rate_limit"]
+    remaining = int(limiter.check(api_key, limit, cost=0).remaining)
     return {
-        "usage": key_usage.get(api_key, 0),
-        "limit": api_keys[api_key]["rate_limit"],
+        "usage": limit - remaining,
+        "limit": limit,
         "plan": api_keys[api_key]["plan"],
-        "remaining": api_keys[api_key]["rate_limit"] - key_usage.get(api_key, 0)
+        "remaining": remaining
     }
 
 # Initialize the auth system when this module is imported
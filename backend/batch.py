@@ -0,0 +1,112 @@
+"""
+Extract many single pages with one extraction plan.
+
+URLs are fetched concurrently through the shared pooled client, with at most
+per_host requests open to any one host at a time. The per-host security scan
+runs in the same worker threads under that limit, so results for one host can
+stream while others are still being scanned. Extraction runs in the same
+worker threads, or in a process pool when processes > 0 so CPU-heavy pages do
+not serialize on the GIL. Results are yielded as they complete.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+import requests
+from .fetcher import fetch
+from .metrics import stage
+from .scraper import extract_data, get_random_user_agent
+from .security import HostScans, precheck_url
+
+logger = logging.getLogger("webtapi.batch")
+
+MAX_BATCH_URLS = 1000
+
+REJECTED_URL = "URL failed security checks or is not publicly accessible"
+
+
+class RejectedURL(Exception):
+    """A URL that failed the host's security scan"""
+
+
+class HostLimiter:
+    """At most per_host concurrent fetches per host, and at least delay seconds between their starts"""
+
+    def __init__(self, per_host=2, delay=0.0):
+        self.per_host = per_host
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._semaphores = defaultdict(lambda: threading.Semaphore(self.per_host))
+        self._next_start = defaultdict(float)
+
+    def acquire(self, host):
+        with self._lock:
+            semaphore = self._semaphores[host]
+        semaphore.acquire()
+        if self.delay:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start[host])
+                self._next_start[host] = start + self.delay
+            if start > now:
+                time.sleep(start - now)
+
+    def release(self, host):
+        self._semaphores[host].release()
+
+
+def _extract_one(url, plan, extraction_mode, limiter, process_pool, scans):
+    host = urlsplit(url).netloc
+    limiter.acquire(host)
+    try:
+        if scans is not None and not scans.allowed(url):
+            raise RejectedURL(url)
+        with stage("fetch", host):
+            # Same request as the single-page path in extract_data
+            response = fetch(url, headers={"User-Agent": get_random_user_agent()}, timeout=30)
+    finally:
+        limiter.release(host)
+    if process_pool is not None:
+        return process_pool.submit(extract_data, url, plan, response, extraction_mode).result()
+    return extract_data(url, plan, response=response, extraction_mode=extraction_mode)
+
+
+def extract_many(urls, plan, extraction_mode="precise", max_workers=16, per_host=2, delay=0.0,
+                 processes=0, validate=True):
+    """
+    Run extract_data over every URL with one plan.
+    Yields {"url": ..., "data": ...} or {"url": ..., "error": ...} in completion order.
+    """
+    urls = list(dict.fromkeys(urls))
+    allowed = {url: precheck_url(url) for url in urls} if validate else dict.fromkeys(urls, True)
+    for url in urls:
+        if not allowed[url]:
+            yield {"url": url, "error": REJECTED_URL}
+    scans = HostScans() if validate else None
+
+    limiter = HostLimiter(per_host, delay)
+    process_pool = ProcessPoolExecutor(processes) if processes else None
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="webtapi-batch")
+    try:
+        futures = {
+            pool.submit(_extract_one, url, plan, extraction_mode, limiter, process_pool, scans): url
+            for url in urls if allowed[url]
+        }
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                yield {"url": url, "data": future.result()}
+            except RejectedURL:
+                yield {"url": url, "error": REJECTED_URL}
+            except requests.exceptions.RequestException as e:
+                yield {"url": url, "error": f"Network error: {e}"}
+            except Exception as e:
+                logger.error(f"Batch extraction failed for {url}: {str(e)}")
+                yield {"url": url, "error": str(e)}
+    finally:
+        # Also reached when the consumer stops early, e.g. a client disconnects mid-stream
+        pool.shutdown(wait=False, cancel_futures=True)
+        if process_pool is not None:
+            process_pool.shutdown(wait=False, cancel_futures=True)
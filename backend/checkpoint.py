@@ -0,0 +1,115 @@
+"""
+Crawl checkpoints stored in SQLite so interrupted crawls can be resumed by job id.
+Checkpoints untouched for CHECKPOINT_RETENTION_HOURS (finished or abandoned) are deleted.
+"""
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+
+logger = logging.getLogger("webtapi.checkpoint")
+
+DEFAULT_CHECKPOINT_DIR = os.getenv("WEBTAPI_CHECKPOINT_DIR", ".checkpoints")
+CHECKPOINT_RETENTION_HOURS = float(os.getenv("WEBTAPI_CHECKPOINT_RETENTION_HOURS", "24"))
+
+# Use with fullmatch: "$" would also accept a trailing newline
+JOB_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS seen (url TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS frontier (position INTEGER PRIMARY KEY, url TEXT, depth INTEGER, score REAL);
+CREATE TABLE IF NOT EXISTS results (seq INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT, data TEXT);
+"""
+
+
+class CrawlCheckpoint:
+    """
+    Persist the frontier, seen-set and completed page results of one crawl job.
+    Results and seen URLs are append-only; the frontier is replaced on every save.
+    """
+
+    def __init__(self, job_id, directory=None):
+        if not isinstance(job_id, str) or not JOB_ID_PATTERN.fullmatch(job_id):
+            raise ValueError(f"Invalid crawl job id: {job_id}")
+        self.job_id = job_id
+        directory = directory or DEFAULT_CHECKPOINT_DIR
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{job_id}.sqlite3")
+        self.conn = sqlite3.connect(self.path)
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_meta(self, **values):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [(key, json.dumps(value)) for key, value in values.items()]
+            )
+
+    def has_state(self):
+        """Check whether a previous run of this job left anything to resume"""
+        return self.conn.execute("SELECT 1 FROM seen LIMIT 1").fetchone() is not None
+
+    def is_complete(self):
+        return self.get_meta("status") == "complete"
+
+    def load(self):
+        """Return (seen urls, frontier entries, page results) from the last save"""
+        seen = {row[0] for row in self.conn.execute("SELECT url FROM seen")}
+        frontier = [
+            (url, depth, score)
+            for url, depth, score in self.conn.execute(
+                "SELECT url, depth, score FROM frontier ORDER BY position"
+            )
+        ]
+        results = [json.loads(row[0]) for row in self.conn.execute("SELECT data FROM results ORDER BY seq")]
+        return seen, frontier, results
+
+    def save(self, new_seen, frontier_entries, new_results):
+        """Write one consistent snapshot in a single transaction"""
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO seen (url) VALUES (?)", [(url,) for url in new_seen])
+            self.conn.executemany(
+                "INSERT INTO results (url, data) VALUES (?, ?)",
+                [(page.get("url"), json.dumps(page, default=str)) for page in new_results]
+            )
+            self.conn.execute("DELETE FROM frontier")
+            self.conn.executemany(
+                "INSERT INTO frontier (position, url, depth, score) VALUES (?, ?, ?, ?)",
+                [(i, url, depth, score) for i, (url, depth, score) in enumerate(frontier_entries)]
+            )
+        logger.debug(f"Checkpoint saved for job {self.job_id}: {len(new_results)} new pages")
+
+    def close(self):
+        self.conn.close()
+
+
+def purge_checkpoints(directory=None, max_age_hours=CHECKPOINT_RETENTION_HOURS):
+    """Delete checkpoint files not written to for max_age_hours; returns how many were removed"""
+    directory = directory or DEFAULT_CHECKPOINT_DIR
+    cutoff = time.time() - max_age_hours * 3600
+    removed = 0
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return 0
+    for name in names:
+        if not name.endswith(".sqlite3"):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError as e:
+            logger.warning(f"Could not remove checkpoint {path}: {str(e)}")
+    if removed:
+        logger.info(f"Removed {removed} checkpoints older than {max_age_hours} hours")
+    return removed
@@ -0,0 +1,228 @@
+"""
+Compact in-memory form of crawl results.
+
+A crawl repeats a lot: every page carries the site's nav and footer links as
+full absolute URLs, and every table is held as html, markdown and records.
+CompactCrawl keeps one string table and one link/image table per crawl, so a
+link that appears on every page is stored once and pages hold integer ids.
+Tables keep only their records; html and markdown are rebuilt on demand with
+pandas, so they follow DataFrame.to_html/to_markdown output rather than the
+markup the extractor first produced.
+
+CompactCrawl behaves like the list of page dicts that crawl() used to return
+(len, indexing, slicing, iteration); pages are turned back into that dict
+shape only when they are read or serialized. Pages are copied on the way in
+and every read returns fresh dicts, so neither the caller that added a page
+nor one that edits a returned page can change the stored crawl. Membership
+(`url in crawl` or `page in crawl`) is answered by URL, without rebuilding pages.
+"""
+from array import array
+from copy import deepcopy
+
+# Content types with a dedicated compact encoding; anything else is kept as-is
+LINK_FIELDS = ("text", "href")
+IMAGE_FIELDS = ("src", "alt", "width", "height")
+
+
+class StringTable:
+    """Intern strings as integer ids; None is id 0"""
+
+    __slots__ = ("values", "ids")
+
+    def __init__(self):
+        self.values = [None]
+        self.ids = {}
+
+    def add(self, value):
+        if value is None:
+            return 0
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = len(self.values)
+            self.values.append(value)
+            self.ids[value] = string_id
+        return string_id
+
+    def get(self, string_id):
+        return self.values[string_id]
+
+
+class RecordTable:
+    """Deduplicated tuples of string ids (one per link or image across the whole crawl)"""
+
+    __slots__ = ("rows", "ids")
+
+    def __init__(self):
+        self.rows = []
+        self.ids = {}
+
+    def add(self, row):
+        row_id = self.ids.get(row)
+        if row_id is None:
+            row_id = len(self.rows)
+            self.rows.append(row)
+            self.ids[row] = row_id
+        return row_id
+
+
+class CompactTable:
+    """One extracted table, stored as its records; html and markdown are regenerated from them"""
+
+    __slots__ = ("table_index", "records")
+
+    def __init__(self, table_index, records):
+        self.table_index = table_index
+        self.records = records
+
+    def frame(self):
+        import pandas as pd
+        return pd.DataFrame(self.records)
+
+    def to_dict(self, derive=True):
+        if not derive:
+            return {"table_index": self.table_index, "json": deepcopy(self.records)}
+        df = self.frame()
+        return {
+            "table_index": self.table_index,
+            "html": df.to_html(index=False),
+            "markdown": df.to_markdown(),
+            "json": deepcopy(self.records),
+        }
+
+
+class CompactPage:
+    __slots__ = ("url", "depth", "metadata", "content_keys", "article", "links", "images", "tables", "other")
+
+    def __init__(self, url, depth, metadata, content_keys):
+        self.url = url
+        self.depth = depth
+        self.metadata = metadata
+        self.content_keys = content_keys
+        self.article = None
+        self.links = None
+        self.images = None
+        self.tables = None
+        self.other = None
+
+
+class CompactCrawl:
+    """Sequence of crawled pages stored with shared string, link and image tables"""
+
+    def __init__(self, pages=()):
+        self.strings = StringTable()
+        self.links = RecordTable()
+        self.images = RecordTable()
+        self.pages = []
+        self._key_tuples = {}
+        self._url_ids = set()
+        self.extend(pages)
+
+    def _encode_records(self, items, fields, table):
+        """Encode a list of dicts as record ids; returns None if any item has unexpected keys"""
+        ids = array("I")
+        try:
+            for item in items:
+                if not isinstance(item, dict) or set(item) - set(fields):
+                    return None
+                ids.append(table.add(tuple(self.strings.add(item.get(field)) for field in fields)))
+        except TypeError:
+            # Unhashable values (e.g. lists from domain rules) are kept uncompacted
+            return None
+        return ids
+
+    def append(self, page):
+        """Add a page dict as produced by extract_data plus url and depth"""
+        content = page.get("content") or {}
+        keys = tuple(content)
+        keys = self._key_tuples.setdefault(keys, keys)
+        record = CompactPage(self.strings.add(page.get("url")), page.get("depth"),
+                             deepcopy(page.get("metadata")), keys)
+        self._url_ids.add(record.url)
+        other = {}
+        for key, value in content.items():
+            if key == "article" and isinstance(value, dict):
+                record.article = deepcopy(value)
+            elif key == "links" and isinstance(value, list):
+                record.links = self._encode_records(value, LINK_FIELDS, self.links)
+                if record.links is None:
+                    other[key] = deepcopy(value)
+            elif key == "images" and isinstance(value, list):
+                record.images = self._encode_records(value, IMAGE_FIELDS, self.images)
+                if record.images is None:
+                    other[key] = deepcopy(value)
+            elif key == "tables" and isinstance(value, list) and all(
+                    isinstance(table, dict) and "json" in table for table in value):
+                record.tables = [CompactTable(table.get("table_index"), deepcopy(table["json"]) or [])
+                                 for table in value]
+            else:
+                other[key] = deepcopy(value)
+        record.other = other or None
+        self.pages.append(record)
+
+    def extend(self, pages):
+        for page in pages:
+            self.append(page)
+
+    def _decode_records(self, ids, fields, table):
+        strings = self.strings.values
+        return [dict(zip(fields, (strings[i] for i in table.rows[row_id]))) for row_id in ids]
+
+    def page_dict(self, record, derive_tables=True):
+        """Rebuild the original page dict for one record; derive_tables=False leaves out table html/markdown"""
+        content = {}
+        other = record.other or {}
+        for key in record.content_keys:
+            if key in other:
+                content[key] = deepcopy(other[key])
+            elif key == "article":
+                content[key] = deepcopy(record.article)
+            elif key == "links":
+                content[key] = self._decode_records(record.links, LINK_FIELDS, self.links)
+            elif key == "images":
+                content[key] = self._decode_records(record.images, IMAGE_FIELDS, self.images)
+            elif key == "tables":
+                content[key] = [table.to_dict(derive_tables) for table in record.tables]
+        return {
+            "metadata": deepcopy(record.metadata),
+            "content": content,
+            "url": self.strings.get(record.url),
+            "depth": record.depth,
+        }
+
+    def __len__(self):
+        return len(self.pages)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.page_dict(record) for record in self.pages[index]]
+        return self.page_dict(self.pages[index])
+
+    def __iter__(self):
+        return self.iter_pages()
+
+    def iter_pages(self, derive_tables=True):
+        for record in self.pages:
+            yield self.page_dict(record, derive_tables)
+
+    def __bool__(self):
+        return bool(self.pages)
+
+    def __contains__(self, item):
+        """Whether a page with this URL (or this page dict's URL) was crawled"""
+        url = item.get("url") if isinstance(item, dict) else item
+        if not isinstance(url, str):
+            return False
+        return self.strings.ids.get(url) in self._url_ids
+
+    def to_list(self):
+        """The crawl in its JSON shape: a list of page dicts"""
+        return list(self)
+
+    def stats(self):
+        return {
+            "pages": len(self.pages),
+            "strings": len(self.strings.values) - 1,
+            "unique_links": len(self.links.rows),
+            "link_refs": sum(len(page.links) for page in self.pages if page.links is not None),
+            "unique_images": len(self.images.rows),
+        }
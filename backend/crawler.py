@@ -1,25 +1,238 @@
 import logging
-from urllib.parse import urljoin, urlparse
-import requests
-from bs4 import BeautifulSoup
+from urllib.parse import urljoin, urlparse, urlsplit
+from lxml import etree
 import time
 import re
+import heapq
+import itertools
 from collections import deque
-from .scraper import extract_data
+from .scraper import extract_data, EXTRACTION_MODES
+from .fetcher import fetch, get_client
+from .decoding import decode_response
 from .ai_interpreter import parse_query
+from .checkpoint import CrawlCheckpoint, purge_checkpoints
+from .compact import CompactCrawl
+from .metrics import CRAWLED_PAGES, collect_timings, domain_label, stage
 
 logger = logging.getLogger("webtapi.crawler")
 
+# Keywords that signal a link is likely to lead to content for each plan intent
+INTENT_KEYWORDS = {
+    "product": ["product", "products", "shop", "store", "item", "price", "pricing", "buy",
+                "catalog", "catalogue", "collection", "category", "deal", "sale", "offer"],
+    "contact": ["contact", "about", "support", "help", "team", "location", "locations",
+                "office", "reach", "directory", "staff", "people"],
+    "news": ["news", "article", "articles", "blog", "post", "posts", "story", "stories",
+             "press", "update", "updates", "insights", "journal"],
+    "tables": ["data", "statistics", "stats", "table", "tables", "report", "reports",
+               "results", "figures", "chart", "charts", "dataset", "rankings"],
+    "images": ["gallery", "galleries", "photo", "photos", "image", "images", "media",
+               "portfolio", "pictures"],
+    "social": ["comments", "community", "forum", "discussion", "reviews", "social"],
+}
+
+# Boilerplate pages that rarely answer a query and tend to use up the page budget
+LOW_VALUE_KEYWORDS = ["privacy", "terms", "legal", "cookie", "cookies", "disclaimer",
+                      "login", "signin", "signup", "register", "account", "cart", "checkout",
+                      "tag", "tags", "feed", "rss", "sitemap", "careers", "jobs", "accessibility"]
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Split text or a URL into lowercase word tokens"""
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+def score_link(url, anchor_text, plan, query_terms=()):
+    """
+    Score a link by how likely it is to lead to content matching the plan intent.
+    Anchor text matches weigh more than URL path matches.
+    """
+    keywords = set(INTENT_KEYWORDS.get(plan.get("intent"), []))
+    keywords.update(query_terms)
+
+    path = url.split("://", 1)[-1].partition("/")[2]
+    url_tokens = set(tokenize(path))
+    anchor_tokens = set(tokenize(anchor_text))
+
+    score = 2.0 * len(anchor_tokens & keywords) + 1.0 * len(url_tokens & keywords)
+    if (anchor_tokens | url_tokens) & set(LOW_VALUE_KEYWORDS):
+        score -= 3.0
+    return score
+
+
+class FifoFrontier:
+    """Breadth-first frontier: links are visited in discovery order"""
+
+    def __init__(self):
+        self._queue = deque()
+
+    def push(self, url, depth, score=0.0):
+        self._queue.append((url, depth, score))
+
+    def pop(self):
+        url, depth, _ = self._queue.popleft()
+        return url, depth
+
+    def entries(self):
+        """Return (url, depth, score) for every queued link, in visiting order"""
+        return list(self._queue)
+
+    def __len__(self):
+        return len(self._queue)
+
+
+class PriorityFrontier:
+    """Best-first frontier: highest scoring links first, shallower depth breaks ties"""
+
+    def __init__(self):
+        self._heap = []
+        self._counter = itertools.count()
+
+    def push(self, url, depth, score=0.0):
+        heapq.heappush(self._heap, (-score, depth, next(self._counter), url))
+
+    def pop(self):
+        _, depth, _, url = heapq.heappop(self._heap)
+        return url, depth
+
+    def entries(self):
+        """Return (url, depth, score) for every queued link, in visiting order"""
+        return [(url, depth, -neg_score) for neg_score, depth, _, url in sorted(self._heap)]
+
+    def __len__(self):
+        return len(self._heap)
+
+
+CRAWL_STRATEGIES = {
+    "bfs": FifoFrontier,
+    "best_first": PriorityFrontier,
+}
+
+
+class AnchorCollector:
+    """
+    lxml parser target that records <a href> anchors and their text as the
+    document streams through, without building an element tree
+    """
+
+    def __init__(self):
+        self.anchors = []
+        self.base_href = None
+        self._current = None
+
+    def start(self, tag, attrib):
+        if tag == "a":
+            href = attrib.get("href")
+            self._current = [href, []] if href else None
+            if self._current:
+                self.anchors.append(self._current)
+        elif tag == "base" and self.base_href is None:
+            self.base_href = attrib.get("href")
+
+    def end(self, tag):
+        if tag == "a":
+            self._current = None
+
+    def data(self, data):
+        if self._current is not None:
+            self._current[1].append(data)
+
+    def close(self):
+        return self.anchors
+
+
+class LinkResolver:
+    """
+    Resolve hrefs against a page whose base URL is parsed once, and keep only
+    links on the page's own scheme and host
+    """
+
+    def __init__(self, page_url, base_href=None):
+        page = urlsplit(page_url)
+        self.origin = f"{page.scheme}://{page.netloc}".lower()
+        self.base = urljoin(page_url, base_href) if base_href else page_url
+        base = urlsplit(self.base)
+        self.base_scheme = base.scheme
+        self.base_origin = f"{base.scheme}://{base.netloc}"
+
+    def resolve(self, href):
+        """Return the absolute same-domain URL without fragment, or None"""
+        if href.startswith(("http://", "https://")):
+            full_url = href
+        elif href.startswith("//"):
+            full_url = f"{self.base_scheme}:{href}"
+        elif href.startswith("/") and "/." not in href:
+            full_url = self.base_origin + href
+        else:
+            full_url = urljoin(self.base, href)
+
+        # Compare scheme://netloc without a full urlparse of every link
+        scheme_end = full_url.find("://")
+        if scheme_end < 0:
+            return None
+        netloc_end = len(full_url)
+        for sep in "/?#":
+            pos = full_url.find(sep, scheme_end + 3)
+            if 0 <= pos < netloc_end:
+                netloc_end = pos
+        if full_url[:netloc_end].lower() != self.origin:
+            return None
+        return full_url.split("#", 1)[0]
+
+
+def extract_link_anchors(url, html_content):
+    """
+    Stream the page through lxml's event parser and return a dict of
+    same-domain links mapped to their anchor text
+    """
+    collector = AnchorCollector()
+    parser = etree.HTMLParser(target=collector)
+    try:
+        parser.feed(html_content)
+        anchors = parser.close()
+    except etree.Error as e:
+        logger.debug(f"Link parser stopped early on {url}: {str(e)}")
+        anchors = collector.anchors
+
+    resolver = LinkResolver(url, collector.base_href)
+    links = {}
+    for href, text_parts in anchors:
+        href = href.strip()
+        if not href or href.startswith(('#', 'javascript:', 'mailto:', 'tel:')):
+            continue
+        normalized_url = resolver.resolve(href)
+        if normalized_url is None:
+            continue
+        anchor_text = " ".join("".join(text_parts).split())
+        if normalized_url in links:
+            links[normalized_url] = f"{links[normalized_url]} {anchor_text}".strip()
+        else:
+            links[normalized_url] = anchor_text
+    return links
+
 class WebsiteCrawler:
-    def __init__(self, delay=1, max_pages=50, max_depth=3):
+    def __init__(self, delay=1, max_pages=50, max_depth=3, strategy="bfs",
+                 job_id=None, checkpoint_dir=None, checkpoint_every=5, extraction_mode="precise",
+                 include_timings=False):
+        if strategy not in CRAWL_STRATEGIES:
+            raise ValueError(f"Unknown crawl strategy: {strategy}")
+        if extraction_mode not in EXTRACTION_MODES:
+            raise ValueError(f"Unknown extraction mode: {extraction_mode}")
         self.delay = delay
         self.max_pages = max_pages
         self.max_depth = max_depth
+        self.strategy = strategy
+        self.job_id = job_id
+        self.checkpoint_dir = checkpoint_dir
+        self.checkpoint_every = checkpoint_every
+        self.extraction_mode = extraction_mode
+        self.include_timings = include_timings
         self.visited = set()
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-        })
+        }
     
     def get_domain(self, url):
         """Extract domain from URL"""
@@ -32,82 +245,137 @@ class WebsiteCrawler:
     
     def get_links(self, url, html_content):
         """Extract all links from HTML content"""
-        soup = BeautifulSoup(html_content, 'lxml')
-        links = set()
-        
-        for a in soup.find_all('a', href=True):
-            href = a['href']
-            if href.startswith(('#', 'javascript:', 'mailto:', 'tel:')):
-                continue
-            
-            # Resolve relative URLs
-            full_url = urljoin(url, href)
-            
-            # Only include links from the same domain
-            if self.is_same_domain(full_url, url):
-                # Normalize URL by removing fragments
-                normalized_url = full_url.split('#')[0]
-                links.add(normalized_url)
-        
-        return list(links)
+        return list(self.get_link_anchors(url, html_content))
     
-    def fetch_page(self, url):
-        """Fetch a page with error handling"""
+    def get_link_anchors(self, url, html_content):
+        """Extract same-domain links from HTML content along with their anchor text"""
+        with stage("link_extraction", urlsplit(url).netloc):
+            return extract_link_anchors(url, html_content)
+    
+    def fetch_response(self, url):
+        """Fetch a page through the shared client, returning None on failure"""
         try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            return response.text, True
+            return fetch(url, headers=self.headers, timeout=10)
         except Exception as e:
             logger.error(f"Failed to fetch {url}: {str(e)}")
+            return None
+    
+    def fetch_page(self, url):
+        """Fetch a page with error handling"""
+        response = self.fetch_response(url)
+        if response is None:
             return None, False
+        return decode_response(response), True
     
     def crawl(self, start_url, query, extraction_plan):
         """
-        Crawl a website and extract data from multiple pages
+        Crawl a website and extract data from multiple pages.
+        Returns a CompactCrawl, which reads like a list of page dicts.
+        When the crawler has a job_id, progress is checkpointed every
+        checkpoint_every pages and a later crawl with the same job_id resumes it.
         """
+        if not self.job_id:
+            return self._crawl(start_url, query, extraction_plan, None)
+        purge_checkpoints(self.checkpoint_dir)
+        checkpoint = CrawlCheckpoint(self.job_id, self.checkpoint_dir)
+        try:
+            return self._crawl(start_url, query, extraction_plan, checkpoint)
+        finally:
+            checkpoint.close()
+
+    def _crawl(self, start_url, query, extraction_plan, checkpoint):
         domain = self.get_domain(start_url)
-        queue = deque([(start_url, 0)])  # (url, depth)
-        results = []
-        page_count = 0
+        frontier = CRAWL_STRATEGIES[self.strategy]()
+        query_terms = {t for t in tokenize(query) if len(t) > 2}
+        results = CompactCrawl()
+        
+        if checkpoint and checkpoint.has_state():
+            if checkpoint.get_meta("start_url") != start_url:
+                logger.warning(f"Crawl job {self.job_id} was started from {checkpoint.get_meta('start_url')}, "
+                               f"resuming it instead of {start_url}")
+            seen, entries, saved_results = checkpoint.load()
+            results.extend(saved_results)
+            self.visited.update(seen)
+            for url, depth, score in entries:
+                frontier.push(url, depth, score)
+            logger.info(f"Resuming crawl job {self.job_id}: {len(results)} pages done, {len(entries)} queued")
+            if checkpoint.is_complete():
+                return results
+        else:
+            frontier.push(start_url, 0)
+            if checkpoint:
+                checkpoint.set_meta(start_url=start_url, query=query, status="running")
         
-        while queue and page_count < self.max_pages:
-            url, depth = queue.popleft()
+        queued = {url for url, _, _ in frontier.entries()}
+        page_count = len(results)
+        new_seen = []
+        new_results = []
+        
+        while frontier and page_count < self.max_pages:
+            url, depth = frontier.pop()
+            queued.discard(url)
             
             if url in self.visited or depth > self.max_depth:
                 continue
                 
             self.visited.add(url)
+            new_seen.append(url)
             logger.info(f"Crawling: {url} (depth: {depth})")
             
             # Fetch the page
-            html_content, success = self.fetch_page(url)
-            if not success:
+            response = self.fetch_response(url)
+            if response is None:
                 continue
+            html_content = decode_response(response)
                 
-            # Extract data from the page
+            # Extract data from the page, reusing the response fetched above
             try:
-                page_data = extract_data(url, extraction_plan)
+                with collect_timings() as timings:
+                    page_data = extract_data(url, extraction_plan, response=response,
+                                             extraction_mode=self.extraction_mode)
+                if self.include_timings:
+                    page_data["metadata"]["timings_ms"] = timings
                 page_data["url"] = url
                 page_data["depth"] = depth
                 results.append(page_data)
+                new_results.append(page_data)
                 page_count += 1
+                CRAWLED_PAGES.labels(domain_label(urlsplit(url).netloc)).inc()
             except Exception as e:
                 logger.error(f"Failed to extract data from {url}: {str(e)}")
             
             # Get links from this page for further crawling
             if depth < self.max_depth:
-                links = self.get_links(url, html_content)
-                for link in links:
-                    if link not in self.visited and link not in [u for u, d in queue]:
-                        queue.append((link, depth + 1))
+                links = self.get_link_anchors(url, html_content)
+                for link, anchor_text in links.items():
+                    if link not in self.visited and link not in queued:
+                        score = score_link(link, anchor_text, extraction_plan, query_terms)
+                        frontier.push(link, depth + 1, score)
+                        queued.add(link)
+            
+            if checkpoint and len(new_results) >= self.checkpoint_every:
+                checkpoint.save(new_seen, frontier.entries(), new_results)
+                new_seen, new_results = [], []
             
-            # Respectful delay
-            time.sleep(self.delay)
+            # Respectful delay; replayed pages come from disk so there is no host to spare
+            if get_client().mode != "replay":
+                time.sleep(self.delay)
+        
+        if checkpoint:
+            checkpoint.save(new_seen, frontier.entries(), new_results)
+            checkpoint.set_meta(status="complete")
         
         return results
 
-def crawl_website(start_url, query, max_pages=50, max_depth=3):
-    """Main function to crawl a website"""
+def crawl_website(start_url, query, max_pages=50, max_depth=3, strategy="bfs", job_id=None,
+                  extraction_mode="precise", include_timings=False):
+    """
+    Main function to crawl a website.
+    Use strategy="best_first" to follow the links most relevant to the query first,
+    pass a job_id to checkpoint the crawl so it can be resumed after a restart,
+    and extraction_mode="fast" for bulk crawls where article text quality matters less.
+    """
     extraction_plan = parse_query(query)
-    crawler = WebsiteCrawler(max_pages=max_pages, max_depth=max_depth)
+    crawler = WebsiteCrawler(max_pages=max_pages, max_depth=max_depth, strategy=strategy, job_id=job_id,
+                             extraction_mode=extraction_mode, include_timings=include_timings)
     return crawler.crawl(start_url, query, extraction_plan)
\ No newline at end of file
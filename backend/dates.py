@@ -0,0 +1,109 @@
+"""
+Publication date resolution that checks cheap page metadata before
+falling back to htmldate's full heuristic search
+"""
+import logging
+import re
+from email.utils import parsedate_to_datetime
+
+logger = logging.getLogger("webtapi.dates")
+
+# <meta> names/properties that carry a publication date, most specific first
+META_DATE_KEYS = [
+    "article:published_time", "og:published_time", "datepublished", "article.published",
+    "publish-date", "publish_date", "publishdate", "pubdate", "parsely-pub-date",
+    "sailthru.date", "dc.date.issued", "dcterms.issued", "dc.date", "dcterms.created",
+    "date", "article:modified_time", "og:updated_time",
+]
+
+ISO_DATE_PATTERN = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+
+# Plan intents whose results never show a timestamp
+UNDATED_INTENTS = {"images", "tables"}
+
+
+def needs_timestamp(plan):
+    """Plans can set "needs_timestamp" explicitly; otherwise image and table plans skip it"""
+    return plan.get("needs_timestamp", plan.get("intent") not in UNDATED_INTENTS)
+
+
+def normalize_date(value):
+    """Return a YYYY-MM-DD string from ISO-8601 or HTTP date text, or None"""
+    if not value or not isinstance(value, str):
+        return None
+    match = ISO_DATE_PATTERN.search(value)
+    if match:
+        year, month, day = (int(part) for part in match.groups())
+        if 1 <= month <= 12 and 1 <= day <= 31:
+            return f"{year:04d}-{month:02d}-{day:02d}"
+        return None
+    try:
+        return parsedate_to_datetime(value).strftime("%Y-%m-%d")
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _from_meta(meta):
+    for key in META_DATE_KEYS:
+        date = normalize_date(meta.get(key))
+        if date:
+            return date
+    return None
+
+
+def _from_json_ld(structured):
+    for item in structured["json_ld"]:
+        date = normalize_date(item.get("datePublished") or item.get("dateCreated"))
+        if date:
+            return date
+    return None
+
+
+def resolve_publication_date(html, headers=None, soup=None, structured=None, allow_htmldate=True):
+    """
+    Return (date, source). Checks <meta> tags, JSON-LD datePublished,
+    <time datetime>, then the Last-Modified header, and only then runs htmldate.
+    Uses the page's existing soup or structured-data scan when given.
+    """
+    if soup is not None:
+        meta = {}
+        for tag in soup.find_all("meta", content=True):
+            key = tag.get("property") or tag.get("name") or tag.get("itemprop")
+            if key:
+                meta.setdefault(key.lower(), tag["content"])
+        date = _from_meta(meta)
+        if date:
+            return date, "meta"
+    elif structured is not None:
+        date = _from_meta(structured["meta"])
+        if date:
+            return date, "meta"
+
+    if structured is None:
+        from .structured_data import extract_structured_data
+        structured = extract_structured_data(html)
+    date = _from_json_ld(structured)
+    if date:
+        return date, "json_ld"
+
+    if soup is not None:
+        time_tag = soup.find("time", datetime=True)
+        date = normalize_date(time_tag["datetime"]) if time_tag else None
+        if date:
+            return date, "time"
+
+    date = normalize_date((headers or {}).get("Last-Modified"))
+    if date:
+        return date, "last_modified"
+
+    if allow_htmldate:
+        try:
+            from htmldate import find_date
+            date = find_date(html)
+        except Exception as e:
+            logger.debug(f"htmldate failed: {str(e)}")
+            date = None
+        if date:
+            return date, "htmldate"
+
+    return None, None
@@ -0,0 +1,98 @@
+"""
+Decode fetched pages once so every extractor shares the same text
+"""
+import codecs
+import logging
+import re
+
+logger = logging.getLogger("webtapi.decoding")
+
+# Bytes scanned for <meta charset> and handed to the fallback detector
+SNIFF_BYTES = 4096
+DETECT_BYTES = 32768
+
+BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+HEADER_CHARSET = re.compile(r"charset\s*=\s*[\"']?([\w.:-]+)", re.IGNORECASE)
+META_CHARSET = re.compile(
+    rb"<meta[^>]+?charset\s*=\s*[\"']?\s*([\w.:-]+)", re.IGNORECASE
+)
+
+
+def _normalize(encoding):
+    """Return Python's canonical codec name, or None for unknown encodings"""
+    try:
+        return codecs.lookup(encoding).name
+    except (LookupError, TypeError):
+        return None
+
+
+def _looks_like_utf8(prefix):
+    """Check that a byte prefix is valid UTF-8, allowing a truncated final character"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        decoder.decode(prefix, final=False)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def _detect(prefix):
+    try:
+        from charset_normalizer import from_bytes
+    except ImportError:
+        return None
+    best = from_bytes(prefix).best()
+    return best.encoding if best else None
+
+
+def detect_encoding(content, headers=None):
+    """
+    Choose a page encoding from, in order: the Content-Type charset, a BOM,
+    a <meta charset> near the top of the page, and finally a detector run on
+    a bounded prefix. Returns (encoding, source).
+    """
+    content_type = (headers or {}).get("Content-Type", "")
+    match = HEADER_CHARSET.search(content_type)
+    if match and _normalize(match.group(1)):
+        return _normalize(match.group(1)), "header"
+
+    for bom, encoding in BOMS:
+        if content.startswith(bom):
+            return encoding, "bom"
+
+    match = META_CHARSET.search(content[:SNIFF_BYTES])
+    if match and _normalize(match.group(1).decode("ascii", "ignore")):
+        return _normalize(match.group(1).decode("ascii")), "meta"
+
+    prefix = content[:DETECT_BYTES]
+    if _looks_like_utf8(prefix):
+        return "utf-8", "utf8-check"
+
+    detected = _detect(prefix)
+    if detected and _normalize(detected):
+        return _normalize(detected), "detector"
+    return "windows-1252", "default"
+
+
+def decode_response(response):
+    """
+    Return the response body as text, decoding it only once per response.
+    Also sets response.encoding so response.text agrees and skips chardet.
+    """
+    cached = getattr(response, "_webtapi_text", None)
+    if cached is not None:
+        return cached
+
+    encoding, source = detect_encoding(response.content, response.headers)
+    logger.debug(f"Decoding {response.url} as {encoding} (from {source})")
+    text = response.content.decode(encoding, errors="replace")
+    response.encoding = encoding
+    response._webtapi_text = text
+    return text
@@ -0,0 +1,633 @@
+"""
+Distributed crawling: several workers, in one process or across machines,
+pull from a shared frontier and seen-set.
+
+Each host is mapped to a home worker with consistent hashing, so a host's
+queue, connections and politeness slot stay on one node while workers come
+and go. Idle workers may steal from other shards; the shared per-host slot
+keeps the crawl delay for a host intact no matter which worker fetches it.
+
+A popped URL is leased to its worker for LEASE_SECONDS under a token only
+that worker holds; the worker renews the lease while it processes the page
+and only the token holder can renew or complete it. If the worker dies, the
+lease expires and the URL goes back on its queue, up to MAX_ATTEMPTS times,
+so the crawl still drains.
+"""
+import argparse
+import bisect
+import hashlib
+import heapq
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from .crawler import WebsiteCrawler, score_link, tokenize
+from .scraper import extract_data, EXTRACTION_MODES
+from .decoding import decode_response
+from .ai_interpreter import parse_query
+
+logger = logging.getLogger("webtapi.distributed")
+
+# How long a worker may hold a URL before it is handed to another worker
+LEASE_SECONDS = float(os.getenv("WEBTAPI_CRAWL_LEASE_SECONDS", "300"))
+# Times a URL is leased before it is dropped (a page that keeps killing workers)
+MAX_ATTEMPTS = 3
+
+
+class HashRing:
+    """Consistent hash ring mapping hosts to worker ids"""
+
+    def __init__(self, nodes, replicas=64):
+        self.nodes = sorted(set(nodes))
+        if not self.nodes:
+            raise ValueError("HashRing needs at least one node")
+        self._ring = sorted(
+            (self._hash(f"{node}#{i}"), node)
+            for node in self.nodes
+            for i in range(replicas)
+        )
+        self._keys = [key for key, _ in self._ring]
+
+    @staticmethod
+    def _hash(value):
+        return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+    def node_for(self, key):
+        index = bisect.bisect(self._keys, self._hash(key)) % len(self._keys)
+        return self._ring[index][1]
+
+
+def link_rank(score, depth):
+    """Sort key shared by all frontiers: higher score first, then shallower depth"""
+    return -score + depth / 1000.0
+
+
+class InMemoryFrontier:
+    """
+    Process-local shared frontier for worker threads and tests.
+    Method names mirror the Redis commands RedisFrontier uses.
+    """
+
+    def __init__(self, lease_seconds=LEASE_SECONDS):
+        self._lock = threading.Lock()
+        self._seen = set()
+        self._queues = {}
+        self._counter = itertools.count()
+        self._host_slots = {}
+        self._pages = 0
+        self._leases = {}
+        self.lease_seconds = lease_seconds
+        self._results = []
+
+    def push_new(self, shard, url, depth, score=0.0):
+        """Queue a URL on a shard unless it has been seen before; True if queued"""
+        with self._lock:
+            if url in self._seen:
+                return False
+            self._seen.add(url)
+            queue = self._queues.setdefault(shard, [])
+            heapq.heappush(queue, (link_rank(score, depth), next(self._counter), url, depth, 0))
+            return True
+
+    def _requeue_expired(self):
+        now = time.monotonic()
+        for url, (deadline, shard, rank, depth, attempts, _) in list(self._leases.items()):
+            if deadline <= now:
+                del self._leases[url]
+                if attempts < MAX_ATTEMPTS:
+                    heapq.heappush(self._queues.setdefault(shard, []),
+                                   (rank, next(self._counter), url, depth, attempts))
+                else:
+                    logger.warning(f"Dropping {url} after {attempts} expired leases")
+
+    def pop(self, shards):
+        """
+        Take the best URL from the first non-empty shard and lease it to the caller.
+        Returns (url, depth, lease), where lease is the token for renew and task_done.
+        """
+        with self._lock:
+            self._requeue_expired()
+            for shard in shards:
+                queue = self._queues.get(shard)
+                if queue:
+                    rank, _, url, depth, attempts = heapq.heappop(queue)
+                    lease = uuid.uuid4().hex
+                    self._leases[url] = (time.monotonic() + self.lease_seconds, shard, rank, depth,
+                                         attempts + 1, lease)
+                    return url, depth, lease
+            return None
+
+    def renew(self, url, lease):
+        """Extend a lease the caller still holds; False if it expired or went to another worker"""
+        with self._lock:
+            held = self._leases.get(url)
+            if held is None or held[5] != lease:
+                return False
+            self._leases[url] = (time.monotonic() + self.lease_seconds,) + held[1:]
+            return True
+
+    def task_done(self, url, lease):
+        with self._lock:
+            held = self._leases.get(url)
+            if held is not None and held[5] == lease:
+                del self._leases[url]
+
+    def shards(self):
+        with self._lock:
+            return [shard for shard, queue in self._queues.items() if queue]
+
+    def is_drained(self):
+        with self._lock:
+            self._requeue_expired()
+            return not self._leases and not any(self._queues.values())
+
+    def acquire_host(self, host, delay):
+        """Claim the next fetch slot for a host; returns seconds to wait (0 means acquired)"""
+        with self._lock:
+            now = time.monotonic()
+            next_at = self._host_slots.get(host, 0.0)
+            if now >= next_at:
+                self._host_slots[host] = now + delay
+                return 0.0
+            return next_at - now
+
+    def reserve_page(self, max_pages):
+        with self._lock:
+            if self._pages >= max_pages:
+                return False
+            self._pages += 1
+            return True
+
+    def release_page(self):
+        with self._lock:
+            self._pages -= 1
+
+    def has_budget(self, max_pages):
+        with self._lock:
+            return self._pages < max_pages
+
+    def add_result(self, page_data):
+        with self._lock:
+            self._results.append(page_data)
+
+    def results(self):
+        with self._lock:
+            return list(self._results)
+
+
+class SQLiteFrontier:
+    """
+    Shared frontier in a SQLite file, for worker processes on one host or on a
+    shared volume. Every state change runs in its own IMMEDIATE transaction.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS seen (url TEXT PRIMARY KEY);
+    CREATE TABLE IF NOT EXISTS queue (seq INTEGER PRIMARY KEY AUTOINCREMENT, shard TEXT, url TEXT,
+                                      depth INTEGER, rank REAL, attempts INTEGER DEFAULT 0);
+    CREATE INDEX IF NOT EXISTS queue_shard_rank ON queue (shard, rank, seq);
+    CREATE TABLE IF NOT EXISTS leases (url TEXT PRIMARY KEY, shard TEXT, depth INTEGER, rank REAL,
+                                       attempts INTEGER, deadline REAL, token TEXT);
+    CREATE TABLE IF NOT EXISTS hosts (host TEXT PRIMARY KEY, next_at REAL);
+    CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER);
+    CREATE TABLE IF NOT EXISTS results (seq INTEGER PRIMARY KEY AUTOINCREMENT, data TEXT);
+    INSERT OR IGNORE INTO counters (name, value) VALUES ('pages', 0);
+    """
+
+    def __init__(self, path, lease_seconds=LEASE_SECONDS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()
+        self._conn().executescript(self.SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _counter(self, conn, name):
+        return conn.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()[0]
+
+    def _add_counter(self, conn, name, amount):
+        conn.execute("UPDATE counters SET value = value + ? WHERE name = ?", (amount, name))
+
+    def push_new(self, shard, url, depth, score=0.0):
+        with self._transaction() as conn:
+            if conn.execute("INSERT OR IGNORE INTO seen (url) VALUES (?)", (url,)).rowcount == 0:
+                return False
+            conn.execute(
+                "INSERT INTO queue (shard, url, depth, rank) VALUES (?, ?, ?, ?)",
+                (shard, url, depth, link_rank(score, depth))
+            )
+            return True
+
+    def _requeue_expired(self, conn):
+        now = time.time()
+        conn.execute("""INSERT INTO queue (shard, url, depth, rank, attempts)
+                        SELECT shard, url, depth, rank, attempts FROM leases
+                        WHERE deadline <= ? AND attempts < ?""", (now, MAX_ATTEMPTS))
+        for (url,) in conn.execute("SELECT url FROM leases WHERE deadline <= ? AND attempts >= ?",
+                                   (now, MAX_ATTEMPTS)).fetchall():
+            logger.warning(f"Dropping {url} after {MAX_ATTEMPTS} expired leases")
+        conn.execute("DELETE FROM leases WHERE deadline <= ?", (now,))
+
+    def pop(self, shards):
+        with self._transaction() as conn:
+            self._requeue_expired(conn)
+            for shard in shards:
+                row = conn.execute(
+                    "SELECT seq, url, depth, rank, attempts FROM queue WHERE shard = ? ORDER BY rank, seq LIMIT 1",
+                    (shard,)
+                ).fetchone()
+                if row:
+                    seq, url, depth, rank, attempts = row
+                    lease = uuid.uuid4().hex
+                    conn.execute("DELETE FROM queue WHERE seq = ?", (seq,))
+                    conn.execute("INSERT OR REPLACE INTO leases (url, shard, depth, rank, attempts, deadline, token) "
+                                 "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                 (url, shard, depth, rank, attempts + 1, time.time() + self.lease_seconds, lease))
+                    return url, depth, lease
+            return None
+
+    def renew(self, url, lease):
+        with self._transaction() as conn:
+            return conn.execute("UPDATE leases SET deadline = ? WHERE url = ? AND token = ?",
+                                (time.time() + self.lease_seconds, url, lease)).rowcount == 1
+
+    def task_done(self, url, lease):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM leases WHERE url = ? AND token = ?", (url, lease))
+
+    def shards(self):
+        return [row[0] for row in self._conn().execute("SELECT DISTINCT shard FROM queue")]
+
+    def is_drained(self):
+        with self._transaction() as conn:
+            self._requeue_expired(conn)
+            queued = conn.execute("SELECT 1 FROM queue LIMIT 1").fetchone()
+            leased = conn.execute("SELECT 1 FROM leases LIMIT 1").fetchone()
+            return queued is None and leased is None
+
+    def acquire_host(self, host, delay):
+        with self._transaction() as conn:
+            now = time.time()
+            row = conn.execute("SELECT next_at FROM hosts WHERE host = ?", (host,)).fetchone()
+            if row and now < row[0]:
+                return row[0] - now
+            conn.execute("INSERT OR REPLACE INTO hosts (host, next_at) VALUES (?, ?)", (host, now + delay))
+            return 0.0
+
+    def reserve_page(self, max_pages):
+        with self._transaction() as conn:
+            if self._counter(conn, "pages") >= max_pages:
+                return False
+            self._add_counter(conn, "pages", 1)
+            return True
+
+    def release_page(self):
+        with self._transaction() as conn:
+            self._add_counter(conn, "pages", -1)
+
+    def has_budget(self, max_pages):
+        return self._counter(self._conn(), "pages") < max_pages
+
+    def add_result(self, page_data):
+        with self._transaction() as conn:
+            conn.execute("INSERT INTO results (data) VALUES (?)", (json.dumps(page_data, default=str),))
+
+    def results(self):
+        return [json.loads(row[0]) for row in self._conn().execute("SELECT data FROM results ORDER BY seq")]
+
+
+class RedisFrontier:
+    """
+    Shared frontier in Redis for workers on separate machines.
+    Leases are a sorted set of URLs scored by deadline plus a hash of their queue
+    entries; popping, leasing and re-queueing each run as one Lua script.
+    """
+
+    # KEYS: queue, leases, lease entries; ARGV: deadline, shard, lease token
+    POP_SCRIPT = """
+    local popped = redis.call('ZPOPMIN', KEYS[1], 1)
+    if #popped == 0 then return nil end
+    local item = cjson.decode(popped[1])
+    item[3] = (item[3] or 0) + 1
+    redis.call('ZADD', KEYS[2], ARGV[1], item[1])
+    redis.call('HSET', KEYS[3], item[1], cjson.encode({item[1], item[2], item[3], ARGV[2], popped[2], ARGV[3]}))
+    return popped[1]
+    """
+
+    # KEYS: leases, lease entries; ARGV: url, lease token, new deadline (empty to complete the lease)
+    LEASE_SCRIPT = """
+    local entry = redis.call('HGET', KEYS[2], ARGV[1])
+    if not entry or cjson.decode(entry)[6] ~= ARGV[2] then return 0 end
+    if ARGV[3] == '' then
+        redis.call('ZREM', KEYS[1], ARGV[1])
+        redis.call('HDEL', KEYS[2], ARGV[1])
+    else
+        redis.call('ZADD', KEYS[1], ARGV[3], ARGV[1])
+    end
+    return 1
+    """
+
+    # KEYS: leases, lease entries; ARGV: now, max attempts, queue key prefix
+    REQUEUE_SCRIPT = """
+    local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+    for _, url in ipairs(expired) do
+        local entry = redis.call('HGET', KEYS[2], url)
+        redis.call('ZREM', KEYS[1], url)
+        redis.call('HDEL', KEYS[2], url)
+        if entry then
+            local lease = cjson.decode(entry)
+            if lease[3] < tonumber(ARGV[2]) then
+                redis.call('ZADD', ARGV[3] .. lease[4], lease[5], cjson.encode({lease[1], lease[2], lease[3]}))
+            end
+        end
+    end
+    return #expired
+    """
+
+    def __init__(self, url, prefix="webtapi:crawl", lease_seconds=LEASE_SECONDS):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RedisFrontier requires the 'redis' package")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.lease_seconds = lease_seconds
+        self._pop = self.client.register_script(self.POP_SCRIPT)
+        self._requeue = self.client.register_script(self.REQUEUE_SCRIPT)
+        self._lease = self.client.register_script(self.LEASE_SCRIPT)
+
+    def _key(self, *parts):
+        return ":".join((self.prefix,) + parts)
+
+    def push_new(self, shard, url, depth, score=0.0):
+        if not self.client.sadd(self._key("seen"), url):
+            return False
+        member = json.dumps([url, depth, 0])
+        pipe = self.client.pipeline()
+        pipe.zadd(self._key("queue", shard), {member: link_rank(score, depth)})
+        pipe.sadd(self._key("shards"), shard)
+        pipe.execute()
+        return True
+
+    def _requeue_expired(self):
+        self._requeue(keys=[self._key("leases"), self._key("lease_items")],
+                      args=[time.time(), MAX_ATTEMPTS, self._key("queue", "")])
+
+    def pop(self, shards):
+        self._requeue_expired()
+        for shard in shards:
+            lease = uuid.uuid4().hex
+            member = self._pop(keys=[self._key("queue", shard), self._key("leases"), self._key("lease_items")],
+                               args=[time.time() + self.lease_seconds, shard, lease])
+            if member:
+                url, depth = json.loads(member)[:2]
+                return url, depth, lease
+        return None
+
+    def renew(self, url, lease):
+        return bool(self._lease(keys=[self._key("leases"), self._key("lease_items")],
+                                args=[url, lease, time.time() + self.lease_seconds]))
+
+    def task_done(self, url, lease):
+        self._lease(keys=[self._key("leases"), self._key("lease_items")], args=[url, lease, ""])
+
+    def shards(self):
+        return [
+            shard.decode() for shard in self.client.smembers(self._key("shards"))
+            if self.client.zcard(self._key("queue", shard.decode()))
+        ]
+
+    def is_drained(self):
+        self._requeue_expired()
+        return not self.shards() and self.client.zcard(self._key("leases")) == 0
+
+    def acquire_host(self, host, delay):
+        key = self._key("host", host)
+        if self.client.set(key, 1, nx=True, px=max(1, int(delay * 1000))):
+            return 0.0
+        return max(self.client.pttl(key), 1) / 1000.0
+
+    def reserve_page(self, max_pages):
+        if self.client.incr(self._key("pages")) > max_pages:
+            self.client.decr(self._key("pages"))
+            return False
+        return True
+
+    def release_page(self):
+        self.client.decr(self._key("pages"))
+
+    def has_budget(self, max_pages):
+        return int(self.client.get(self._key("pages")) or 0) < max_pages
+
+    def add_result(self, page_data):
+        self.client.rpush(self._key("results"), json.dumps(page_data, default=str))
+
+    def results(self):
+        return [json.loads(item) for item in self.client.lrange(self._key("results"), 0, -1)]
+
+
+def open_frontier(spec, job_id="default"):
+    """
+    Open a shared frontier from a spec string:
+    memory://, sqlite:///path/to/file.db or redis://host:port/db
+    """
+    if spec.startswith("memory://"):
+        return InMemoryFrontier()
+    if spec.startswith("sqlite:///"):
+        return SQLiteFrontier(spec[len("sqlite:///"):] or f"{job_id}.frontier.db")
+    if spec.startswith(("redis://", "rediss://")):
+        return RedisFrontier(spec, prefix=f"webtapi:crawl:{job_id}")
+    raise ValueError(f"Unsupported frontier: {spec}")
+
+
+class CrawlWorker:
+    """
+    One crawl worker. Pulls URLs for the hosts it owns on the hash ring and,
+    when steal is enabled, from other shards once its own are empty.
+    """
+
+    def __init__(self, frontier, worker_id, ring, query, extraction_plan,
+                 max_pages=50, max_depth=3, delay=1, steal=True, idle_wait=0.2,
+                 extraction_mode="precise"):
+        self.frontier = frontier
+        self.worker_id = worker_id
+        self.ring = ring
+        self.query_terms = {t for t in tokenize(query) if len(t) > 2}
+        self.extraction_plan = extraction_plan
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.delay = delay
+        self.steal = steal
+        self.idle_wait = idle_wait
+        self.extraction_mode = extraction_mode
+        self.crawler = WebsiteCrawler(delay=0, max_pages=max_pages, max_depth=max_depth)
+
+    def shard_for(self, url):
+        return self.ring.node_for(urlsplit(url).netloc.lower())
+
+    def seed(self, start_url):
+        self.frontier.push_new(self.shard_for(start_url), start_url, 0)
+
+    def _shards(self):
+        if not self.steal:
+            return [self.worker_id]
+        others = [shard for shard in self.frontier.shards() if shard != self.worker_id]
+        return [self.worker_id] + others
+
+    def run(self):
+        """Process URLs until the page budget is spent or the frontier drains"""
+        processed = 0
+        self._held = None
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._renew_leases, args=(stop,), daemon=True,
+                                     name=f"{self.worker_id}-lease")
+        heartbeat.start()
+        try:
+            while self.frontier.has_budget(self.max_pages):
+                item = self.frontier.pop(self._shards())
+                if item is None:
+                    if self.frontier.is_drained():
+                        break
+                    time.sleep(self.idle_wait)
+                    continue
+                url, depth, lease = item
+                self._held = (url, lease)
+                try:
+                    self._process(url, depth, lease)
+                    processed += 1
+                except Exception as e:
+                    # One bad page must not take the worker (and its in-flight URL) down with it
+                    logger.error(f"Worker {self.worker_id} failed on {url}: {str(e)}")
+                finally:
+                    self._held = None
+                    self.frontier.task_done(url, lease)
+        finally:
+            stop.set()
+        logger.info(f"Worker {self.worker_id} finished after {processed} URLs")
+        return processed
+
+    def _renew_leases(self, stop):
+        """Keep the lease on the URL being processed alive, so slow pages are not handed out twice"""
+        while not stop.wait(self.frontier.lease_seconds / 3):
+            held = self._held
+            if held is None:
+                continue
+            try:
+                if not self.frontier.renew(*held):
+                    logger.warning(f"Worker {self.worker_id} lost its lease on {held[0]}")
+            except Exception as e:
+                logger.warning(f"Worker {self.worker_id} could not renew its lease on {held[0]}: {str(e)}")
+
+    def _process(self, url, depth, lease):
+        host = urlsplit(url).netloc.lower()
+        wait = self.frontier.acquire_host(host, self.delay)
+        while wait > 0:
+            time.sleep(wait)
+            wait = self.frontier.acquire_host(host, self.delay)
+
+        logger.info(f"Worker {self.worker_id} crawling: {url} (depth: {depth})")
+        response = self.crawler.fetch_response(url)
+        if response is None:
+            return
+        html_content = decode_response(response)
+
+        if self.frontier.reserve_page(self.max_pages):
+            try:
+                page_data = extract_data(url, self.extraction_plan, response=response,
+                                         extraction_mode=self.extraction_mode)
+                page_data["url"] = url
+                page_data["depth"] = depth
+                # A lease lost meanwhile means another worker has the URL; its result is the one kept
+                if not self.frontier.renew(url, lease):
+                    raise RuntimeError("lease expired before the result was stored")
+                self.frontier.add_result(page_data)
+            except Exception as e:
+                self.frontier.release_page()
+                logger.error(f"Failed to extract data from {url}: {str(e)}")
+
+        if depth < self.max_depth:
+            links = self.crawler.get_link_anchors(url, html_content)
+            for link, anchor_text in links.items():
+                score = score_link(link, anchor_text, self.extraction_plan, self.query_terms)
+                self.frontier.push_new(self.shard_for(link), link, depth + 1, score)
+
+
+def crawl_distributed(start_url, query, workers=4, frontier=None, max_pages=50, max_depth=3, delay=1,
+                      extraction_mode="precise"):
+    """
+    Crawl with several worker threads sharing one frontier.
+    Pass a SQLiteFrontier or RedisFrontier to let worker processes on other
+    machines (see `python -m backend.distributed`) join the same crawl.
+    """
+    extraction_plan = parse_query(query)
+    frontier = frontier or InMemoryFrontier()
+    worker_ids = [f"worker-{i}" for i in range(workers)]
+    ring = HashRing(worker_ids)
+    crawl_workers = [
+        CrawlWorker(frontier, worker_id, ring, query, extraction_plan,
+                    max_pages=max_pages, max_depth=max_depth, delay=delay,
+                    extraction_mode=extraction_mode)
+        for worker_id in worker_ids
+    ]
+    crawl_workers[0].seed(start_url)
+
+    threads = [threading.Thread(target=worker.run, name=worker.worker_id) for worker in crawl_workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return frontier.results()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a crawl worker against a shared frontier")
+    parser.add_argument("--frontier", required=True, help="sqlite:///path or redis://host:port/db")
+    parser.add_argument("--job-id", default="default")
+    parser.add_argument("--worker-id", required=True)
+    parser.add_argument("--workers", required=True, help="Comma-separated ids of all workers in the ring")
+    parser.add_argument("--seed", help="Start URL; only needed by the first worker")
+    parser.add_argument("--query", required=True)
+    parser.add_argument("--max-pages", type=int, default=50)
+    parser.add_argument("--max-depth", type=int, default=3)
+    parser.add_argument("--delay", type=float, default=1)
+    parser.add_argument("--no-steal", action="store_true")
+    parser.add_argument("--extraction-mode", choices=EXTRACTION_MODES, default="precise")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    frontier = open_frontier(args.frontier, args.job_id)
+    ring = HashRing(args.workers.split(","))
+    worker = CrawlWorker(frontier, args.worker_id, ring, args.query, parse_query(args.query),
+                         max_pages=args.max_pages, max_depth=args.max_depth,
+                         delay=args.delay, steal=not args.no_steal,
+                         extraction_mode=args.extraction_mode)
+    if args.seed:
+        worker.seed(args.seed)
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()
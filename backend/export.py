@@ -0,0 +1,203 @@
+"""
+Flatten extraction and crawl results into rows and export them as CSV,
+NDJSON or Parquet.
+
+Every row has the same columns whatever it came from, so CSV can be streamed
+without first collecting all rows, and a crawl loads into a warehouse as a
+single table. The kind column says what a row holds:
+
+    page        one per page: title, article text, data (the metadata as JSON)
+    link        text, href
+    image       src, alt, width, height
+    table_row   table_index, row_index, data (the row as JSON)
+    structured  data (the JSON-LD/OpenGraph record as JSON)
+    <other>     domain-rule fields: text, or data for non-string items
+"""
+import csv
+import io
+import logging
+import tempfile
+import orjson
+from .compact import CompactCrawl
+
+logger = logging.getLogger("webtapi.export")
+
+COLUMNS = [
+    "page_url", "depth", "kind", "index", "title", "text", "href", "src", "alt",
+    "width", "height", "table_index", "row_index", "data",
+]
+INTEGER_COLUMNS = {"depth", "index", "table_index", "row_index"}
+
+# format: (media type, file extension)
+EXPORT_FORMATS = {
+    "json": ("application/json", "json"),
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+ROWS_PER_CHUNK = 500
+
+
+def _json(value):
+    return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+def iter_pages(data):
+    """A crawl is a list of pages; a single extraction is one page"""
+    if isinstance(data, dict):
+        yield data
+    elif isinstance(data, CompactCrawl):
+        # Rows only need table records, so skip rebuilding html and markdown
+        yield from data.iter_pages(derive_tables=False)
+    else:
+        yield from data
+
+
+def page_rows(page):
+    """Yield the flat rows for one extract_data result"""
+    url = page.get("url") or page.get("metadata", {}).get("url")
+    depth = page.get("depth")
+    content = page.get("content") or {}
+    metadata = page.get("metadata") or {}
+    article = content.get("article") or {}
+
+    def row(kind, index=None, **values):
+        values.update(page_url=url, depth=depth, kind=kind, index=index)
+        return values
+
+    yield row("page", title=_text(article.get("title") or metadata.get("title")),
+              text=_text(article.get("content")), data=_json(metadata))
+
+    for content_type, items in content.items():
+        if content_type == "article":
+            continue
+        if content_type == "structured":
+            yield row("structured", data=_json(items))
+        elif content_type == "links":
+            for i, link in enumerate(items):
+                yield row("link", i, text=_text(link.get("text")), href=_text(link.get("href")))
+        elif content_type == "images":
+            for i, image in enumerate(items):
+                yield row("image", i, src=_text(image.get("src")), alt=_text(image.get("alt")),
+                          width=_text(image.get("width")), height=_text(image.get("height")))
+        elif content_type == "tables":
+            for table in items:
+                for r, record in enumerate(table.get("json") or []):
+                    yield row("table_row", table_index=table.get("table_index"), row_index=r,
+                              data=_json(record))
+        elif isinstance(items, list):
+            for i, item in enumerate(items):
+                if isinstance(item, str):
+                    yield row(content_type, i, text=item)
+                else:
+                    yield row(content_type, i, data=_json(item))
+        else:
+            yield row(content_type, data=_json(items))
+
+
+def iter_rows(data):
+    for page in iter_pages(data):
+        yield from page_rows(page)
+
+
+def stream_csv(data):
+    """Yield CSV bytes in chunks of ROWS_PER_CHUNK rows"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    count = 0
+    for row in iter_rows(data):
+        writer.writerow(row)
+        count += 1
+        if count % ROWS_PER_CHUNK == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def stream_ndjson(data):
+    """Yield one JSON object per row, newline-delimited, in chunks"""
+    lines = []
+    for row in iter_rows(data):
+        lines.append(orjson.dumps({column: row.get(column) for column in COLUMNS}))
+        if len(lines) >= ROWS_PER_CHUNK:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+
+def _arrow_schema(pa):
+    return pa.schema([(column, pa.int64() if column in INTEGER_COLUMNS else pa.string()) for column in COLUMNS])
+
+
+def write_parquet(data, destination, rows_per_group=50000):
+    """Write rows to a Parquet file (path or binary file object) one row group at a time"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export requires the 'pyarrow' package")
+
+    schema = _arrow_schema(pa)
+
+    def flush(rows):
+        columns = {column: [row.get(column) for row in rows] for column in COLUMNS}
+        writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+
+    with pq.ParquetWriter(destination, schema, compression="zstd") as writer:
+        rows = []
+        for row in iter_rows(data):
+            rows.append(row)
+            if len(rows) >= rows_per_group:
+                flush(rows)
+                rows = []
+        if rows:
+            flush(rows)
+
+
+def stream_parquet(data, chunk_size=1024 * 1024):
+    """Parquet needs its footer written last, so spool to a temp file and stream that"""
+    spool = tempfile.SpooledTemporaryFile(max_size=32 * 1024 * 1024)
+    write_parquet(data, spool)
+    spool.seek(0)
+
+    def chunks():
+        with spool:
+            while True:
+                chunk = spool.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    return chunks()
+
+
+def stream_export(data, export_format):
+    """Return an iterator of bytes for csv, ndjson or parquet"""
+    if export_format == "csv":
+        return stream_csv(data)
+    if export_format == "ndjson":
+        return stream_ndjson(data)
+    if export_format == "parquet":
+        return stream_parquet(data)
+    raise ValueError(f"Unsupported export format: {export_format}")
+
+
+def export_bytes(data, export_format):
+    """Return (bytes, media type, file extension) for a complete export"""
+    export_format = export_format.lower()
+    media_type, extension = EXPORT_FORMATS[export_format]
+    if export_format == "json":
+        if not isinstance(data, dict):
+            data = list(data)
+        body = orjson.dumps(data, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    else:
+        body = b"".join(stream_export(data, export_format))
+    return body, media_type, extension
@@ -0,0 +1,266 @@
+"""
+Process-wide HTTP client shared by the API, the crawler and the UI.
+
+One pooled session keeps connections to each host alive between requests,
+resolved addresses are cached for a short TTL, and brotli/zstd responses are
+accepted whenever a decoder is installed. HTTP/2 is used through httpx when
+WEBTAPI_HTTP2=1 and the h2 package is available.
+
+With WEBTAPI_FETCH_MODE=record every successful response is also appended to
+the WARC archive at WEBTAPI_ARCHIVE; with WEBTAPI_FETCH_MODE=replay responses
+are served from that archive and the network is never touched.
+
+Live fetches go through backend.resilience: the timeout a caller passes is an
+upper bound on the whole call, each attempt uses the host's adaptive timeout,
+transient failures are retried from a shared budget, and hosts that keep
+failing are short-circuited with CircuitOpenError.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import requests
+from cachetools import TTLCache
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib.parse import urlsplit
+from urllib3.util.request import ACCEPT_ENCODING
+from .archive import ArchiveRecorder, WarcArchive
+from .metrics import (FETCH_CIRCUIT_OPEN, FETCH_IN_FLIGHT, FETCH_POOL_SIZE, FETCHED_BYTES, FETCHES,
+                      domain_label, record_cache)
+from .resilience import MAX_RETRIES, RETRY_STATUSES, CircuitOpenError, HostRegistry, RetryBudget, backoff
+
+logger = logging.getLogger("webtapi.fetcher")
+
+POOL_HOSTS = int(os.getenv("WEBTAPI_POOL_HOSTS", "64"))
+POOL_PER_HOST = int(os.getenv("WEBTAPI_POOL_PER_HOST", "10"))
+DNS_CACHE_TTL = int(os.getenv("WEBTAPI_DNS_CACHE_TTL", "300"))
+USE_HTTP2 = os.getenv("WEBTAPI_HTTP2", "0") == "1"
+FETCH_MODES = ("live", "record", "replay")
+FETCH_MODE = os.getenv("WEBTAPI_FETCH_MODE", "live")
+ARCHIVE_PATH = os.getenv("WEBTAPI_ARCHIVE", "webtapi.warc.gz")
+
+TRANSIENT_ERRORS = (requests.exceptions.Timeout, requests.exceptions.ConnectionError)
+
+# Encodings urllib3 can decode in this environment, e.g. "gzip,deflate,br,zstd"
+DEFAULT_HEADERS = {
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+    "Accept-Encoding": ACCEPT_ENCODING.replace(",", ", "),
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1"
+}
+
+_dns_cache = TTLCache(maxsize=2048, ttl=max(DNS_CACHE_TTL, 1))
+_dns_lock = threading.Lock()
+_original_getaddrinfo = socket.getaddrinfo
+
+
+def _cached_getaddrinfo(*args, **kwargs):
+    key = (args, tuple(sorted(kwargs.items())))
+    with _dns_lock:
+        cached = _dns_cache.get(key)
+    record_cache("dns", cached is not None)
+    if cached is not None:
+        return cached
+    result = _original_getaddrinfo(*args, **kwargs)
+    with _dns_lock:
+        _dns_cache[key] = result
+    return result
+
+
+def install_dns_cache():
+    """Cache getaddrinfo results for DNS_CACHE_TTL seconds (0 disables)"""
+    if DNS_CACHE_TTL > 0 and socket.getaddrinfo is not _cached_getaddrinfo:
+        socket.getaddrinfo = _cached_getaddrinfo
+
+
+def _load_http2_client():
+    """Return an httpx client with HTTP/2 enabled, or None if unavailable"""
+    try:
+        import httpx
+        import h2  # noqa: F401 - httpx needs it for http2=True
+    except ImportError:
+        logger.warning("WEBTAPI_HTTP2 is set but httpx[http2] is not installed; using HTTP/1.1")
+        return None
+    limits = httpx.Limits(max_connections=POOL_HOSTS * POOL_PER_HOST,
+                          max_keepalive_connections=POOL_HOSTS * POOL_PER_HOST)
+    return httpx.Client(http2=True, limits=limits, follow_redirects=True)
+
+
+def _to_requests_response(response):
+    """Wrap an httpx response in a requests.Response so callers see one type"""
+    converted = requests.Response()
+    converted._content = response.content
+    converted.status_code = response.status_code
+    converted.headers = CaseInsensitiveDict(response.headers)
+    converted.url = str(response.url)
+    converted.reason = response.reason_phrase
+    converted.encoding = response.charset_encoding
+    return converted
+
+
+class FetchClient:
+    """Pooled HTTP client; use get_client() rather than creating instances"""
+
+    def __init__(self, pool_hosts=POOL_HOSTS, pool_per_host=POOL_PER_HOST, http2=USE_HTTP2,
+                 mode=FETCH_MODE, archive_path=ARCHIVE_PATH):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_per_host)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(DEFAULT_HEADERS)
+        self.http2_client = _load_http2_client() if http2 else None
+        FETCH_POOL_SIZE.set(pool_per_host)
+        install_dns_cache()
+        self.hosts = HostRegistry()
+        self.retry_budget = RetryBudget()
+        self.max_retries = MAX_RETRIES
+        self.mode = "live"
+        self.recorder = None
+        self.replay_archive = None
+        self.set_mode(mode, archive_path)
+
+    def set_mode(self, mode, archive_path=ARCHIVE_PATH):
+        """Switch between live fetching, recording to and replaying from a WARC archive"""
+        if mode not in FETCH_MODES:
+            raise ValueError(f"Unknown fetch mode {mode!r}; expected one of {', '.join(FETCH_MODES)}")
+        self.recorder = ArchiveRecorder(archive_path) if mode == "record" else None
+        self.replay_archive = WarcArchive(archive_path) if mode == "replay" else None
+        self.mode = mode
+        if mode != "live":
+            logger.info(f"Fetch mode {mode} using archive {archive_path}")
+
+    def get(self, url, headers=None, timeout=30):
+        """
+        GET a URL and raise a requests exception on network errors or 4xx/5xx.
+        timeout bounds the whole call, retries included.
+        """
+        host = urlsplit(url).netloc
+        domain = domain_label(host)
+        if self.replay_archive is not None:
+            return self._replay(url, domain)
+        health = self.hosts.get(host)
+        deadline = time.monotonic() + timeout
+        self.retry_budget.deposit()
+        attempt = 0
+        while True:
+            permit = health.allow()
+            if not permit:
+                FETCHES.labels(domain, "circuit_open").inc()
+                raise CircuitOpenError(f"Circuit open for {host}: too many recent failures")
+            remaining = deadline - time.monotonic()
+            attempt_timeout = health.timeout(max(remaining, 0.1))
+            started = time.monotonic()
+            response = error = None
+            try:
+                try:
+                    response = self._send(url, headers, attempt_timeout, domain)
+                except requests.exceptions.RequestException as e:
+                    error = e
+                elapsed = time.monotonic() - started
+
+                if error is None and response.status_code < 500:
+                    # 429 is the host pacing us, not failing; it is retried but does not trip the breaker
+                    health.record_success(elapsed)
+                elif isinstance(error, TRANSIENT_ERRORS) or (response is not None and response.status_code >= 500):
+                    if isinstance(error, requests.exceptions.Timeout):
+                        # Let a slower host stretch its timeout instead of timing out at the same point again
+                        health.observe(attempt_timeout[1])
+                    if health.record_failure():
+                        FETCH_CIRCUIT_OPEN.inc()
+                        logger.warning(f"Circuit opened for {host} after repeated failures")
+            finally:
+                # Other errors (redirect loops, bad encodings) say nothing about host health,
+                # but a half-open probe that hit one must not block the host forever.
+                # Only the probe's own permit frees the slot, not requests admitted earlier.
+                health.end_probe(permit)
+
+            retryable = isinstance(error, TRANSIENT_ERRORS) and not isinstance(error, requests.exceptions.SSLError) \
+                or response is not None and response.status_code in RETRY_STATUSES
+            if not retryable:
+                break
+            delay = backoff(attempt, response.headers.get("Retry-After") if response is not None else None)
+            if attempt >= self.max_retries or time.monotonic() + delay >= deadline \
+                    or not self.retry_budget.withdraw():
+                break
+            FETCHES.labels(domain, "retry").inc()
+            time.sleep(delay)
+            attempt += 1
+
+        if error is not None:
+            raise error
+        response.raise_for_status()
+        if self.recorder is not None:
+            self.recorder.record(url, response)
+        return response
+
+    def _send(self, url, headers, timeout, domain):
+        """One attempt; returns the response whatever its status"""
+        in_flight = FETCH_IN_FLIGHT.labels(domain)
+        in_flight.inc()
+        try:
+            if self.http2_client is not None:
+                response = self._get_http2(url, headers, timeout)
+            else:
+                response = self.session.get(url, headers=headers, timeout=timeout)
+        except requests.exceptions.RequestException:
+            FETCHES.labels(domain, "error").inc()
+            raise
+        finally:
+            in_flight.dec()
+        FETCHED_BYTES.labels(domain).inc(len(response.content))
+        FETCHES.labels(domain, str(response.status_code // 100) + "xx").inc()
+        return response
+
+    def host_health(self):
+        """Latency estimate and circuit state for every tracked host"""
+        return self.hosts.snapshot()
+
+    def _replay(self, url, domain):
+        response = self.replay_archive.get(url)
+        if response is None:
+            FETCHES.labels(domain, "replay_miss").inc()
+            raise requests.exceptions.ConnectionError(f"{url} is not in the replay archive")
+        FETCHES.labels(domain, "replay").inc()
+        response.raise_for_status()
+        return response
+
+    def _get_http2(self, url, headers, timeout):
+        import httpx
+        merged = dict(DEFAULT_HEADERS)
+        merged.update(headers or {})
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        try:
+            response = self.http2_client.get(url, headers=merged, timeout=timeout)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e))
+        except httpx.HTTPError as e:
+            raise requests.exceptions.ConnectionError(str(e))
+        return _to_requests_response(response)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the shared FetchClient, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = FetchClient()
+    return _client
+
+
+def fetch(url, headers=None, timeout=30):
+    """Fetch a URL through the shared client"""
+    return get_client().get(url, headers=headers, timeout=timeout)
+
+
+def set_fetch_mode(mode, archive_path=ARCHIVE_PATH):
+    """Set the shared client to "live", "record" or "replay" """
+    get_client().set_mode(mode, archive_path)
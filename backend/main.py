@@ -1,64 +1,53 @@
 from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from cachetools import TTLCache
+from contextlib import asynccontextmanager
 from datetime import timedelta
+import os
 import uuid
+import time
 import logging
+from urllib.parse import urlparse
 from .security import validate_url
 from .ai_interpreter import parse_query
-from .scraper import extract_data
-from .crawler import crawl_website
-
-@app.post("/crawl")
-async def crawl_website_endpoint(request: Request):
-    try:
-        data = await request.json()
-        url = data.get("url")
-        query = data.get("query")
-        max_pages = data.get("max_pages", 10)
-        
-        if not url or not query:
-            raise HTTPException(400, "Missing required parameters: url or query")
-        
-        # Security validation
-        if not validate_url(url):
-            raise HTTPException(400, "URL failed security checks or is not publicly accessible")
-        
-        # Crawl the website
-        crawled_data = crawl_website(url, query, max_pages)
-        
-        # Create API endpoint
-        endpoint_id = str(uuid.uuid4())
-        cache[endpoint_id] = {
-            "data": crawled_data,
-            "output_format": "JSON",
-            "expires": timedelta(hours=24)
-        }
-        
-        return JSONResponse({
-            "api_endpoint": f"/api/{endpoint_id}",
-            "sample_data": crawled_data[:3]  # Return first 3 pages as sample
-        })
-        
-    except HTTPException as he:
-        raise he
-    except Exception as e:
-        logger.error(f"Crawling failed: {str(e)}")
-        raise HTTPException(500, "Crawling failed")
-
-
+from .scraper import extract_data, get_random_user_agent, EXTRACTION_MODES
+from .fetcher import fetch
+from .crawler import crawl_website, CRAWL_STRATEGIES
+from .checkpoint import JOB_ID_PATTERN
+from .profiling import get_profile, is_admin, list_profiles, maybe_profile, profile_requested
+from .auth import PUBLIC_PATHS, REQUIRE_API_KEY, check_anonymous, check_api_key, key_owner
+from .responses import render_endpoint
+from .export import EXPORT_FORMATS, stream_export
+from .batch import MAX_BATCH_URLS, extract_many
+from .search_index import get_search_index
+from .refresh import RefreshScheduler, make_policy
+from .responses import encode_json
+from .metrics import HTTP_IN_FLIGHT, HTTP_REQUEST_SECONDS, collect_timings, record_cache, render_metrics, stage
+from .warmup import start_warm_up
+from utils.analytics import get_all_usage_stats, track_usage
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("webtapi")
 
+@asynccontextmanager
+async def lifespan(app):
+    # Load lazily imported dependencies in the background; requests are served meanwhile
+    if os.getenv("WEBTAPI_WARMUP", "1") == "1":
+        start_warm_up(models=os.getenv("WEBTAPI_WARMUP_MODELS", "0") == "1")
+    refresher.start()
+    yield
+    await refresher.stop()
+
 app = FastAPI(
     title="WebToAPI Converter",
     description="Convert websites to reusable API endpoints",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url=None
+    redoc_url=None,
+    lifespan=lifespan
 )
 
 # CORS configuration
@@ -69,9 +58,82 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def check_rate_limit(request: Request, cost=1):
+    """Charge cost requests to the caller's API key, or to its client IP when anonymous"""
+    api_key = request.headers.get("X-API-Key")
+    if api_key is None and not REQUIRE_API_KEY:
+        return check_anonymous(request.client.host if request.client else "unknown", cost)
+    return check_api_key(api_key, cost)
+
+# Registered before the metrics middleware so rejected requests are still measured
+@app.middleware("http")
+async def enforce_api_key(request: Request, call_next):
+    path = request.url.path
+    if path in PUBLIC_PATHS or path.startswith("/admin/"):
+        return await call_next(request)
+    api_key = request.headers.get("X-API-Key")
+    status, message, decision = check_rate_limit(request)
+    headers = decision.headers() if decision is not None else None
+    if status != 200:
+        return JSONResponse({"detail": message}, status_code=status, headers=headers)
+    response = await call_next(request)
+    if headers:
+        response.headers.update(headers)
+    if api_key is not None:
+        track_usage(api_key, endpoint_created=path in ("/generate", "/crawl") and response.status_code == 200)
+    return response
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    HTTP_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_IN_FLIGHT.dec()
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        HTTP_REQUEST_SECONDS.labels(request.method, path, str(status)).observe(time.perf_counter() - start)
+
 # Cache configuration
 cache = TTLCache(maxsize=1000, ttl=86400)  # Default 24-hour cache
 
+MAX_SEARCH_RESULTS = 100
+
+def index_for_search(endpoint_id, data, owner=None):
+    """
+    Add a stored result to the full-text index; a failure here never fails the request.
+    Blocks on SQLite, so handlers call it through run_in_threadpool.
+    """
+    try:
+        with stage("search_index"):
+            get_search_index().add(endpoint_id, data, cache.ttl, owner)
+    except Exception as e:
+        logger.warning(f"Search indexing failed for {endpoint_id}: {str(e)}")
+
+def touch_search_entry(endpoint_id):
+    """Keep an endpoint's index rows alive as long as its renewed cache entry"""
+    try:
+        get_search_index().touch(endpoint_id, cache.ttl)
+    except Exception as e:
+        logger.warning(f"Search index touch failed for {endpoint_id}: {str(e)}")
+
+def reindex_entry(endpoint_id, entry):
+    index_for_search(endpoint_id, entry["data"], entry.get("owner"))
+
+# Re-extracts endpoints created with refresh_minutes before they expire
+refresher = RefreshScheduler(cache, on_update=reindex_entry, on_touch=touch_search_entry)
+
+def profiled_response(profile, body):
+    """JSON response that reports the profile id and status when profiling was requested"""
+    if profile.profile_id:
+        body["profile_id"] = profile.profile_id
+    headers = {"X-Profile-Status": profile.status} if profile.status != "off" else None
+    return JSONResponse(body, headers=headers)
+
 @app.post("/generate")
 async def generate_endpoint(request: Request):
     try:
@@ -80,33 +142,67 @@ async def generate_endpoint(request: Request):
         query = data.get("query")
         output_format = data.get("output_format", "JSON")
         cache_hours = data.get("cache_hours", 24)
+        extraction_mode = data.get("extraction_mode", "precise")
+        include_timings = bool(data.get("include_timings", False))
+        refresh_minutes = data.get("refresh_minutes")
         
         # Validate inputs
         if not url or not query:
             raise HTTPException(400, "Missing required parameters: url or query")
         
-        # Security validation
-        if not validate_url(url):
-            raise HTTPException(400, "URL failed security checks or is not publicly accessible")
+        if refresh_minutes is not None and (not isinstance(refresh_minutes, (int, float)) or refresh_minutes <= 0):
+            raise HTTPException(400, "refresh_minutes must be a positive number")
         
-        # Parse natural language query
-        extraction_plan = parse_query(query)
+        if extraction_mode not in EXTRACTION_MODES:
+            raise HTTPException(400, f"Unknown extraction mode: {extraction_mode}")
+        
+        if not isinstance(output_format, str) or output_format.lower() not in EXPORT_FORMATS:
+            raise HTTPException(400, f"Unknown output format: {output_format}")
         
-        # Extract data from website
-        extracted_data = extract_data(url, extraction_plan)
+        profile_label = f"/generate {url}"
+        with collect_timings() as timings, maybe_profile(profile_requested(request), profile_label) as profile:
+            # Security validation
+            if not validate_url(url):
+                raise HTTPException(400, "URL failed security checks or is not publicly accessible")
+            
+            # Parse natural language query
+            with stage("parse_query"):
+                extraction_plan = parse_query(query)
+            
+            # Extract data from website; refreshed endpoints keep the response's validators
+            response = None
+            if refresh_minutes:
+                with stage("fetch", urlparse(url).netloc):
+                    response = fetch(url, headers={"User-Agent": get_random_user_agent()}, timeout=30)
+            extracted_data = extract_data(url, extraction_plan, response=response, extraction_mode=extraction_mode)
+        
+        if include_timings:
+            extracted_data["metadata"]["timings_ms"] = timings
         
         # Create API endpoint
         endpoint_id = str(uuid.uuid4())
-        cache[endpoint_id] = {
+        entry = {
             "data": extracted_data,
             "output_format": output_format,
-            "expires": timedelta(hours=cache_hours)
+            "expires": timedelta(hours=cache_hours),
+            "version": uuid.uuid4().hex,
+            "owner": key_owner(request.headers.get("X-API-Key")),
         }
+        if refresh_minutes:
+            # Kept so the scheduler can re-run the same extraction in the background
+            entry["source"] = {"url": url, "plan": extraction_plan, "extraction_mode": extraction_mode}
+            entry["refresh"] = make_policy(refresh_minutes * 60, cache.ttl, response=response)
+        cache[endpoint_id] = entry
+        await run_in_threadpool(index_for_search, endpoint_id, extracted_data, entry["owner"])
         
-        return JSONResponse({
+        body = {
             "api_endpoint": f"/api/{endpoint_id}",
             "sample_data": extracted_data
-        })
+        }
+        if refresh_minutes:
+            refresher.register(endpoint_id)
+            body["refresh_seconds"] = entry["refresh"]["interval"]
+        return profiled_response(profile, body)
         
     except HTTPException as he:
         raise he
@@ -114,12 +210,183 @@ async def generate_endpoint(request: Request):
         logger.error(f"Processing failed: {str(e)}")
         raise HTTPException(500, "Internal server error")
 
+@app.post("/generate/batch")
+async def generate_batch_endpoint(request: Request):
+    """
+    Extract many pages with one query. The response is NDJSON with one line per
+    URL, {"url", "data"} or {"url", "error"}, in the order the pages finish.
+    """
+    try:
+        data = await request.json()
+    except ValueError:
+        raise HTTPException(400, "Request body must be valid JSON")
+    if not isinstance(data, dict):
+        raise HTTPException(400, "Request body must be a JSON object")
+    urls = data.get("urls")
+    query = data.get("query")
+    extraction_mode = data.get("extraction_mode", "precise")
+    
+    if not urls or not query or not isinstance(urls, list):
+        raise HTTPException(400, "Missing required parameters: urls (a list) or query")
+    
+    if len(urls) > MAX_BATCH_URLS:
+        raise HTTPException(400, f"At most {MAX_BATCH_URLS} URLs per batch")
+    
+    if extraction_mode not in EXTRACTION_MODES:
+        raise HTTPException(400, f"Unknown extraction mode: {extraction_mode}")
+    
+    # Every URL counts as a request; the middleware already charged the first one
+    if len(urls) > 1:
+        status, message, decision = check_rate_limit(request, cost=len(urls) - 1)
+        if status != 200:
+            raise HTTPException(status, message, headers=decision.headers() if decision is not None else None)
+    
+    with stage("parse_query"):
+        extraction_plan = parse_query(query)
+    
+    def lines():
+        for result in extract_many(urls, extraction_plan, extraction_mode=extraction_mode):
+            yield encode_json(result) + b"\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.post("/crawl")
+async def crawl_website_endpoint(request: Request):
+    try:
+        data = await request.json()
+        url = data.get("url")
+        query = data.get("query")
+        max_pages = data.get("max_pages", 10)
+        strategy = data.get("strategy", "bfs")
+        # Only crawls given a job_id are checkpointed (and can be resumed)
+        job_id = data.get("job_id")
+        extraction_mode = data.get("extraction_mode", "precise")
+        include_timings = bool(data.get("include_timings", False))
+        
+        if not url or not query:
+            raise HTTPException(400, "Missing required parameters: url or query")
+        
+        if strategy not in CRAWL_STRATEGIES:
+            raise HTTPException(400, f"Unknown crawl strategy: {strategy}")
+        
+        if job_id is not None and not (isinstance(job_id, str) and JOB_ID_PATTERN.fullmatch(job_id)):
+            raise HTTPException(400, "Invalid job_id")
+        
+        if extraction_mode not in EXTRACTION_MODES:
+            raise HTTPException(400, f"Unknown extraction mode: {extraction_mode}")
+        
+        # Security validation
+        if not validate_url(url):
+            raise HTTPException(400, "URL failed security checks or is not publicly accessible")
+        
+        # Crawl the website
+        with maybe_profile(profile_requested(request), f"/crawl {url}") as profile:
+            crawled_data = crawl_website(url, query, max_pages, strategy=strategy, job_id=job_id,
+                                         extraction_mode=extraction_mode, include_timings=include_timings)
+        
+        # Create API endpoint
+        endpoint_id = str(uuid.uuid4())
+        owner = key_owner(request.headers.get("X-API-Key"))
+        cache[endpoint_id] = {
+            "data": crawled_data,
+            "output_format": "JSON",
+            "expires": timedelta(hours=24),
+            "version": uuid.uuid4().hex,
+            "owner": owner,
+        }
+        await run_in_threadpool(index_for_search, endpoint_id, crawled_data, owner)
+        
+        return profiled_response(profile, {
+            "api_endpoint": f"/api/{endpoint_id}",
+            "job_id": job_id,
+            "sample_data": crawled_data[:3]  # Return first 3 pages as sample
+        })
+        
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Crawling failed: {str(e)}")
+        raise HTTPException(500, "Crawling failed")
+
 @app.get("/api/{endpoint_id}")
-async def get_data(endpoint_id: str):
+async def get_data(endpoint_id: str, request: Request):
+    """
+    Stored result for an endpoint. Optional query parameters:
+    fields=url,content.tables.json  keep only these paths
+    limit=&cursor=                  page through crawl pages (or through items=<path> of a single result)
+    format=csv|ndjson|parquet       flat rows instead of JSON (defaults to the endpoint's output_format)
+    """
     data = cache.get(endpoint_id)
+    record_cache("endpoints", data is not None)
     if not data:
         raise HTTPException(404, "Endpoint expired or not found")
-    return data["data"]
+    export_format = (request.query_params.get("format") or data.get("output_format") or "JSON").lower()
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(400, f"Unknown format: {export_format}")
+    if export_format != "json":
+        media_type, extension = EXPORT_FORMATS[export_format]
+        try:
+            body = stream_export(data["data"], export_format)
+        except RuntimeError as e:
+            raise HTTPException(501, str(e))
+        disposition = f'attachment; filename="{endpoint_id}.{extension}"'
+        return StreamingResponse(body, media_type=media_type, headers={"Content-Disposition": disposition})
+    return render_endpoint(endpoint_id, data, request.query_params, request.headers)
+
+@app.get("/search")
+async def search(request: Request, q: str = "", limit: int = 20, offset: int = 0, endpoint_id: str = None,
+                 raw: bool = False):
+    """
+    Ranked pages that match q, with highlighted snippets, across the endpoints
+    created with the caller's API key (admins search every endpoint). Callers
+    without a key must name the endpoint_id to search.
+    Terms are matched literally and all must appear ("quoted phrases", prefix*);
+    raw=true passes q to SQLite FTS5 as-is (OR, NOT, NEAR, column:term).
+    """
+    if not q.strip():
+        raise HTTPException(400, "Missing required parameter: q")
+    if not 1 <= limit <= MAX_SEARCH_RESULTS or offset < 0:
+        raise HTTPException(400, f"limit must be between 1 and {MAX_SEARCH_RESULTS} and offset non-negative")
+    owner = None if is_admin(request) else key_owner(request.headers.get("X-API-Key"))
+    if owner is None and not endpoint_id and not is_admin(request):
+        raise HTTPException(400, "endpoint_id is required without an API key")
+    # Only endpoints this worker still holds; the index may outlive evicted entries
+    live = set(cache.keys())
+    try:
+        with stage("search"):
+            hits, has_more = await run_in_threadpool(
+                get_search_index().search, q, limit, offset, endpoint_id=endpoint_id, owner=owner,
+                accept=live.__contains__, raw=raw)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return {"query": q, "hits": hits, "next_offset": offset + len(hits) if has_more else None}
+
+@app.get("/admin/usage")
+async def admin_usage(request: Request):
+    if not is_admin(request):
+        raise HTTPException(403, "Admin token required")
+    return get_all_usage_stats()
+
+@app.get("/admin/profiles")
+async def admin_list_profiles(request: Request):
+    if not is_admin(request):
+        raise HTTPException(403, "Admin token required")
+    return list_profiles()
+
+@app.get("/admin/profiles/{profile_id}")
+async def admin_get_profile(profile_id: str, request: Request):
+    """Collapsed stacks, ready for flamegraph.pl or speedscope"""
+    if not is_admin(request):
+        raise HTTPException(403, "Admin token required")
+    profile = get_profile(profile_id)
+    if not profile:
+        raise HTTPException(404, "Profile expired or not found")
+    return PlainTextResponse(profile["collapsed"])
+
+@app.get("/metrics")
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
 @app.get("/health")
 async def health_check():
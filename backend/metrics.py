@@ -0,0 +1,86 @@
+"""
+Prometheus metrics and per-stage timing for the scraping hot path.
+
+Wrap work in `with stage("name", domain):` to record it in the stage
+histogram; inside `with collect_timings() as timings:` the same stages are
+also summed into a dict that can be returned in result metadata.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Per-domain labels are capped so a crawl of many sites cannot explode cardinality
+MAX_DOMAIN_LABELS = 200
+
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+STAGE_SECONDS = Histogram(
+    "webtapi_stage_seconds", "Time spent in each extraction stage",
+    ["stage", "domain"], buckets=STAGE_BUCKETS
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "webtapi_http_request_seconds", "API request latency",
+    ["method", "path", "status"], buckets=STAGE_BUCKETS
+)
+HTTP_IN_FLIGHT = Gauge("webtapi_http_in_flight_requests", "API requests currently being served")
+CACHE_REQUESTS = Counter("webtapi_cache_requests_total", "Cache lookups", ["cache", "result"])
+FETCH_IN_FLIGHT = Gauge("webtapi_fetch_in_flight", "Outbound fetches currently open per domain", ["domain"])
+FETCH_POOL_SIZE = Gauge("webtapi_fetch_pool_size", "Keep-alive connections allowed per host")
+FETCHED_BYTES = Counter("webtapi_fetched_bytes_total", "Response bytes downloaded", ["domain"])
+FETCHES = Counter("webtapi_fetches_total", "Outbound fetches", ["domain", "outcome"])
+FETCH_CIRCUIT_OPEN = Counter("webtapi_fetch_circuit_opened_total", "Times a host circuit breaker opened")
+CRAWLED_PAGES = Counter("webtapi_crawled_pages_total", "Pages extracted by crawls", ["domain"])
+
+_timings = contextvars.ContextVar("webtapi_stage_timings", default=None)
+_domains = set()
+_domains_lock = threading.Lock()
+
+
+def domain_label(domain):
+    """Return the domain as a label value, or "other" once the label budget is used"""
+    if not domain:
+        return ""
+    domain = domain.lower()
+    if domain in _domains:
+        return domain
+    with _domains_lock:
+        if len(_domains) < MAX_DOMAIN_LABELS:
+            _domains.add(domain)
+            return domain
+    return "other"
+
+
+@contextmanager
+def stage(name, domain=""):
+    """Time a block of work as one extraction stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(name, domain_label(domain)).observe(elapsed)
+        timings = _timings.get()
+        if timings is not None:
+            timings[name] = round(timings.get(name, 0.0) + elapsed * 1000, 3)
+
+
+@contextmanager
+def collect_timings():
+    """Collect stage timings (in ms) recorded in this context into a dict"""
+    timings = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def render_metrics():
+    """Return (body, content_type) for the /metrics endpoint"""
+    return generate_latest(), CONTENT_TYPE_LATEST
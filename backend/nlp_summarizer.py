@@ -1,13 +1,248 @@
 import logging
 import re
+from collections import Counter
+import numpy as np
 
 logger = logging.getLogger("webtapi.nlp")
 
+SUMMARY_SENTENCES = 3
+MIN_SENTENCE_TOKENS = 5
+MAX_SENTENCE_CHARS = 600
+# Cosine similarity above which a candidate repeats an already chosen sentence
+REDUNDANCY_THRESHOLD = 0.6
+QUERY_WEIGHT = 0.5
+# TextRank builds a sentence-by-sentence matrix, so cap the sentences it ranks
+MAX_TEXTRANK_SENTENCES = 3000
+
+SENTENCE_BOUNDARY = re.compile(
+    r"(?:(?<=[.!?])|(?<=[.!?][\"')\]]))\s+(?=[\"'(\[]?[A-Z0-9])|\n\s*\n|\n(?=\s*[-*\u2022])"
+)
+# A boundary after these is not the end of a sentence
+ABBREVIATION = re.compile(r"(?:\b(?:Mr|Mrs|Ms|Dr|Prof|Sr|Jr|St|Inc|Ltd|Co|No|vs|etc|e\.g|i\.e|Fig)|\b[A-Z])\.$")
+TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have
+having he her here hers herself him himself his how i if in into is it its itself just me more most
+my myself no nor not now of off on once only or other our ours ourselves out over own same she
+should so some such than that the their theirs them themselves then there these they this those
+through to too under until up very was we were what when where which while who whom why will with
+would you your yours yourself yourselves also may might must shall us s t
+""".split())
+
+
+def split_sentences(text):
+    """Split text into trimmed sentences; very long runs without punctuation are cut at MAX_SENTENCE_CHARS"""
+    pieces = []
+    for piece in SENTENCE_BOUNDARY.split(text or ""):
+        if pieces and ABBREVIATION.search(pieces[-1]):
+            pieces[-1] = f"{pieces[-1]} {piece}"
+        else:
+            pieces.append(piece)
+    sentences = []
+    for sentence in pieces:
+        sentence = " ".join(sentence.split()).lstrip("-*\u2022 ")
+        while len(sentence) > MAX_SENTENCE_CHARS:
+            cut = sentence.rfind(" ", 0, MAX_SENTENCE_CHARS)
+            cut = cut if cut > 0 else MAX_SENTENCE_CHARS
+            sentences.append(sentence[:cut])
+            sentence = sentence[cut:].lstrip()
+        if sentence:
+            sentences.append(sentence)
+    return sentences
+
+
+def tokenize(text):
+    return [token for token in TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class TfidfMatrix:
+    """
+    Sparse sentence-by-term TF-IDF matrix in coordinate form (rows, cols, weights),
+    with sublinear term frequency and L2-normalized rows.
+    """
+
+    def __init__(self, sentences, vocabulary=None):
+        vocabulary = {} if vocabulary is None else vocabulary
+        token_ids = []
+        lengths = []
+        for sentence in sentences:
+            ids = [vocabulary.setdefault(token, len(vocabulary)) for token in tokenize(sentence)]
+            token_ids.extend(ids)
+            lengths.append(len(ids))
+        self.vocabulary = vocabulary
+        self.n_rows = len(sentences)
+        self.n_terms = max(len(vocabulary), 1)
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+
+        rows = np.repeat(np.arange(self.n_rows, dtype=np.int64), self.lengths)
+        cols = np.asarray(token_ids, dtype=np.int64)
+        # Count each (sentence, term) pair once
+        keys, counts = np.unique(rows * self.n_terms + cols, return_counts=True)
+        self.rows = keys // self.n_terms
+        self.cols = keys % self.n_terms
+
+        df = np.bincount(self.cols, minlength=self.n_terms)
+        self.idf = np.log((1 + self.n_rows) / (1 + df)) + 1.0
+        weights = (1.0 + np.log(counts)) * self.idf[self.cols]
+        norms = np.sqrt(np.bincount(self.rows, weights=weights * weights, minlength=self.n_rows))
+        self.weights = weights / np.where(norms > 0, norms, 1.0)[self.rows]
+
+    def dot(self, vector):
+        """Matrix-vector product: one score per sentence"""
+        return np.bincount(self.rows, weights=self.weights * vector[self.cols], minlength=self.n_rows)
+
+    def column_sums(self):
+        return np.bincount(self.cols, weights=self.weights, minlength=self.n_terms)
+
+    def dense_rows(self, indices):
+        """Dense copies of a few rows (used for redundancy checks between candidates)"""
+        position = np.full(self.n_rows, -1, dtype=np.int64)
+        position[indices] = np.arange(len(indices))
+        mask = position[self.rows] >= 0
+        dense = np.zeros((len(indices), self.n_terms))
+        dense[position[self.rows[mask]], self.cols[mask]] = self.weights[mask]
+        return dense
+
+    def query_vector(self, query):
+        vector = np.zeros(self.n_terms)
+        for token in tokenize(query or ""):
+            term = self.vocabulary.get(token)
+            if term is not None and term < self.n_terms:
+                vector[term] = self.idf[term]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+def centroid_scores(matrix):
+    """Cosine similarity of each sentence to the document centroid"""
+    centroid = matrix.column_sums()
+    norm = np.linalg.norm(centroid)
+    if not norm:
+        return np.zeros(matrix.n_rows)
+    return matrix.dot(centroid / norm)
+
+
+def textrank_scores(matrix, damping=0.85, iterations=50, tolerance=1e-6):
+    """
+    PageRank over the sentence cosine-similarity graph. Needs scipy for the
+    sparse product; returns None without it so callers fall back to centroid.
+    """
+    try:
+        from scipy import sparse
+    except ImportError:
+        return None
+    if matrix.n_rows > MAX_TEXTRANK_SENTENCES:
+        return None
+    X = sparse.csr_matrix((matrix.weights, (matrix.rows, matrix.cols)), shape=(matrix.n_rows, matrix.n_terms))
+    similarity = (X @ X.T).toarray()
+    np.fill_diagonal(similarity, 0.0)
+    out_weight = similarity.sum(axis=1)
+    dangling = out_weight == 0
+    transition = similarity / np.where(dangling, 1.0, out_weight)[:, None]
+    n = matrix.n_rows
+    scores = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        updated = (1 - damping) / n + damping * (transition.T @ scores + scores[dangling].sum() / n)
+        if np.abs(updated - scores).sum() < tolerance:
+            return updated
+        scores = updated
+    return scores
+
+
+def rank_sentences(sentences, query="", count=SUMMARY_SENTENCES, method="centroid"):
+    """
+    Return the indices of the count best sentences, in document order.
+    Sentences are scored against the centroid (or by TextRank), nudged toward
+    the query terms, and skipped when they repeat an already chosen sentence.
+    """
+    if not sentences:
+        return []
+    matrix = TfidfMatrix(sentences)
+    scores = textrank_scores(matrix) if method == "textrank" else None
+    if scores is None:
+        scores = centroid_scores(matrix)
+    else:
+        scores = scores / scores.max()
+    if query:
+        scores = scores + QUERY_WEIGHT * matrix.dot(matrix.query_vector(query))
+    scores = np.where(matrix.lengths >= MIN_SENTENCE_TOKENS, scores, -np.inf)
+
+    candidates = np.argsort(-scores, kind="stable")[:count * 4]
+    candidates = candidates[np.isfinite(scores[candidates])]
+    if not len(candidates):
+        candidates = np.arange(min(count, len(sentences)))
+    dense = matrix.dense_rows(candidates)
+    chosen = []
+    for i, index in enumerate(candidates):
+        if chosen and (dense[chosen] @ dense[i]).max() > REDUNDANCY_THRESHOLD:
+            continue
+        chosen.append(i)
+        if len(chosen) == count:
+            break
+    return sorted(int(candidates[i]) for i in chosen)
+
+
+def extractive_summary(text, query="", count=SUMMARY_SENTENCES, method="centroid"):
+    """Summarize text by picking its most representative sentences"""
+    sentences = split_sentences(text)
+    return " ".join(sentences[i] for i in rank_sentences(sentences, query, count, method))
+
+
+def page_text_units(page):
+    """Text worth summarizing from one extract_data result: article, then domain-rule strings"""
+    content = page.get("content") or {}
+    article = content.get("article") or {}
+    units = split_sentences(article.get("content") or "")
+    for key, value in content.items():
+        if key in ("article", "links", "images", "tables", "structured") or not isinstance(value, list):
+            continue
+        for item in value:
+            if isinstance(item, str):
+                units.extend(split_sentences(item))
+    return units
+
+
+def _pages(data):
+    if isinstance(data, dict):
+        return [data]
+    if hasattr(data, "iter_pages"):
+        # CompactCrawl; summaries never need table html or markdown
+        return data.iter_pages(derive_tables=False)
+    return data
+
+
+def summarize_data(data, query="", count=SUMMARY_SENTENCES, method="centroid"):
+    """
+    Extractive summary of a single page or a whole crawl. Across a crawl,
+    sentences are pooled and those repeated on many pages (navigation,
+    footers, cookie banners) are dropped before ranking.
+    """
+    page_sentences = [page_text_units(page) for page in _pages(data)]
+    if len(page_sentences) > 1:
+        pages_per_sentence = Counter(sentence for sentences in page_sentences for sentence in set(sentences))
+        limit = max(2, len(page_sentences) // 2)
+        sentences = list(dict.fromkeys(
+            sentence for sentences in page_sentences for sentence in sentences
+            if pages_per_sentence[sentence] <= limit
+        ))
+    else:
+        sentences = list(dict.fromkeys(page_sentences[0])) if page_sentences else []
+    return " ".join(sentences[i] for i in rank_sentences(sentences, query, count, method))
+
+
 def generate_natural_language_summary(data, query):
     """
     Generate a natural language summary from extracted data
     """
     try:
+        if not isinstance(data, dict):
+            # Website crawl: one summary across all pages
+            summary = summarize_data(data, query)
+            parts = [f"Based on the content extracted from {len(data)} pages:"]
+            parts.append(summary or "The content has been successfully extracted and is available in structured format.")
+            return " ".join(parts)
+
         summary_parts = []
         
         # Extract metadata
@@ -23,7 +258,8 @@ def generate_natural_language_summary(data, query):
             if "article" in content:
                 article = content["article"]
                 title = article.get("title", "the content")
-                summary_parts.append(f"The article '{title}' discusses: {article.get('content', '')[:200]}...")
+                summary = summarize_data(data, query) or article.get("content", "")[:200]
+                summary_parts.append(f"The article '{title}' discusses: {summary}")
             
             # Images
             if "images" in content and content["images"]:
@@ -0,0 +1,198 @@
+"""
+Int8 ONNX Runtime backend for the summarization and QA models.
+
+Select it with WEBTAPI_AI_BACKEND=onnx. On first use each model is exported
+to ONNX with optimum, dynamically quantized to int8 and cached under
+WEBTAPI_ONNX_DIR; later workers load the cached files directly. Sessions use
+an explicit thread count (WEBTAPI_AI_THREADS) so several workers on one host
+do not oversubscribe the CPU. Requires `pip install optimum[onnxruntime]`.
+
+    python -m backend.onnx_models export    # build the quantized models ahead of deploys
+    python -m backend.onnx_models parity    # compare outputs and latency with PyTorch
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from .ai_enhancer import AI_THREADS, QA_MODEL, SUMMARIZER_MODEL, SUMMARY_KWARGS, load_torch_pipelines
+
+logger = logging.getLogger("webtapi.onnx")
+
+ONNX_DIR = os.getenv("WEBTAPI_ONNX_DIR", ".onnx_models")
+SEQ2SEQ_FILES = ("encoder_model", "decoder_model", "decoder_with_past_model")
+
+PARITY_SAMPLES = [
+    {
+        "context": (
+            "The city council voted seven to two on Tuesday night to approve the riverside park plan. "
+            "The plan sets aside forty acres for public green space and a new walking trail along the river. "
+            "Construction of the trail is expected to begin next spring, and a public information session "
+            "will be held at the library next month."
+        ),
+        "question": "How many acres are set aside for green space?",
+    },
+    {
+        "context": (
+            "The TrailRunner 3 is a lightweight trail running shoe from Acme Outdoors. It has a grippy "
+            "outsole and a breathable mesh upper, costs 129.99 US dollars and ships within two days. "
+            "Reviewers praised its comfort on long runs but noted that it runs half a size small."
+        ),
+        "question": "How much does the TrailRunner 3 cost?",
+    },
+]
+
+
+def _require_optimum():
+    try:
+        import onnxruntime  # noqa: F401
+        from optimum.onnxruntime import ORTModelForQuestionAnswering, ORTModelForSeq2SeqLM  # noqa: F401
+    except ImportError:
+        raise RuntimeError("The ONNX backend requires the 'optimum[onnxruntime]' package")
+
+
+def _model_dir(model_id):
+    return Path(ONNX_DIR) / model_id.replace("/", "--")
+
+
+def session_options(threads=AI_THREADS):
+    import onnxruntime
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = threads
+    options.inter_op_num_threads = 1
+    options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return options
+
+
+def export_quantized(model_id, seq2seq):
+    """Export a Hugging Face model to ONNX and quantize every graph to int8; returns the output directory"""
+    _require_optimum()
+    from optimum.onnxruntime import ORTModelForQuestionAnswering, ORTModelForSeq2SeqLM, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    target = _model_dir(model_id)
+    export_dir = target / "fp32"
+    model_class = ORTModelForSeq2SeqLM if seq2seq else ORTModelForQuestionAnswering
+    started = time.perf_counter()
+    model = model_class.from_pretrained(model_id, export=True)
+    model.save_pretrained(export_dir)
+
+    # Dynamic quantization: int8 weights, activations quantized at run time; no calibration data needed
+    config = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+    for onnx_file in sorted(export_dir.glob("*.onnx")):
+        ORTQuantizer.from_pretrained(export_dir, file_name=onnx_file.name).quantize(
+            save_dir=target, quantization_config=config
+        )
+    model.config.save_pretrained(target)
+    AutoTokenizer.from_pretrained(model_id).save_pretrained(target)
+    logger.info(f"Exported {model_id} to {target} in {time.perf_counter() - started:.1f}s")
+    return target
+
+
+def _quantized_dir(model_id, seq2seq):
+    target = _model_dir(model_id)
+    expected = [f"{name}_quantized.onnx" for name in SEQ2SEQ_FILES] if seq2seq else ["model_quantized.onnx"]
+    if all((target / name).exists() for name in expected):
+        return target
+    return export_quantized(model_id, seq2seq)
+
+
+def load_onnx_pipelines(threads=AI_THREADS):
+    """Return (summarizer, question_answerer) pipelines backed by int8 ONNX Runtime sessions"""
+    _require_optimum()
+    from optimum.onnxruntime import ORTModelForQuestionAnswering, ORTModelForSeq2SeqLM
+    from transformers import AutoTokenizer, pipeline
+
+    options = session_options(threads)
+    summarizer_dir = _quantized_dir(SUMMARIZER_MODEL, seq2seq=True)
+    summarizer_model = ORTModelForSeq2SeqLM.from_pretrained(
+        summarizer_dir,
+        encoder_file_name="encoder_model_quantized.onnx",
+        decoder_file_name="decoder_model_quantized.onnx",
+        decoder_with_past_file_name="decoder_with_past_model_quantized.onnx",
+        session_options=options,
+    )
+    qa_dir = _quantized_dir(QA_MODEL, seq2seq=False)
+    qa_model = ORTModelForQuestionAnswering.from_pretrained(
+        qa_dir, file_name="model_quantized.onnx", session_options=options
+    )
+    summarizer = pipeline("summarization", model=summarizer_model,
+                          tokenizer=AutoTokenizer.from_pretrained(summarizer_dir))
+    question_answerer = pipeline("question-answering", model=qa_model,
+                                 tokenizer=AutoTokenizer.from_pretrained(qa_dir))
+    return summarizer, question_answerer
+
+
+def token_f1(a, b):
+    """Token-overlap F1 between two strings (the SQuAD answer metric)"""
+    a_tokens, b_tokens = a.lower().split(), b.lower().split()
+    common = sum(min(a_tokens.count(token), b_tokens.count(token)) for token in set(a_tokens))
+    if not common:
+        return 0.0
+    precision, recall = common / len(a_tokens), common / len(b_tokens)
+    return 2 * precision * recall / (precision + recall)
+
+
+def _timed(func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def parity_check(samples=PARITY_SAMPLES, threads=AI_THREADS):
+    """
+    Run both backends on the same inputs. Reports the mean QA and summary
+    token F1 between ONNX and PyTorch outputs and the mean latency of each.
+    """
+    torch_summarizer, torch_qa = load_torch_pipelines(threads)
+    onnx_summarizer, onnx_qa = load_onnx_pipelines(threads)
+    report = {"samples": [], "threads": threads}
+    latencies = {"torch_qa_ms": [], "onnx_qa_ms": [], "torch_summary_ms": [], "onnx_summary_ms": []}
+
+    for sample in samples:
+        torch_answer, ms = _timed(torch_qa, question=sample["question"], context=sample["context"])
+        latencies["torch_qa_ms"].append(ms)
+        onnx_answer, ms = _timed(onnx_qa, question=sample["question"], context=sample["context"])
+        latencies["onnx_qa_ms"].append(ms)
+        torch_summary, ms = _timed(torch_summarizer, sample["context"], **SUMMARY_KWARGS)
+        latencies["torch_summary_ms"].append(ms)
+        onnx_summary, ms = _timed(onnx_summarizer, sample["context"], **SUMMARY_KWARGS)
+        latencies["onnx_summary_ms"].append(ms)
+        report["samples"].append({
+            "question": sample["question"],
+            "torch_answer": torch_answer["answer"],
+            "onnx_answer": onnx_answer["answer"],
+            "qa_f1": round(token_f1(torch_answer["answer"], onnx_answer["answer"]), 3),
+            "summary_f1": round(token_f1(torch_summary[0]["summary_text"], onnx_summary[0]["summary_text"]), 3),
+        })
+
+    for key, values in latencies.items():
+        report[key] = round(sum(values) / len(values), 1)
+    report["qa_f1"] = round(sum(s["qa_f1"] for s in report["samples"]) / len(samples), 3)
+    report["summary_f1"] = round(sum(s["summary_f1"] for s in report["samples"]) / len(samples), 3)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and check the int8 ONNX models")
+    parser.add_argument("command", choices=["export", "parity"])
+    parser.add_argument("--threads", type=int, default=AI_THREADS)
+    parser.add_argument("--min-f1", type=float, default=0.8, help="Fail the parity check below this QA F1")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "export":
+        export_quantized(SUMMARIZER_MODEL, seq2seq=True)
+        export_quantized(QA_MODEL, seq2seq=False)
+        return
+    report = parity_check(threads=args.threads)
+    print(json.dumps(report, indent=2))
+    if report["qa_f1"] < args.min_f1:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+On-demand sampling profiler for single API requests.
+
+A request opts in with the X-Profile: 1 header or ?profile=1. While it runs, a
+background thread samples the request thread's stack and the result is stored
+as collapsed stacks (the input format of flamegraph.pl and speedscope) under a
+profile id. Profiling is rate-limited; when a request does not opt in, no
+sampler thread exists and nothing is recorded.
+"""
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from cachetools import TTLCache
+
+logger = logging.getLogger("webtapi.profiling")
+
+SAMPLE_INTERVAL = float(os.getenv("WEBTAPI_PROFILE_INTERVAL", "0.005"))
+MIN_PROFILE_GAP = float(os.getenv("WEBTAPI_PROFILE_MIN_GAP", "10"))
+MAX_CONCURRENT_PROFILES = int(os.getenv("WEBTAPI_PROFILE_MAX_CONCURRENT", "1"))
+ADMIN_TOKEN = os.getenv("WEBTAPI_ADMIN_TOKEN")
+
+profiles = TTLCache(maxsize=50, ttl=3600)
+
+
+class SamplingProfiler:
+    """Sample one thread's Python stack at a fixed interval"""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="webtapi-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        """Return the samples as collapsed stack lines: "frame;frame;frame count" """
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+class ProfileGate:
+    """Rate limit profiling: at most N at once and a minimum gap between starts"""
+
+    def __init__(self, min_gap=MIN_PROFILE_GAP, max_concurrent=MAX_CONCURRENT_PROFILES):
+        self.min_gap = min_gap
+        self.max_concurrent = max_concurrent
+        self._lock = threading.Lock()
+        self._active = 0
+        self._last_start = 0.0
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._active >= self.max_concurrent or now - self._last_start < self.min_gap:
+                return False
+            self._active += 1
+            self._last_start = now
+            return True
+
+    def release(self):
+        with self._lock:
+            self._active -= 1
+
+
+gate = ProfileGate()
+
+
+def profile_requested(request):
+    """Check the X-Profile header and the profile query parameter"""
+    flag = request.headers.get("X-Profile") or request.query_params.get("profile")
+    return flag in ("1", "true", "yes")
+
+
+class ProfileSession:
+    """Outcome of a profiling request: status is "off", "rate_limited" or "recorded" """
+
+    def __init__(self, status, profile_id=None):
+        self.status = status
+        self.profile_id = profile_id
+
+
+@contextmanager
+def maybe_profile(enabled, label):
+    """
+    Profile the enclosed block on the current thread when enabled and the
+    rate limit allows. Yields a ProfileSession; the stored profile can be
+    fetched with get_profile(session.profile_id) afterwards.
+    """
+    if not enabled:
+        yield ProfileSession("off")
+        return
+    if not gate.acquire():
+        logger.info(f"Profiling request for {label} rejected by rate limit")
+        yield ProfileSession("rate_limited")
+        return
+
+    session = ProfileSession("recorded", str(uuid.uuid4()))
+    profiler = SamplingProfiler(threading.get_ident())
+    started = time.time()
+    profiler.start()
+    try:
+        yield session
+    finally:
+        profiler.stop()
+        gate.release()
+        profiles[session.profile_id] = {
+            "label": label,
+            "started": started,
+            "duration_s": round(time.time() - started, 3),
+            "samples": profiler.samples,
+            "interval_s": profiler.interval,
+            "collapsed": profiler.collapsed(),
+        }
+        logger.info(f"Stored profile {session.profile_id} for {label} ({profiler.samples} samples)")
+
+
+def get_profile(profile_id):
+    return profiles.get(profile_id)
+
+
+def list_profiles():
+    return [
+        {key: value for key, value in profile.items() if key != "collapsed"} | {"profile_id": profile_id}
+        for profile_id, profile in list(profiles.items())
+    ]
+
+
+def is_admin(request):
+    """Admin endpoints are disabled unless WEBTAPI_ADMIN_TOKEN is set"""
+    if not ADMIN_TOKEN:
+        return False
+    # Constant-time comparison; bytes, because compare_digest rejects non-ASCII str
+    supplied = request.headers.get("X-Admin-Token", "").encode("utf-8")
+    return hmac.compare_digest(supplied, ADMIN_TOKEN.encode("utf-8"))
@@ -0,0 +1,212 @@
+"""
+Token-bucket rate limiting for API keys.
+
+A key with a daily limit L gets a bucket of L tokens that refills at
+L / 86400 tokens per second. The sustained rate is L per day, and an idle key
+may burst up to L at once, so the most a key can spend in any rolling 24 hours
+is just under 2L (a full bucket plus a day of refill). Buckets live in a
+pluggable store:
+
+    memory://                    per-process, sharded locks (single worker)
+    sqlite:///path/to/limits.db  shared by all workers on one host
+    redis://host:port/db         shared by every host
+
+A check is a single O(1) read-modify-write, done atomically inside the store.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("webtapi.ratelimit")
+
+WINDOW_SECONDS = 86400
+LOCAL_SHARDS = 64
+SWEEP_EVERY = 1024
+
+
+def refill(tokens, updated, now, capacity, rate):
+    return min(capacity, tokens + max(0.0, now - updated) * rate)
+
+
+class RateLimitDecision:
+    """Result of one check: allowed, the limit, tokens remaining and seconds until the next token"""
+
+    def __init__(self, allowed, limit, remaining, retry_after):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.retry_after = retry_after
+
+    def headers(self):
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(int(self.remaining)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, int(self.retry_after + 0.999)))
+        return headers
+
+
+class LocalBucketStore:
+    """In-process buckets split over independently locked shards"""
+
+    def __init__(self, shards=LOCAL_SHARDS):
+        self._shards = [({}, threading.Lock()) for _ in range(shards)]
+        self._ops = 0
+
+    def take(self, key, capacity, rate, cost=1):
+        """Take cost tokens if available; returns (allowed, tokens left)"""
+        buckets, lock = self._shards[hash(key) % len(self._shards)]
+        now = time.time()
+        with lock:
+            tokens, updated = buckets.get(key, (capacity, now))[:2]
+            tokens = refill(tokens, updated, now, capacity, rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            buckets[key] = (tokens, now, capacity, rate)
+        self._ops += 1
+        if self._ops % SWEEP_EVERY == 0:
+            self._sweep(buckets, lock)
+        return allowed, tokens
+
+    def _sweep(self, buckets, lock):
+        # A bucket that has refilled completely is identical to a new one, so dropping it is lossless;
+        # each bucket is judged by its own capacity and rate, not the caller's
+        now = time.time()
+        with lock:
+            full = [key for key, (tokens, updated, capacity, rate) in buckets.items()
+                    if refill(tokens, updated, now, capacity, rate) >= capacity]
+            for key in full:
+                del buckets[key]
+
+
+class SQLiteBucketStore:
+    """
+    Buckets in a SQLite file, shared by every worker process on the host.
+    Each row records when its bucket will be full again; rows past that time
+    are as good as absent and are swept every SWEEP_EVERY checks.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._ops = 0
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL, full_at REAL)"
+        )
+        # Files created before rows were swept
+        if "full_at" not in {row[1] for row in conn.execute("PRAGMA table_info(buckets)")}:
+            conn.execute("ALTER TABLE buckets ADD COLUMN full_at REAL")
+        conn.execute("CREATE INDEX IF NOT EXISTS buckets_full_at ON buckets (full_at)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def take(self, key, capacity, rate, cost=1):
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = refill(row[0], row[1], now, capacity, rate) if row else capacity
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            conn.execute("INSERT OR REPLACE INTO buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?)",
+                         (key, tokens, now, now + (capacity - tokens) / rate))
+        self._ops += 1
+        if self._ops % SWEEP_EVERY == 0:
+            self.sweep()
+        return allowed, tokens
+
+    def sweep(self):
+        """Delete buckets that have refilled completely (or predate full_at); returns how many"""
+        with self._transaction() as conn:
+            return conn.execute("DELETE FROM buckets WHERE full_at IS NULL OR full_at <= ?",
+                                (time.time(),)).rowcount
+
+
+class RedisBucketStore:
+    """Buckets in Redis, updated by a Lua script so each check is one atomic round trip"""
+
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local cost = tonumber(ARGV[3])
+    local clock = redis.call('TIME')
+    local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+    local allowed = 0
+    if tokens >= cost then
+        tokens = tokens - cost
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+    redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url, prefix="webtapi:ratelimit"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RedisBucketStore requires the 'redis' package")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._take = self.client.register_script(self.SCRIPT)
+
+    def take(self, key, capacity, rate, cost=1):
+        allowed, tokens = self._take(keys=[f"{self.prefix}:{key}"], args=[capacity, rate, cost])
+        return bool(allowed), float(tokens)
+
+
+def open_bucket_store(spec):
+    """Open a bucket store from memory://, sqlite:///path or redis://host:port/db"""
+    if spec.startswith("memory://"):
+        return LocalBucketStore()
+    if spec.startswith("sqlite:///"):
+        return SQLiteBucketStore(spec[len("sqlite:///"):])
+    if spec.startswith(("redis://", "rediss://")):
+        return RedisBucketStore(spec)
+    raise ValueError(f"Unsupported rate limit store: {spec}")
+
+
+class RateLimiter:
+    """Per-key token buckets sized from a limit per WINDOW_SECONDS"""
+
+    def __init__(self, store, window=WINDOW_SECONDS):
+        self.store = store
+        self.window = window
+
+    def check(self, key, limit, cost=1):
+        """Consume cost tokens from key's bucket; cost=0 only reports the current state"""
+        rate = limit / self.window
+        allowed, tokens = self.store.take(key, limit, rate, cost)
+        retry_after = 0.0 if allowed else (cost - tokens) / rate
+        return RateLimitDecision(allowed, limit, tokens, retry_after)
+
+
+limiter = RateLimiter(open_bucket_store(os.getenv("WEBTAPI_RATE_LIMIT_STORE", "memory://")))
@@ -0,0 +1,212 @@
+"""
+Stale-while-revalidate refresh for published endpoints.
+
+An endpoint created with a refresh policy keeps the URL, plan and extraction
+mode it was built from. RefreshScheduler re-extracts it in the background
+every interval (with jitter, so endpoints created together do not refresh
+together) on a small worker pool. Readers keep getting the stored entry
+until a refresh succeeds, and then the entry is swapped in one assignment.
+
+Refreshes send If-None-Match / If-Modified-Since when the page gave us an
+ETag or Last-Modified. A 304, or a body identical to the last one, only
+extends the entry's lifetime; the data and its version (and so the API's
+ETag) change only when the page did. Failures keep the last good data and
+retry with backoff, but do not extend its lifetime: an endpoint whose source
+keeps failing still expires with the cache TTL.
+
+All cache reads and writes happen on the event loop; only the fetch and
+extraction run in worker threads.
+"""
+import asyncio
+import hashlib
+import heapq
+import logging
+import os
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from .fetcher import fetch
+from .metrics import stage
+from .scraper import extract_data, get_random_user_agent
+
+logger = logging.getLogger("webtapi.refresh")
+
+REFRESH_WORKERS = int(os.getenv("WEBTAPI_REFRESH_WORKERS", "4"))
+MIN_REFRESH_SECONDS = int(os.getenv("WEBTAPI_MIN_REFRESH_SECONDS", "300"))
+# Each refresh is scheduled up to this fraction of its interval early
+REFRESH_JITTER = 0.2
+# Refresh no later than this fraction of the cache TTL, so entries never expire while refreshed
+MAX_TTL_FRACTION = 0.8
+RETRY_BASE_SECONDS = 60
+
+
+def response_validators(response):
+    """ETag, Last-Modified and body hash of a fetched page, compared by the next refresh"""
+    return {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "content_hash": hashlib.sha1(response.content).hexdigest(),
+    }
+
+
+def make_policy(interval_seconds, ttl, response=None):
+    """
+    Refresh policy for a new endpoint; the interval is clamped to [MIN_REFRESH_SECONDS, 0.8 * ttl].
+    Pass the response the endpoint was extracted from so the first refresh can be conditional.
+    """
+    interval = min(max(float(interval_seconds), MIN_REFRESH_SECONDS), ttl * MAX_TTL_FRACTION)
+    policy = {
+        "interval": interval,
+        "etag": None,
+        "last_modified": None,
+        "content_hash": None,
+        "last_refresh": None,
+    }
+    if response is not None:
+        policy.update(response_validators(response))
+    return policy
+
+
+def _jittered(seconds):
+    return seconds * (1 - REFRESH_JITTER * random.random())
+
+
+def refresh_entry(entry):
+    """
+    Re-fetch and re-extract one entry (runs in a worker thread).
+    Returns ("not_modified", policy_updates), ("updated", data, policy_updates) or ("failed", error).
+    """
+    source = entry["source"]
+    policy = entry["refresh"]
+    url = source["url"]
+    headers = {"User-Agent": get_random_user_agent()}
+    if policy.get("etag"):
+        headers["If-None-Match"] = policy["etag"]
+    if policy.get("last_modified"):
+        headers["If-Modified-Since"] = policy["last_modified"]
+    try:
+        with stage("refresh_fetch"):
+            response = fetch(url, headers=headers, timeout=30)
+        if response.status_code == 304:
+            return ("not_modified", {
+                "etag": response.headers.get("ETag") or policy.get("etag"),
+                "last_modified": response.headers.get("Last-Modified") or policy.get("last_modified"),
+            })
+        validators = response_validators(response)
+        if validators["content_hash"] == policy.get("content_hash"):
+            return ("not_modified", validators)
+        with stage("refresh_extract"):
+            data = extract_data(url, source["plan"], response=response,
+                                extraction_mode=source["extraction_mode"])
+        return ("updated", data, validators)
+    except Exception as e:
+        return ("failed", str(e))
+
+
+class RefreshScheduler:
+    """Background refresh of cache entries that carry a "refresh" policy"""
+
+    def __init__(self, cache, workers=REFRESH_WORKERS, on_update=None, on_touch=None):
+        """
+        on_update(endpoint_id, entry) runs with the new cache entry after data changed and on_touch(endpoint_id) after
+        an unchanged refresh extended the entry's lifetime; both run on the worker pool.
+        """
+        self.cache = cache
+        self.workers = workers
+        self.on_update = on_update
+        self.on_touch = on_touch
+        self._due = []
+        self._scheduled = set()
+        self._failures = {}
+        self._wake = None
+        self._slots = None
+        self._pool = None
+        self._task = None
+
+    def register(self, endpoint_id, delay=None):
+        """Schedule an endpoint's next refresh (default: one jittered interval from now)"""
+        entry = self.cache.get(endpoint_id)
+        if not entry or "refresh" not in entry:
+            return
+        if delay is None:
+            delay = _jittered(entry["refresh"]["interval"])
+        heapq.heappush(self._due, (time.monotonic() + delay, endpoint_id))
+        self._scheduled.add(endpoint_id)
+        if self._wake is not None:
+            self._wake.set()
+
+    def start(self):
+        """Start the scheduler on the running event loop"""
+        self._wake = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="webtapi-refresh")
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            now = time.monotonic()
+            while self._due and self._due[0][0] <= now:
+                _, endpoint_id = heapq.heappop(self._due)
+                self._scheduled.discard(endpoint_id)
+                # Wait for a free worker here, so a backlog stays in the heap rather than in tasks
+                await self._slots.acquire()
+                asyncio.get_running_loop().create_task(self._refresh(endpoint_id))
+            timeout = self._due[0][0] - time.monotonic() if self._due else None
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _refresh(self, endpoint_id):
+        try:
+            entry = self.cache.get(endpoint_id)
+            if not entry or "refresh" not in entry:
+                self._failures.pop(endpoint_id, None)
+                return
+            result = await asyncio.get_running_loop().run_in_executor(self._pool, refresh_entry, entry)
+            self._apply(endpoint_id, entry, result)
+        except Exception as e:
+            logger.error(f"Refresh of {endpoint_id} failed: {str(e)}")
+        finally:
+            self._slots.release()
+
+    def _apply(self, endpoint_id, entry, result):
+        current = self.cache.get(endpoint_id)
+        if current is not entry:
+            # Expired or replaced while the refresh ran
+            return
+        status = result[0]
+        interval = entry["refresh"]["interval"]
+        if status == "failed":
+            failures = self._failures[endpoint_id] = self._failures.get(endpoint_id, 0) + 1
+            delay = min(interval, RETRY_BASE_SECONDS * 2 ** (failures - 1))
+            logger.warning(f"Refresh of {endpoint_id} failed ({failures} in a row): {result[1]}")
+        else:
+            self._failures.pop(endpoint_id, None)
+            policy = dict(entry["refresh"], **result[-1], last_refresh=time.time())
+            updated = dict(entry, refresh=policy)
+            if status == "updated":
+                updated["data"] = result[1]
+                updated["version"] = uuid.uuid4().hex
+            # Re-assigning also restarts the entry's TTL, so a refreshed endpoint does not expire
+            self.cache[endpoint_id] = updated
+            if status == "updated" and self.on_update is not None:
+                self._pool.submit(self.on_update, endpoint_id, updated)
+            elif status == "not_modified" and self.on_touch is not None:
+                self._pool.submit(self.on_touch, endpoint_id)
+            delay = interval
+        if endpoint_id not in self._scheduled:
+            self.register(endpoint_id, _jittered(delay))
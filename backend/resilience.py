@@ -0,0 +1,189 @@
+"""
+Per-host health for the fetch path: adaptive timeouts, a global retry budget
+and circuit breakers.
+
+Each host keeps a smoothed latency and its deviation (the way TCP estimates
+its retransmission timeout), and a request to that host waits at most
+srtt + 4 * deviation, never less than MIN_TIMEOUT or more than the caller's
+timeout. Consecutive timeouts, connection errors or 5xx responses open the
+host's circuit: calls fail immediately until the open period ends, then a
+single probe decides whether it closes again. Retries are jittered and drawn
+from one budget shared by all hosts, so an outage cannot multiply outbound
+traffic.
+"""
+import os
+import random
+import threading
+import time
+import requests
+from cachetools import LRUCache
+
+MAX_RETRIES = int(os.getenv("WEBTAPI_FETCH_RETRIES", "2"))
+# Each request earns this fraction of a retry; the budget starts with RETRY_RESERVE
+RETRY_BUDGET_RATIO = float(os.getenv("WEBTAPI_RETRY_BUDGET_RATIO", "0.1"))
+RETRY_RESERVE = 10.0
+RETRY_BUDGET_MAX = 100.0
+BACKOFF_BASE = 0.2
+BACKOFF_CAP = 2.0
+MIN_TIMEOUT = float(os.getenv("WEBTAPI_MIN_FETCH_TIMEOUT", "2"))
+CONNECT_TIMEOUT = 5.0
+# Samples needed before a host's timeout is shortened
+MIN_SAMPLES = 5
+EWMA_ALPHA = 0.125
+EWMA_BETA = 0.25
+BREAKER_FAILURES = int(os.getenv("WEBTAPI_BREAKER_FAILURES", "5"))
+BREAKER_OPEN_SECONDS = float(os.getenv("WEBTAPI_BREAKER_OPEN_SECONDS", "30"))
+BREAKER_MAX_OPEN_SECONDS = 300.0
+MAX_TRACKED_HOSTS = 10000
+
+RETRY_STATUSES = {429, 502, 503, 504}
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of contacting a host whose circuit is open"""
+
+
+class RetryBudget:
+    """Token bucket of retries shared by every host"""
+
+    def __init__(self, ratio=RETRY_BUDGET_RATIO, reserve=RETRY_RESERVE, maximum=RETRY_BUDGET_MAX):
+        self.ratio = ratio
+        self.maximum = maximum
+        self.tokens = reserve
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.maximum, self.tokens + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class HostHealth:
+    """Latency estimate and circuit breaker for one host"""
+
+    def __init__(self):
+        self.srtt = None
+        self.rttvar = 0.0
+        self.samples = 0
+        self.state = CLOSED
+        self.failures = 0
+        self.open_until = 0.0
+        self.open_seconds = BREAKER_OPEN_SECONDS
+        # Token of the request currently probing a half-open circuit
+        self.probe = None
+        self._lock = threading.Lock()
+
+    def timeout(self, cap):
+        """(connect, read) timeout for the next attempt, at most cap seconds"""
+        with self._lock:
+            if self.samples >= MIN_SAMPLES:
+                read = min(cap, max(MIN_TIMEOUT, self.srtt + 4 * self.rttvar))
+            else:
+                read = cap
+        return (min(CONNECT_TIMEOUT, read), read)
+
+    def allow(self):
+        """
+        Whether a request may be sent now; in half-open state only one probe at a time.
+        Returns False, True, or for the probe a token to hand back to end_probe.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if time.monotonic() < self.open_until:
+                    return False
+                self.state = HALF_OPEN
+                self.probe = None
+            if self.probe is not None:
+                return False
+            self.probe = object()
+            return self.probe
+
+    def end_probe(self, permit):
+        """Free the probe slot if permit (what allow() returned) still holds it; any outcome"""
+        with self._lock:
+            if permit is self.probe:
+                self.probe = None
+
+    def observe(self, seconds):
+        """Fold one latency sample into the smoothed estimate"""
+        with self._lock:
+            if self.srtt is None:
+                self.srtt = seconds
+                self.rttvar = seconds / 2
+            else:
+                self.rttvar = (1 - EWMA_BETA) * self.rttvar + EWMA_BETA * abs(self.srtt - seconds)
+                self.srtt = (1 - EWMA_ALPHA) * self.srtt + EWMA_ALPHA * seconds
+            self.samples += 1
+
+    def record_success(self, seconds):
+        self.observe(seconds)
+        with self._lock:
+            self.failures = 0
+            self.probe = None
+            if self.state != CLOSED:
+                self.state = CLOSED
+                self.open_seconds = BREAKER_OPEN_SECONDS
+
+    def record_failure(self):
+        """Count a timeout, connection error or 5xx; returns True if this opened the circuit"""
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                # The probe failed: stay open for longer each time
+                self.open_seconds = min(BREAKER_MAX_OPEN_SECONDS, self.open_seconds * 2)
+            elif self.failures < BREAKER_FAILURES or self.state == OPEN:
+                return False
+            self.state = OPEN
+            self.probe = None
+            self.open_until = time.monotonic() + self.open_seconds
+            return True
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "latency": round(self.srtt, 3) if self.srtt is not None else None,
+                "deviation": round(self.rttvar, 3),
+                "samples": self.samples,
+                "consecutive_failures": self.failures,
+            }
+
+
+class HostRegistry:
+    """HostHealth per host, keeping the most recently used MAX_TRACKED_HOSTS"""
+
+    def __init__(self, maxsize=MAX_TRACKED_HOSTS):
+        self._hosts = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    def get(self, host):
+        with self._lock:
+            health = self._hosts.get(host)
+            if health is None:
+                health = self._hosts[host] = HostHealth()
+            return health
+
+    def snapshot(self):
+        with self._lock:
+            hosts = list(self._hosts.items())
+        return {host: health.snapshot() for host, health in hosts}
+
+
+def backoff(attempt, retry_after=None):
+    """Full-jitter exponential backoff; honours a numeric Retry-After up to BACKOFF_CAP"""
+    if retry_after:
+        try:
+            return min(BACKOFF_CAP, max(0.0, float(retry_after)))
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
@@ -0,0 +1,223 @@
+"""
+Response rendering for /api/{endpoint_id}.
+
+Results can be paged with an opaque cursor (?limit=&cursor=), over the pages
+of a crawl or over a list inside a single result (?items=content.links), and
+trimmed with ?fields=url,content.tables.json. Bodies are serialized with
+orjson, compressed with brotli or gzip, streamed on first request and then
+served from a byte-bounded cache. Every variant carries an ETag derived from
+the stored result's version, so unchanged data is answered with 304 without
+serializing anything.
+"""
+import base64
+import hashlib
+import logging
+import os
+import threading
+import zlib
+import orjson
+from cachetools import LRUCache
+from fastapi import HTTPException
+from fastapi.responses import Response, StreamingResponse
+from .metrics import record_cache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger("webtapi.responses")
+
+MAX_PAGE_SIZE = 1000
+BODY_CACHE_BYTES = int(os.getenv("WEBTAPI_BODY_CACHE_MB", "256")) * 1024 * 1024
+# Larger bodies are streamed every time rather than cached
+MAX_CACHED_BODY = BODY_CACHE_BYTES // 8
+
+_bodies = LRUCache(maxsize=BODY_CACHE_BYTES, getsizeof=len)
+_bodies_lock = threading.Lock()
+
+
+def encode_json(obj):
+    return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+
+def choose_encoding(accept_encoding):
+    accepted = {part.split(";")[0].strip() for part in (accept_encoding or "").lower().split(",")}
+    if "br" in accepted and brotli is not None:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return "identity"
+
+
+class Compressor:
+    """Incremental compressor for one response body"""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=5)
+        elif encoding == "gzip":
+            self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        else:
+            self._compressor = None
+
+    def compress(self, chunk):
+        if self._compressor is None:
+            return chunk
+        if self.encoding == "br":
+            return self._compressor.process(chunk)
+        return self._compressor.compress(chunk)
+
+    def flush(self):
+        if self._compressor is None:
+            return b""
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def _field_tree(fields):
+    """Turn ["url", "content.tables.json"] into {"url": {}, "content": {"tables": {"json": {}}}}"""
+    tree = {}
+    for field in fields:
+        node = tree
+        for part in field.split("."):
+            node = node.setdefault(part, {})
+    return tree
+
+
+def project(obj, tree):
+    """Keep only the paths in tree; lists are projected element by element"""
+    if not tree:
+        return obj
+    if isinstance(obj, list):
+        return [project(item, tree) for item in obj]
+    if isinstance(obj, dict):
+        return {key: project(obj[key], subtree) for key, subtree in tree.items() if key in obj}
+    return obj
+
+
+def _lookup(obj, path):
+    for part in path.split("."):
+        if not isinstance(obj, dict) or part not in obj:
+            raise HTTPException(400, f"No list at items={path}")
+        obj = obj[part]
+    if not isinstance(obj, list):
+        raise HTTPException(400, f"No list at items={path}")
+    return obj
+
+
+def encode_cursor(offset):
+    return base64.urlsafe_b64encode(str(offset).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        offset = int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode())
+    except ValueError:
+        raise HTTPException(400, "Invalid cursor")
+    if offset < 0:
+        raise HTTPException(400, "Invalid cursor")
+    return offset
+
+
+class View:
+    """The part of a stored result a request asks for"""
+
+    def __init__(self, data, fields=None, limit=None, cursor=None, items=None):
+        self.tree = _field_tree(fields) if fields else None
+        self.paged = limit is not None or cursor is not None or items is not None
+        if not self.paged:
+            self.data = data
+            return
+
+        if items:
+            elements = _lookup(data, items)
+        elif not isinstance(data, dict):
+            elements = data
+        else:
+            raise HTTPException(400, "Pagination over a single-page result needs items=<path to a list>")
+        limit = 100 if limit is None else int(limit)
+        if limit < 1:
+            raise HTTPException(400, "limit must be a positive integer")
+        limit = min(limit, MAX_PAGE_SIZE)
+        offset = decode_cursor(cursor) if cursor else 0
+        self.data = elements[offset:offset + limit]
+        self.total = len(elements)
+        self.next_cursor = encode_cursor(offset + limit) if offset + limit < len(elements) else None
+
+    def chunks(self):
+        """Yield the JSON body in pieces, one list element at a time"""
+        if self.paged:
+            yield b'{"total":' + encode_json(self.total) + b',"next_cursor":' + encode_json(self.next_cursor)
+            yield b',"data":'
+        if not isinstance(self.data, dict):
+            # A list of pages or a CompactCrawl, whose pages are rebuilt one at a time here
+            yield b"["
+            for i, item in enumerate(self.data):
+                yield (b"," if i else b"") + encode_json(project(item, self.tree))
+            yield b"]"
+        else:
+            yield encode_json(project(self.data, self.tree))
+        if self.paged:
+            yield b"}"
+
+
+def make_etag(version, params):
+    digest = hashlib.sha1(repr((version, params)).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidates = {tag.strip() for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates or etag[2:] in candidates
+
+
+def render_endpoint(endpoint_id, entry, params, headers):
+    """Build the response for a stored endpoint entry given query params and request headers"""
+    fields = [field for field in (params.get("fields") or "").split(",") if field.strip()]
+    limit = params.get("limit")
+    if limit is not None and (not str(limit).isdigit() or int(limit) < 1):
+        raise HTTPException(400, "limit must be a positive integer")
+    view_params = (tuple(sorted(fields)), limit, params.get("cursor"), params.get("items"))
+    etag = make_etag(entry.get("version", endpoint_id), view_params)
+    encoding = choose_encoding(headers.get("accept-encoding"))
+    response_headers = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if encoding != "identity":
+        response_headers["Content-Encoding"] = encoding
+
+    if _etag_matches(headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Vary": "Accept-Encoding"})
+
+    key = (endpoint_id, etag, encoding)
+    with _bodies_lock:
+        body = _bodies.get(key)
+    record_cache("response_bodies", body is not None)
+    if body is not None:
+        return Response(content=body, media_type="application/json", headers=response_headers)
+
+    view = View(entry["data"], fields, limit, params.get("cursor"), params.get("items"))
+
+    def stream():
+        compressor = Compressor(encoding)
+        parts = []
+        size = 0
+        for chunk in view.chunks():
+            compressed = compressor.compress(chunk)
+            if compressed:
+                size += len(compressed)
+                if size <= MAX_CACHED_BODY:
+                    parts.append(compressed)
+                yield compressed
+        tail = compressor.flush()
+        size += len(tail)
+        yield tail
+        if size <= MAX_CACHED_BODY:
+            parts.append(tail)
+            with _bodies_lock:
+                _bodies[key] = b"".join(parts)
+
+    return StreamingResponse(stream(), media_type="application/json", headers=response_headers)
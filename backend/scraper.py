@@ -1,15 +1,25 @@
 import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-from htmldate import find_date
 import re
 from urllib.parse import urljoin, urlparse
 import logging
 import random
 from .specialized_extractors import get_domain_specific_rules
+from .fetcher import fetch
+from .decoding import decode_response
+from .structured_data import STRUCTURED_INTENTS, extract_structured_data, resolve_for_plan, structured_links
+from .dates import needs_timestamp, resolve_publication_date
+from .metrics import stage
 
 logger = logging.getLogger("webtapi.scraper")
 
+# bs4, pandas and trafilatura are imported where they are first needed so that
+# importing this module (and the API) stays fast; see backend/warmup.py
+
+def make_soup(html):
+    """Parse HTML with BeautifulSoup and lxml"""
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, 'lxml')
+
 def get_random_user_agent():
     """Return a random user agent to avoid detection"""
     user_agents = [
@@ -39,19 +49,52 @@ def extract_with_selectors(soup, selectors, attributes=None):
                 results.append(element.get_text(strip=True))
     return results
 
-def extract_article_content(html_content, url):
+# Article extraction tiers, from cheapest to most thorough
+EXTRACTION_MODES = ("fast", "balanced", "precise")
+
+def extract_dense_text(soup):
+    """
+    Single-pass density heuristic: keep the paragraphs of the block that holds
+    the most non-link paragraph text
+    """
+    blocks = {}
+    for p in soup.find_all("p"):
+        text = p.get_text(" ", strip=True)
+        if len(text) < 25:
+            continue
+        link_chars = sum(len(a.get_text(strip=True)) for a in p.find_all("a"))
+        if link_chars > len(text) / 2:
+            continue
+        block = blocks.setdefault(id(p.parent), [0, []])
+        block[0] += len(text)
+        block[1].append(text)
+    
+    if not blocks:
+        return "\n\n".join(p.get_text(strip=True) for p in soup.find_all("p"))
+    return "\n\n".join(max(blocks.values(), key=lambda block: block[0])[1])
+
+def extract_article_content(html_content, url, soup=None, mode="precise"):
     """
-    Extract article content using trafilatura
+    Extract article content.
+    "fast" uses the density heuristic only, "balanced" runs trafilatura without
+    its fallback extractors, and "precise" runs trafilatura with fallbacks.
+    Pass the page's existing soup to avoid parsing it again.
     """
+    if soup is None:
+        soup = make_soup(html_content)
+    title = soup.find('title')
+    title_text = title.get_text() if title else "No title found"
+    
+    if mode == "fast":
+        return {
+            "title": title_text,
+            "content": extract_dense_text(soup)
+        }
+    
     try:
         from trafilatura import extract
-        article_text = extract(html_content, url=url)
+        article_text = extract(html_content, url=url, no_fallback=(mode == "balanced"))
         if article_text:
-            # Extract title from the HTML
-            soup = BeautifulSoup(html_content, 'lxml')
-            title = soup.find('title')
-            title_text = title.get_text() if title else "No title found"
-            
             return {
                 "title": title_text,
                 "content": article_text
@@ -59,143 +102,209 @@ def extract_article_content(html_content, url):
     except Exception as e:
         logger.warning(f"Article extraction with trafilatura failed: {str(e)}")
     
+    if mode == "balanced":
+        return {
+            "title": title_text,
+            "content": extract_dense_text(soup)
+        }
+    
     # Fallback: simple paragraph extraction
-    soup = BeautifulSoup(html_content, 'lxml')
     paragraphs = [p.get_text(strip=True) for p in soup.find_all("p")]
-    title = soup.find('title')
-    title_text = title.get_text() if title else "No title found"
     
     return {
         "title": title_text,
         "content": "\n\n".join(paragraphs)
     }
 
-def extract_data(url: str, plan: dict) -> dict:
-    """Extract structured data based on AI-generated plan"""
+def build_structured_result(url, response, record, html, structured, plan):
+    """Result for pages answered entirely from embedded structured data"""
+    content = {"structured": record}
+    # Same article shape as the DOM tier, so summaries and search see the page text
+    if record["type"] == "Article":
+        content["article"] = {"title": record["headline"], "content": record["body"]}
+    elif record["type"] == "Product":
+        content["article"] = {"title": record["name"], "content": record["description"] or ""}
+    else:
+        details = record["telephone"] + record["email"] + ([record["address"]] if record["address"] else [])
+        content["article"] = {"title": record["name"], "content": "\n".join(map(str, details))}
+    if "links" in plan["elements"]:
+        content["links"] = structured_links(record)
+    
+    # Stay off the DOM here too: no soup and no htmldate
+    timestamp, timestamp_source = None, "skipped"
+    if needs_timestamp(plan):
+        timestamp, timestamp_source = resolve_publication_date(
+            html, response.headers, structured=structured, allow_htmldate=False
+        )
+    
+    return {
+        "metadata": {
+            "url": url,
+            "timestamp": timestamp or "Unknown",
+            "timestamp_source": timestamp_source,
+            "status_code": response.status_code,
+            "domain_rules_applied": False,
+            "extraction_tier": "structured_data"
+        },
+        "content": content
+    }
+
+def extract_data(url: str, plan: dict, response=None, extraction_mode: str = "precise") -> dict:
+    """
+    Extract structured data based on AI-generated plan.
+    Pass an already fetched response (e.g. from the crawler) to skip the download,
+    and an extraction_mode from EXTRACTION_MODES to trade article quality for speed.
+    """
     try:
-        headers = {
-            "User-Agent": get_random_user_agent(),
-            "Accept-Language": "en-US,en;q=0.9",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Accept-Encoding": "gzip, deflate",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1"
-        }
+        domain = urlparse(url).netloc
+        if response is None:
+            with stage("fetch", domain):
+                response = fetch(url, headers={"User-Agent": get_random_user_agent()}, timeout=30)
         
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
+        # Decode once and share the text and parse with every extractor below
+        with stage("decode", domain):
+            html = decode_response(response)
         
-        soup = BeautifulSoup(response.content, 'lxml')
+        # Structured data tier: JSON-LD/OpenGraph/microdata, no DOM needed
+        structured = structured_record = None
+        if plan.get("intent") in STRUCTURED_INTENTS:
+            with stage("structured_data", domain):
+                structured = extract_structured_data(html)
+                structured_record, satisfied = resolve_for_plan(structured, plan)
+            if satisfied:
+                return build_structured_result(url, response, structured_record, html, structured, plan)
+        
+        with stage("soup", domain):
+            soup = make_soup(html)
         
         # Check for domain-specific rules
         domain_rules = get_domain_specific_rules(url)
         
+        # Metadata and <time> tags first, htmldate only when the page has neither
+        timestamp, timestamp_source = None, "skipped"
+        if needs_timestamp(plan):
+            with stage("date", domain):
+                timestamp, timestamp_source = resolve_publication_date(
+                    html, response.headers, soup=soup, structured=structured
+                )
+        
         results = {
             "metadata": {
                 "url": url,
-                "timestamp": find_date(response.text) or "Unknown",
+                "timestamp": timestamp or "Unknown",
+                "timestamp_source": timestamp_source,
                 "status_code": response.status_code,
-                "domain_rules_applied": domain_rules is not None
+                "domain_rules_applied": domain_rules is not None,
+                "extraction_tier": "dom"
             },
             "content": {}
         }
+        if structured_record:
+            results["content"]["structured"] = structured_record
         
         # Extract based on AI plan
         if "text" in plan["elements"]:
-            article_content = extract_article_content(response.text, url)
+            with stage(f"article_{extraction_mode}", domain):
+                article_content = extract_article_content(html, url, soup=soup, mode=extraction_mode)
             results["content"]["article"] = article_content
         
         # Apply domain-specific rules if available
         if domain_rules:
-            for content_type, rules in domain_rules.items():
-                if content_type in plan["elements"] or "all" in plan["elements"]:
-                    extracted = extract_with_selectors(soup, rules["selectors"], rules.get("attributes"))
-                    if extracted:
-                        results["content"][content_type] = extracted
+            with stage("domain_rules", domain):
+                for content_type, rules in domain_rules.items():
+                    if content_type in plan["elements"] or "all" in plan["elements"]:
+                        extracted = extract_with_selectors(soup, rules["selectors"], rules.get("attributes"))
+                        if extracted:
+                            results["content"][content_type] = extracted
         
         # Generic extraction for elements not covered by domain rules
         if "images" in plan["elements"] and "images" not in results["content"]:
-            images = []
-            for img in soup.find_all("img"):
-                src = img.get("src", "") or img.get("data-src", "")
-                if not src:
-                    continue
+            with stage("images", domain):
+                images = []
+                for img in soup.find_all("img"):
+                    src = img.get("src", "") or img.get("data-src", "")
+                    if not src:
+                        continue
                     
-                # Resolve relative URLs
-                src = urljoin(url, src)
+                    # Resolve relative URLs
+                    src = urljoin(url, src)
                 
-                images.append({
-                    "src": src,
-                    "alt": img.get("alt", "")[:100],
-                    "width": img.get("width"),
-                    "height": img.get("height")
-                })
-            results["content"]["images"] = images
+                    images.append({
+                        "src": src,
+                        "alt": img.get("alt", "")[:100],
+                        "width": img.get("width"),
+                        "height": img.get("height")
+                    })
+                results["content"]["images"] = images
         
         if "tables" in plan["elements"] and "tables" not in results["content"]:
-            tables = []
-            for i, table in enumerate(soup.find_all("table")):
-                try:
-                    df = pd.read_html(str(table))[0]
-                    tables.append({
-                        "table_index": i,
-                        "html": str(table),
-                        "markdown": df.to_markdown(),
-                        "json": df.to_dict(orient="records")
-                    })
-                except Exception as e:
-                    logger.debug(f"Table extraction failed: {str(e)}")
-                    continue
-            results["content"]["tables"] = tables
+            with stage("tables", domain):
+                import pandas as pd
+                tables = []
+                for i, table in enumerate(soup.find_all("table")):
+                    try:
+                        df = pd.read_html(str(table))[0]
+                        tables.append({
+                            "table_index": i,
+                            "html": str(table),
+                            "markdown": df.to_markdown(),
+                            "json": df.to_dict(orient="records")
+                        })
+                    except Exception as e:
+                        logger.debug(f"Table extraction failed: {str(e)}")
+                        continue
+                results["content"]["tables"] = tables
         
         if "links" in plan["elements"] and "links" not in results["content"]:
-            links = []
-            for a in soup.find_all("a"):
-                href = a.get("href", "")
-                if not href or href.startswith(("#", "javascript:")):
-                    continue
+            with stage("links", domain):
+                links = []
+                for a in soup.find_all("a"):
+                    href = a.get("href", "")
+                    if not href or href.startswith(("#", "javascript:")):
+                        continue
                     
-                # Resolve relative URLs
-                href = urljoin(url, href)
+                    # Resolve relative URLs
+                    href = urljoin(url, href)
                 
-                links.append({
-                    "text": a.get_text(strip=True)[:200],
-                    "href": href
-                })
-            results["content"]["links"] = links
+                    links.append({
+                        "text": a.get_text(strip=True)[:200],
+                        "href": href
+                    })
+                results["content"]["links"] = links
         
         # Apply content pattern filters if specified
         if plan.get("filters", {}).get("content_patterns"):
-            filtered_content = {}
-            for content_type, content_data in results["content"].items():
-                if isinstance(content_data, list):
-                    filtered_items = []
-                    for item in content_data:
-                        if isinstance(item, str):
-                            # Check if any pattern matches
-                            for pattern in plan["filters"]["content_patterns"]:
-                                if re.search(pattern, item, re.IGNORECASE):
-                                    filtered_items.append(item)
-                                    break
-                        elif isinstance(item, dict):
-                            # Check all string values in the dict
-                            for key, value in item.items():
-                                if isinstance(value, str):
-                                    for pattern in plan["filters"]["content_patterns"]:
-                                        if re.search(pattern, value, re.IGNORECASE):
-                                            filtered_items.append(item)
-                                            break
-                                    if item in filtered_items:
+            with stage("filters", domain):
+                filtered_content = {}
+                for content_type, content_data in results["content"].items():
+                    if isinstance(content_data, list):
+                        filtered_items = []
+                        for item in content_data:
+                            if isinstance(item, str):
+                                # Check if any pattern matches
+                                for pattern in plan["filters"]["content_patterns"]:
+                                    if re.search(pattern, item, re.IGNORECASE):
+                                        filtered_items.append(item)
                                         break
-                    filtered_content[content_type] = filtered_items
-                else:
-                    filtered_content[content_type] = content_data
-            results["content"] = filtered_content
+                            elif isinstance(item, dict):
+                                # Check all string values in the dict
+                                for key, value in item.items():
+                                    if isinstance(value, str):
+                                        for pattern in plan["filters"]["content_patterns"]:
+                                            if re.search(pattern, value, re.IGNORECASE):
+                                                filtered_items.append(item)
+                                                break
+                                        if item in filtered_items:
+                                            break
+                        filtered_content[content_type] = filtered_items
+                    else:
+                        filtered_content[content_type] = content_data
+                results["content"] = filtered_content
         
         return results
         
-    except requests.exceptions.RequestException as re:
-        logger.error(f"Network error: {str(re)}")
+    except requests.exceptions.RequestException as request_error:
+        logger.error(f"Network error: {str(request_error)}")
         raise Exception("Network error occurred during scraping")
     except Exception as e:
         logger.error(f"Extraction failed: {str(e)}")
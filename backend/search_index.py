@@ -0,0 +1,286 @@
+"""
+Full-text search across stored extraction results.
+
+Every result stored under an endpoint is indexed page by page in a SQLite FTS5
+table as soon as it is stored. Each page is split into weighted columns (title,
+article text, link text, table cells, domain-rule and structured fields), so a
+query can find which crawled pages mention a product name or phone number
+without downloading the endpoints. Hits are ranked with bm25 and come back with
+a highlighted snippet. Snippets are HTML: page text is escaped and only the
+<mark> tags around matches are markup.
+
+Rows are kept until the endpoint's cache entry would expire; callers also pass
+a predicate so hits for endpoints no longer held in memory are skipped. Each
+row records the owner (a hash of the API key) that created the endpoint, so a
+search can be limited to one caller's endpoints.
+"""
+import html
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from .export import iter_pages
+
+logger = logging.getLogger("webtapi.search")
+
+# Empty string keeps the index in memory only
+SEARCH_DB = os.getenv("WEBTAPI_SEARCH_DB", ".webtapi_search.db")
+PURGE_INTERVAL = 60
+MAX_FIELD_CHARS = 200000
+
+# bm25 weight per indexed column, in table order
+COLUMNS = ("title", "article", "links", "tables", "fields")
+COLUMN_WEIGHTS = (5.0, 1.0, 0.5, 1.0, 2.0)
+
+# FTS5 brackets matches with private-use characters, swapped for <mark> after escaping
+SNIPPET_START, SNIPPET_END, SNIPPET_ELLIPSIS, SNIPPET_TOKENS = "\ue000", "\ue001", "…", 16
+SNIPPET_MARKERS = str.maketrans("", "", SNIPPET_START + SNIPPET_END)
+
+QUERY_TERM = re.compile(r'"[^"]*"\*?|\S+')
+
+
+def _strings(value, depth=0):
+    """Every string (and number) inside nested dicts and lists"""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield str(value)
+    elif depth < 8 and isinstance(value, dict):
+        for item in value.values():
+            yield from _strings(item, depth + 1)
+    elif depth < 8 and isinstance(value, list):
+        for item in value:
+            yield from _strings(item, depth + 1)
+
+
+def _join(parts):
+    # Page text may not contain the snippet markers, or it could inject <mark> tags
+    return " ".join(part for part in parts if part)[:MAX_FIELD_CHARS].translate(SNIPPET_MARKERS)
+
+
+def render_snippet(snippet):
+    """HTML-escape a raw FTS5 snippet and turn its match markers into <mark> tags"""
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(SNIPPET_START, "<mark>").replace(SNIPPET_END, "</mark>")
+
+
+def page_document(page):
+    """Split one extract_data result into the indexed columns"""
+    content = page.get("content") or {}
+    metadata = page.get("metadata") or {}
+    article = content.get("article") or {}
+    links, tables, fields = [], [], []
+    for key, value in content.items():
+        if key == "article":
+            continue
+        if key == "links" and isinstance(value, list):
+            for link in value:
+                if isinstance(link, dict):
+                    links.extend((link.get("text"), link.get("href")))
+        elif key == "images" and isinstance(value, list):
+            fields.extend(image.get("alt") for image in value if isinstance(image, dict))
+        elif key == "tables" and isinstance(value, list):
+            for table in value:
+                if isinstance(table, dict):
+                    for record in table.get("json") or []:
+                        tables.extend(_strings(record))
+        else:
+            fields.extend(_strings(value))
+    return {
+        "title": _join([article.get("title") or metadata.get("title")]),
+        "article": _join([article.get("content")]),
+        "links": _join(links),
+        "tables": _join(tables),
+        "fields": _join(fields),
+    }
+
+
+def build_match(query):
+    """
+    Turn a user query into an FTS5 expression: every term must match, each term
+    is matched literally (so "555-123-4567" or "c++" is safe), "quoted phrases"
+    stay phrases and a trailing * does a prefix match.
+    """
+    terms = []
+    for term in QUERY_TERM.findall(query or ""):
+        prefix = term.endswith("*")
+        term = term.rstrip("*")
+        if term.startswith('"') and term.endswith('"') and len(term) > 1:
+            term = term[1:-1]
+        term = term.strip()
+        if term:
+            terms.append('"' + term.replace('"', '""') + '"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+class SearchIndex:
+    """FTS5 index of stored pages, one row per page"""
+
+    def __init__(self, path=SEARCH_DB):
+        self.path = path or ":memory:"
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        if self.path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(f"""
+        CREATE TABLE IF NOT EXISTS pages (id INTEGER PRIMARY KEY, endpoint_id TEXT NOT NULL,
+                                          page_index INTEGER, page_url TEXT, depth INTEGER,
+                                          expires_at REAL, owner TEXT);
+        CREATE INDEX IF NOT EXISTS pages_endpoint ON pages (endpoint_id);
+        CREATE INDEX IF NOT EXISTS pages_expires ON pages (expires_at);
+        CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(
+            {", ".join(COLUMNS)}, tokenize='unicode61 remove_diacritics 2', prefix='2 3');
+        """)
+        # Indexes written before owners were recorded
+        if "owner" not in {row[1] for row in self.conn.execute("PRAGMA table_info(pages)")}:
+            self.conn.execute("ALTER TABLE pages ADD COLUMN owner TEXT")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS pages_owner ON pages (owner)")
+        # Column weights for the built-in rank column, so ORDER BY rank can use FTS5's fast path
+        self.conn.execute("INSERT INTO pages_fts (pages_fts, rank) VALUES ('rank', ?)",
+                          (f"bm25({', '.join(map(str, COLUMN_WEIGHTS))})",))
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        self.purge_expired()
+
+    def _delete(self, where, params):
+        self.conn.execute(f"DELETE FROM pages_fts WHERE rowid IN (SELECT id FROM pages WHERE {where})", params)
+        return self.conn.execute(f"DELETE FROM pages WHERE {where}", params).rowcount
+
+    def add(self, endpoint_id, data, ttl, owner=None):
+        """Index every page of a stored result (replacing any earlier version); returns the page count"""
+        expires_at = time.time() + ttl
+        rows = []
+        for page_index, page in enumerate(iter_pages(data)):
+            url = page.get("url") or (page.get("metadata") or {}).get("url")
+            document = page_document(page)
+            rows.append(((endpoint_id, page_index, url, page.get("depth"), expires_at, owner),
+                         tuple(document[column] for column in COLUMNS)))
+        placeholders = ", ".join("?" for _ in COLUMNS)
+        with self._lock:
+            self.conn.execute("BEGIN")
+            try:
+                self._delete("endpoint_id = ?", (endpoint_id,))
+                for page_row, document in rows:
+                    cursor = self.conn.execute(
+                        "INSERT INTO pages (endpoint_id, page_index, page_url, depth, expires_at, owner) "
+                        "VALUES (?, ?, ?, ?, ?, ?)", page_row)
+                    self.conn.execute(f"INSERT INTO pages_fts (rowid, {', '.join(COLUMNS)}) "
+                                      f"VALUES (?, {placeholders})", (cursor.lastrowid, *document))
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        if time.time() - self._last_purge > PURGE_INTERVAL:
+            self.purge_expired()
+        return len(rows)
+
+    def touch(self, endpoint_id, ttl):
+        """Extend an endpoint's rows to expire ttl seconds from now (its cache entry was renewed)"""
+        with self._lock:
+            return self.conn.execute("UPDATE pages SET expires_at = ? WHERE endpoint_id = ?",
+                                     (time.time() + ttl, endpoint_id)).rowcount
+
+    def remove(self, endpoint_id):
+        with self._lock:
+            self.conn.execute("BEGIN")
+            removed = self._delete("endpoint_id = ?", (endpoint_id,))
+            self.conn.execute("COMMIT")
+        return removed
+
+    def purge_expired(self):
+        with self._lock:
+            self._last_purge = time.time()
+            self.conn.execute("BEGIN")
+            removed = self._delete("expires_at <= ?", (self._last_purge,))
+            self.conn.execute("COMMIT")
+        if removed:
+            logger.info(f"Removed {removed} expired pages from the search index")
+        return removed
+
+    def search(self, query, limit=20, offset=0, endpoint_id=None, owner=None, accept=None, raw=False):
+        """
+        Ranked page hits for query, within one endpoint and/or one owner's endpoints
+        (neither searches everything). raw=True passes the query to FTS5 unchanged
+        (AND/OR/NOT, NEAR, column filters). accept(endpoint_id) can reject hits,
+        e.g. for endpoints that have been evicted. Returns (hits, has_more).
+        """
+        match = query if raw else build_match(query)
+        if not match:
+            return [], False
+        scope = ("AND p.endpoint_id = ? " if endpoint_id else "") + ("AND p.owner = ?" if owner else "")
+        candidates = f"""
+            SELECT pages_fts.rowid, pages_fts.rank, p.endpoint_id, p.page_index, p.page_url, p.depth
+            FROM pages_fts JOIN pages p ON p.id = pages_fts.rowid
+            WHERE pages_fts MATCH ? AND p.expires_at > ? {scope}
+            ORDER BY pages_fts.rank LIMIT ? OFFSET ?
+        """
+        params = [match, time.time()] + [value for value in (endpoint_id, owner) if value]
+        batch = max(2 * (limit + 1), 50)
+        selected = []
+        skipped = 0
+        scanned = 0
+        with self._lock:
+            try:
+                # Rank first and build snippets only for the page of hits returned
+                while len(selected) <= limit:
+                    rows = self.conn.execute(candidates, params + [batch, scanned]).fetchall()
+                    scanned += len(rows)
+                    for row in rows:
+                        if accept is not None and not accept(row[2]):
+                            continue
+                        if skipped < offset:
+                            skipped += 1
+                            continue
+                        selected.append(row)
+                        if len(selected) > limit:
+                            break
+                    if len(rows) < batch:
+                        break
+                has_more = len(selected) > limit
+                selected = selected[:limit]
+                snippets = {}
+                if selected:
+                    snippets = {row[0]: row[1:] for row in self.conn.execute(
+                        f"SELECT rowid, title, snippet(pages_fts, -1, ?, ?, ?, ?) FROM pages_fts "
+                        f"WHERE pages_fts MATCH ? AND rowid IN ({', '.join('?' for _ in selected)})",
+                        [SNIPPET_START, SNIPPET_END, SNIPPET_ELLIPSIS, SNIPPET_TOKENS, match,
+                         *(row[0] for row in selected)])}
+            except sqlite3.OperationalError as e:
+                raise ValueError(f"Invalid search query: {e}")
+        hits = []
+        for rowid, rank, hit_endpoint, page_index, page_url, depth in selected:
+            title, snippet = snippets.get(rowid, (None, None))
+            hits.append({
+                "endpoint_id": hit_endpoint,
+                "api_endpoint": f"/api/{hit_endpoint}",
+                "page_index": page_index,
+                "page_url": page_url,
+                "depth": depth,
+                "title": title or None,
+                "snippet": render_snippet(snippet),
+                # bm25 ranks lower-is-better; flip it so higher scores rank first
+                "score": round(-rank, 4),
+            })
+        return hits, has_more
+
+    def stats(self):
+        with self._lock:
+            pages, endpoints = self.conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT endpoint_id) FROM pages").fetchone()
+        return {"pages": pages, "endpoints": endpoints}
+
+
+_search_index = None
+_search_index_lock = threading.Lock()
+
+
+def get_search_index():
+    """The shared index, opened on first use so importing this module creates no files"""
+    global _search_index
+    if _search_index is None:
+        with _search_index_lock:
+            if _search_index is None:
+                _search_index = SearchIndex(SEARCH_DB)
+    return _search_index
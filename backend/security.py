@@ -1,12 +1,54 @@
 import re
 import subprocess
+import threading
 from urllib.parse import urlparse
 import logging
+from .metrics import stage
 
 logger = logging.getLogger("webtapi.security")
 
 def validate_url(url: str) -> bool:
     """Perform security checks on target URL"""
+    with stage("validate_url", urlparse(url).netloc if isinstance(url, str) else ""):
+        return _validate_url(url)
+
+class HostScans:
+    """
+    Validate URLs from many threads, running the gobuster scan only once per host
+    (against the first URL checked for it); other threads wait for that result.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._host_locks = {}
+        self._results = {}
+
+    def allowed(self, url):
+        if not _check_url(url):
+            return False
+        host = urlparse(url).netloc
+        with self._lock:
+            host_lock = self._host_locks.setdefault(host, threading.Lock())
+        with host_lock:
+            if host not in self._results:
+                with stage("validate_url", host):
+                    self._results[host] = _scan_url(url)
+            return self._results[host]
+
+def validate_urls(urls):
+    """Validate many URLs one after another, scanning each host once; returns {url: bool}"""
+    scans = HostScans()
+    return {url: scans.allowed(url) for url in dict.fromkeys(urls)}
+
+def precheck_url(url: str) -> bool:
+    """The checks of validate_url that need no network access"""
+    return _check_url(url)
+
+def _validate_url(url: str) -> bool:
+    return _check_url(url) and _scan_url(url)
+
+def _check_url(url: str) -> bool:
+    """Scheme, private network and attack-pattern checks; no I/O"""
     try:
         # Basic URL validation
         if not re.match(r"^https?://", url):
@@ -27,21 +69,28 @@ def validate_url(url: str) -> bool:
         if any(char in url for char in ["'", "\"", "<", ">", "\\", ".."]):
             return False
         
-        # Run security scans (if tools available)
-        try:
-            # Check for disallowed paths
+        return True
+        
+    except Exception as e:
+        logger.error(f"Security validation error: {str(e)}")
+        return False
+
+def _scan_url(url: str) -> bool:
+    """Run security scans (if tools available)"""
+    try:
+        # Check for disallowed paths
+        with stage("gobuster", urlparse(url).netloc):
             gobuster = subprocess.run(
                 ["gobuster", "dir", "-u", url, "-w", "common.txt", "-t", "5", "-r"],
                 capture_output=True,
                 timeout=10
             )
-            if b"403" in gobuster.stdout or b"401" in gobuster.stdout:
-                return False
-        except (subprocess.TimeoutExpired, FileNotFoundError):
-            pass  # Fail open if tools not available
-        
-        return True
-        
+        if b"403" in gobuster.stdout or b"401" in gobuster.stdout:
+            return False
+    except (subprocess.TimeoutExpired, FileNotFoundError):
+        pass  # Fail open if tools not available
     except Exception as e:
         logger.error(f"Security validation error: {str(e)}")
-        return False
\ No newline at end of file
+        return False
+    
+    return True
\ No newline at end of file
@@ -0,0 +1,211 @@
+"""
+Fast path for pages that describe themselves with schema.org JSON-LD,
+OpenGraph meta tags or microdata. Only <script> blocks, <meta> tags and
+itemprop attributes are scanned, so no DOM is built.
+"""
+import html as html_lib
+import json
+import logging
+import re
+
+logger = logging.getLogger("webtapi.structured_data")
+
+JSON_LD_PATTERN = re.compile(
+    r"<script[^>]+type\s*=\s*[\"']application/ld\+json[\"'][^>]*>(.*?)</script>",
+    re.IGNORECASE | re.DOTALL
+)
+META_PATTERN = re.compile(r"<meta\s[^>]*>", re.IGNORECASE)
+ITEMPROP_PATTERN = re.compile(r"<[a-z][^>]*\sitemprop\s*=[^>]*>", re.IGNORECASE)
+ATTR_PATTERN = re.compile(r"([a-zA-Z_:-]+)\s*=\s*(?:\"([^\"]*)\"|'([^']*)'|([^\s>]+))")
+HEAD_END_PATTERN = re.compile(r"</head\s*>", re.IGNORECASE)
+
+PRODUCT_TYPES = {"Product", "ProductGroup", "IndividualProduct"}
+ARTICLE_TYPES = {"Article", "NewsArticle", "BlogPosting", "Report", "ScholarlyArticle", "TechArticle"}
+CONTACT_TYPES = {"Organization", "LocalBusiness", "Corporation", "Person", "Store", "Restaurant",
+                 "ContactPoint", "PostalAddress"}
+
+# Plan elements each intent's record can answer without the DOM
+STRUCTURED_ELEMENTS = {
+    "product": {"text"},
+    "news": {"text", "links"},
+    "contact": {"text", "links"},
+}
+STRUCTURED_INTENTS = set(STRUCTURED_ELEMENTS)
+
+
+def _attributes(tag):
+    attrs = {}
+    for name, double_quoted, single_quoted, bare in ATTR_PATTERN.findall(tag):
+        attrs[name.lower()] = html_lib.unescape(double_quoted or single_quoted or bare)
+    return attrs
+
+
+def _flatten_json_ld(node, items):
+    """Collect every typed object from a JSON-LD document, including @graph members"""
+    if isinstance(node, list):
+        for child in node:
+            _flatten_json_ld(child, items)
+    elif isinstance(node, dict):
+        if "@type" in node:
+            items.append(node)
+        for key in ("@graph", "mainEntity", "itemListElement"):
+            if key in node:
+                _flatten_json_ld(node[key], items)
+
+
+def _types(item):
+    types = item.get("@type", [])
+    if not isinstance(types, list):
+        types = [types]
+    # Malformed pages put objects or numbers in @type
+    return {value for value in types if isinstance(value, str)}
+
+
+def extract_structured_data(html):
+    """Return JSON-LD items, OpenGraph/meta properties and microdata properties"""
+    json_ld = []
+    for block in JSON_LD_PATTERN.findall(html):
+        try:
+            _flatten_json_ld(json.loads(block.strip()), json_ld)
+        except ValueError as e:
+            logger.debug(f"Skipping invalid JSON-LD block: {str(e)}")
+
+    head_end = HEAD_END_PATTERN.search(html)
+    head = html[:head_end.start()] if head_end else html
+    meta = {}
+    for tag in META_PATTERN.findall(head):
+        attrs = _attributes(tag)
+        key = attrs.get("property") or attrs.get("name") or attrs.get("itemprop")
+        if key and "content" in attrs:
+            meta.setdefault(key.lower(), attrs["content"])
+
+    microdata = {}
+    for tag in ITEMPROP_PATTERN.findall(html):
+        attrs = _attributes(tag)
+        # The pattern also matches " itemprop=" inside another attribute's value
+        name = attrs.get("itemprop")
+        value = attrs.get("content") or attrs.get("datetime")
+        if name and value:
+            microdata.setdefault(name, value)
+
+    return {"json_ld": json_ld, "meta": meta, "microdata": microdata}
+
+
+def find_items(structured, types):
+    """Return JSON-LD items whose @type is one of types"""
+    return [item for item in structured["json_ld"] if _types(item) & types]
+
+
+def _text(value):
+    """Reduce JSON-LD values such as {"@type": "Brand", "name": ...} to plain text"""
+    if isinstance(value, dict):
+        return value.get("name") or value.get("@id") or value.get("url")
+    if isinstance(value, list):
+        return _text(value[0]) if value else None
+    return value
+
+
+def _first_offer(offers):
+    if isinstance(offers, list):
+        offers = offers[0] if offers else {}
+    if isinstance(offers, dict) and "price" not in offers and "lowPrice" in offers:
+        offers = dict(offers, price=offers["lowPrice"])
+    return offers if isinstance(offers, dict) else {}
+
+
+def product_record(structured):
+    items = find_items(structured, PRODUCT_TYPES)
+    meta, microdata = structured["meta"], structured["microdata"]
+    product = items[0] if items else {}
+    offer = _first_offer(product.get("offers", {}))
+    record = {
+        "type": "Product",
+        "name": _text(product.get("name")) or meta.get("og:title") or microdata.get("name"),
+        "description": _text(product.get("description")) or meta.get("og:description"),
+        "brand": _text(product.get("brand")),
+        "sku": _text(product.get("sku")),
+        "image": _text(product.get("image")) or meta.get("og:image"),
+        "price": offer.get("price") or meta.get("product:price:amount") or meta.get("og:price:amount")
+                 or microdata.get("price"),
+        "currency": offer.get("priceCurrency") or meta.get("product:price:currency")
+                    or meta.get("og:price:currency") or microdata.get("priceCurrency"),
+        "availability": _text(offer.get("availability")) or microdata.get("availability"),
+    }
+    satisfied = bool(record["name"] and record["price"])
+    return record, satisfied
+
+
+def article_record(structured):
+    items = find_items(structured, ARTICLE_TYPES)
+    meta = structured["meta"]
+    article = items[0] if items else {}
+    record = {
+        "type": "Article",
+        "headline": _text(article.get("headline")) or meta.get("og:title"),
+        "description": _text(article.get("description")) or meta.get("og:description"),
+        "author": _text(article.get("author")) or meta.get("author") or meta.get("article:author"),
+        "date_published": article.get("datePublished") or meta.get("article:published_time"),
+        "body": article.get("articleBody"),
+        "url": _text(article.get("url")) or meta.get("og:url"),
+    }
+    satisfied = bool(record["headline"] and record["body"])
+    return record, satisfied
+
+
+def contact_record(structured):
+    items = find_items(structured, CONTACT_TYPES)
+    record = {"type": "Contact", "name": None, "telephone": [], "email": [], "address": None}
+    for item in items:
+        points = item.get("contactPoint", [])
+        for entry in [item] + (points if isinstance(points, list) else [points]):
+            if not isinstance(entry, dict):
+                continue
+            for field in ("telephone", "email"):
+                value = entry.get(field)
+                if value and value not in record[field]:
+                    record[field].append(value)
+        record["name"] = record["name"] or _text(item.get("name"))
+        address = item.get("address")
+        if address and not record["address"]:
+            if isinstance(address, dict):
+                parts = [address.get(k) for k in ("streetAddress", "addressLocality", "addressRegion",
+                                                   "postalCode", "addressCountry")]
+                address = ", ".join(str(_text(p)) for p in parts if p)
+            record["address"] = address
+    satisfied = bool(record["telephone"] or record["email"])
+    return record, satisfied
+
+
+RECORD_BUILDERS = {
+    "product": product_record,
+    "news": article_record,
+    "contact": contact_record,
+}
+
+
+def structured_links(record):
+    """Links a record stands for: the article itself, or tel:/mailto: links for a contact"""
+    if record["type"] == "Article":
+        return [{"text": record["headline"], "href": record["url"]}] if record.get("url") else []
+    if record["type"] == "Contact":
+        return ([{"text": phone, "href": f"tel:{phone}"} for phone in record["telephone"]]
+                + [{"text": email, "href": f"mailto:{email}"} for email in record["email"]])
+    return []
+
+
+def resolve_for_plan(structured, plan):
+    """
+    Build the record for the plan's intent. Returns (record, satisfied), where
+    satisfied means the record alone answers every element the plan asks for.
+    """
+    builder = RECORD_BUILDERS.get(plan.get("intent"))
+    if builder is None:
+        return None, False
+    record, has_fields = builder(structured)
+    if not any(value for key, value in record.items() if key != "type"):
+        return None, False
+    # Images and tables (and links outside news and contact pages) still need the DOM
+    satisfied = has_fields and set(plan["elements"]) <= STRUCTURED_ELEMENTS[plan["intent"]]
+    if satisfied and "links" in plan["elements"]:
+        satisfied = bool(structured_links(record))
+    return record, satisfied
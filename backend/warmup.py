@@ -0,0 +1,143 @@
+"""
+Cold-start tooling.
+
+Heavy dependencies (bs4, pandas, trafilatura, htmldate, transformers) are
+imported where they are first used, so importing the API stays cheap. A new
+worker then calls start_warm_up(), which loads them on a background thread
+while the worker is already accepting traffic.
+
+check_import_budget() imports a module in a fresh interpreter and reports the
+import time and any lazy dependency that was pulled in eagerly; run it in CI:
+
+    python -m backend.warmup --budget 0.8
+    python -m backend.warmup --warm --models   # time a full warm-up
+"""
+import argparse
+import logging
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+
+logger = logging.getLogger("webtapi.warmup")
+
+IMPORT_BUDGET = float(os.getenv("WEBTAPI_IMPORT_BUDGET", "0.8"))
+
+# Must not be imported as a side effect of importing the API
+LAZY_MODULES = ("bs4", "pandas", "trafilatura", "htmldate", "transformers", "torch")
+
+WARM_UP_HTML = (
+    "<html><head><title>Warm-up</title></head><body><article><h1>Warm-up</h1>"
+    "<p>Warm-up paragraph for the parser and the article extractor.</p>"
+    "<table><tr><th>a</th></tr><tr><td>1</td></tr></table></article></body></html>"
+)
+
+IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure_import(module="backend.main"):
+    """
+    Import module in a fresh interpreter with -X importtime.
+    Returns {"seconds", "slowest": [(name, seconds)], "eager_lazy_modules": [...]}.
+    """
+    code = (
+        f"import {module}, sys; "
+        f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True, cwd=os.getcwd())
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    # Lines are printed after their children: one leading space per top-level
+    # import, three for its direct children
+    children = []
+    pending = []
+    total = None
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        if indent == 3:
+            pending.append((name, round(cumulative / 1e6, 3)))
+        elif indent == 1:
+            if name == module:
+                total = cumulative / 1e6
+                children = pending
+            pending = []
+    children.sort(key=lambda item: item[1], reverse=True)
+    eager = [name for name in result.stdout.strip().split(",") if name]
+    return {
+        "seconds": round(total if total is not None else wall, 3),
+        "slowest": children[:10],
+        "eager_lazy_modules": eager,
+    }
+
+
+def check_import_budget(module="backend.main", budget=IMPORT_BUDGET):
+    """Return (ok, report) for importing module within budget seconds with no eager lazy modules"""
+    report = measure_import(module)
+    ok = report["seconds"] <= budget and not report["eager_lazy_modules"]
+    return ok, report
+
+
+def warm_up(models=False):
+    """Load the lazily imported dependencies and exercise the extraction path once"""
+    started = time.perf_counter()
+    from .fetcher import get_client
+    from .scraper import extract_article_content, make_soup
+    from .dates import resolve_publication_date
+
+    get_client()
+    soup = make_soup(WARM_UP_HTML)
+    extract_article_content(WARM_UP_HTML, "https://example.com/warm-up", soup=soup, mode="precise")
+    resolve_publication_date(WARM_UP_HTML, {}, soup=soup)
+    import pandas  # noqa: F401 - table extraction
+    if models:
+        from .ai_enhancer import ai_enhancer
+        ai_enhancer.init_models()
+    elapsed = time.perf_counter() - started
+    logger.info(f"Warm-up finished in {elapsed:.2f}s")
+    return elapsed
+
+
+def start_warm_up(models=False):
+    """Run warm_up on a daemon thread so the caller can start serving immediately"""
+    def run():
+        try:
+            warm_up(models)
+        except Exception as e:
+            logger.warning(f"Warm-up failed: {str(e)}")
+
+    thread = threading.Thread(target=run, name="webtapi-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check import time and warm-up cost")
+    parser.add_argument("--module", default="backend.main")
+    parser.add_argument("--budget", type=float, default=IMPORT_BUDGET, help="Seconds allowed for the import")
+    parser.add_argument("--warm", action="store_true", help="Also time a warm-up in this process")
+    parser.add_argument("--models", action="store_true", help="Include AI models in the warm-up")
+    args = parser.parse_args()
+
+    ok, report = check_import_budget(args.module, args.budget)
+    print(f"import {args.module}: {report['seconds']:.3f}s (budget {args.budget:.3f}s)")
+    for name, seconds in report["slowest"]:
+        print(f"  {name:<40} {seconds:.3f}s")
+    if report["eager_lazy_modules"]:
+        print(f"imported eagerly but should be lazy: {', '.join(report['eager_lazy_modules'])}")
+    if args.warm:
+        logging.basicConfig(level=logging.WARNING)
+        print(f"warm-up: {warm_up(args.models):.3f}s")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark corpus: saved pages from benchmarks/fixtures plus generated
+link-heavy and huge pages, with expectations used to score extraction quality
+"""
+import os
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# Sentences that a good article extractor keeps and boilerplate it should drop
+ARTICLE_EXPECTATIONS = {
+    "article": {
+        "must_contain": [
+            "voted seven to two on Tuesday night",
+            "forty acres for public green space",
+            "Construction of the trail is expected to begin next spring",
+            "public information session will be held",
+        ],
+        "must_not_contain": [
+            "Subscribe today",
+            "Advertisement",
+            "Copyright 2024",
+            "Comment from reader",
+        ],
+    },
+}
+
+# Query used for each page when benchmarking extract_data
+PAGE_QUERIES = {
+    "article": "latest news article",
+    "product": "product price",
+    "tables": "statistics table",
+    "links": "news article",
+    "huge": "news article",
+}
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, f"{name}.html"), encoding="utf-8") as f:
+        return f.read()
+
+
+def generate_link_page(links=5000):
+    """A navigation-style page with many same-site and external links"""
+    items = []
+    for i in range(links):
+        href = f"https://other{i % 7}.example.org/out/{i}" if i % 10 == 0 else f"/section/{i % 50}/item-{i}?ref=nav"
+        items.append(f'<li class="item"><a href="{href}" title="Item {i}">Item number {i} in the directory</a></li>')
+    return (
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>Directory</title></head><body>"
+        "<h1>Directory</h1><p>Every item in the directory, grouped by section.</p>"
+        f"<ul>{''.join(items)}</ul></body></html>"
+    )
+
+
+def generate_huge_page(paragraphs=4000, tables=20):
+    """A multi-megabyte article page with a deep, wide DOM"""
+    article = load_fixture("article")
+    body = []
+    for i in range(paragraphs):
+        body.append(
+            f"<div class=\"block-{i % 13}\"><p>Paragraph {i} of an extremely long report. "
+            "It repeats enough ordinary prose to make parsing and text extraction do real work, "
+            f"with a <a href=\"/ref/{i}\">reference link</a> and <b>inline markup</b>.</p></div>"
+        )
+    for t in range(tables):
+        rows = "".join(f"<tr><td>{t}-{r}</td><td>{r * 3}</td><td>{r * 7 % 11}</td></tr>" for r in range(50))
+        body.append(f"<table><tr><th>id</th><th>a</th><th>b</th></tr>{rows}</table>")
+    return article.replace("</article>", "".join(body) + "</article>")
+
+
+def load_corpus():
+    """Return {name: html} for every benchmark page"""
+    return {
+        "article": load_fixture("article"),
+        "product": load_fixture("product"),
+        "tables": load_fixture("tables"),
+        "links": generate_link_page(),
+        "huge": generate_huge_page(),
+    }
+
+
+def article_quality(text, expectations):
+    """Return (recall, precision) of expected sentences vs boilerplate in extracted text"""
+    text = text or ""
+    kept = sum(1 for sentence in expectations["must_contain"] if sentence in text)
+    leaked = sum(1 for sentence in expectations["must_not_contain"] if sentence in text)
+    recall = kept / len(expectations["must_contain"])
+    precision = kept / (kept + leaked) if kept + leaked else 0.0
+    return recall, precision
@@ -0,0 +1,312 @@
+"""
+Offline benchmark scenarios. Everything runs against the local fixture
+server, so no network access is needed.
+
+    python -m benchmarks.run                      # all scenarios
+    python -m benchmarks.run stages modes         # selected scenarios
+    python -m benchmarks.run crawl --pages 100 --latency 0.02 --json out.json
+    python -m benchmarks.run replay --archive pages.warc.gz   # re-extract a recorded archive
+"""
+import argparse
+import json
+import logging
+import resource
+import socket
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from bs4 import BeautifulSoup
+from .fixtures import ARTICLE_EXPECTATIONS, PAGE_QUERIES, article_quality, load_corpus
+from .site_server import SiteConfig, start_site_server
+from backend.ai_interpreter import parse_query
+from backend.archive import WarcArchive, replay_extract
+from backend.crawler import WebsiteCrawler, extract_link_anchors
+from backend.dates import resolve_publication_date
+from backend.decoding import detect_encoding
+from backend.fetcher import set_fetch_mode
+from backend.scraper import EXTRACTION_MODES, extract_article_content, extract_data
+from backend.structured_data import extract_structured_data
+
+SCENARIOS = ["stages", "extract", "modes", "crawl", "replay", "api"]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize(durations):
+    """Latency summary in milliseconds for a list of durations in seconds"""
+    total = sum(durations)
+    return {
+        "count": len(durations),
+        "p50_ms": round(percentile(durations, 50) * 1000, 3),
+        "p99_ms": round(percentile(durations, 99) * 1000, 3),
+        "mean_ms": round(statistics.mean(durations) * 1000, 3) if durations else 0.0,
+        "per_sec": round(len(durations) / total, 2) if total else 0.0,
+    }
+
+
+def peak_rss_mb():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return round(usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024, 1)
+
+
+def timed(func, repeat):
+    durations = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        durations.append(time.perf_counter() - start)
+    return durations, result
+
+
+def bench_stages(corpus, args):
+    """Time each parse stage of extract_data separately on every corpus page"""
+    report = {}
+    for name, html in corpus.items():
+        raw = html.encode("utf-8")
+        soup = BeautifulSoup(html, "lxml")
+        stages = {
+            "decode": lambda: detect_encoding(raw, {}),
+            "soup": lambda: BeautifulSoup(html, "lxml"),
+            "structured_data": lambda: extract_structured_data(html),
+            "date": lambda: resolve_publication_date(html, {}, soup=soup),
+            "article_precise": lambda: extract_article_content(html, "http://bench.local/", soup=soup),
+            "links": lambda: extract_link_anchors("http://bench.local/", html),
+        }
+        if "<table" in html:
+            stages["tables"] = lambda: bench_tables(soup)
+        report[name] = {stage: summarize(timed(func, args.repeat)[0]) for stage, func in stages.items()}
+    return report
+
+
+def bench_tables(soup):
+    """Same work as the table step of extract_data"""
+    import pandas as pd
+    for table in soup.find_all("table"):
+        try:
+            df = pd.read_html(str(table))[0]
+            df.to_markdown()
+            df.to_dict(orient="records")
+        except Exception:
+            continue
+
+
+def bench_extract(base_url, corpus, args):
+    """Full extract_data calls, fetch included, for every corpus page"""
+    report = {}
+    for name in corpus:
+        plan = parse_query(PAGE_QUERIES[name])
+        url = f"{base_url}/fixture/{name}"
+        durations, result = timed(lambda: extract_data(url, plan), args.repeat)
+        report[name] = summarize(durations)
+        report[name]["extraction_tier"] = result["metadata"].get("extraction_tier")
+    return report
+
+
+def bench_modes(corpus, args):
+    """Latency and quality of each article extraction mode"""
+    report = {}
+    for name in ("article", "huge"):
+        html = corpus[name]
+        report[name] = {}
+        for mode in EXTRACTION_MODES:
+            def run():
+                return extract_article_content(html, "http://bench.local/", mode=mode)
+            durations, result = timed(run, args.repeat)
+            entry = summarize(durations)
+            if name in ARTICLE_EXPECTATIONS:
+                recall, precision = article_quality(result["content"], ARTICLE_EXPECTATIONS[name])
+                entry["recall"] = round(recall, 2)
+                entry["precision"] = round(precision, 2)
+            report[name][mode] = entry
+    return report
+
+
+def bench_crawl(base_url, args):
+    """Crawl the generated site graph with each strategy"""
+    report = {}
+    plan = parse_query("product prices")
+    for strategy in ("bfs", "best_first"):
+        crawler = WebsiteCrawler(delay=0, max_pages=args.pages, max_depth=args.depth, strategy=strategy,
+                                 extraction_mode=args.mode)
+        start = time.perf_counter()
+        pages = crawler.crawl(f"{base_url}/site/news/0", "product prices", plan)
+        elapsed = time.perf_counter() - start
+        relevant = sum(1 for page in pages if "/products/" in page["url"])
+        report[strategy] = {
+            "pages": len(pages),
+            "seconds": round(elapsed, 3),
+            "pages_per_sec": round(len(pages) / elapsed, 2) if elapsed else 0.0,
+            "relevant_pages": relevant,
+        }
+    return report
+
+
+def bench_replay(base_url, args):
+    """
+    Re-extract archived pages with no network I/O. Uses --archive when it
+    exists, otherwise records a crawl of the generated site first.
+    """
+    archive_path = args.archive
+    if not archive_path or not os.path.exists(archive_path):
+        archive_path = archive_path or os.path.join(tempfile.mkdtemp(prefix="webtapi-bench-"), "crawl.warc.gz")
+        set_fetch_mode("record", archive_path)
+        try:
+            WebsiteCrawler(delay=0, max_pages=args.pages, max_depth=args.depth,
+                           extraction_mode=args.mode).crawl(f"{base_url}/site/news/0", "product prices",
+                                                             parse_query("product prices"))
+        finally:
+            set_fetch_mode("live")
+
+    start = time.perf_counter()
+    archive = WarcArchive(archive_path)
+    index_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = list(replay_extract(archive_path, "product prices", args.mode))
+    elapsed = time.perf_counter() - start
+    return {
+        "archive": archive_path,
+        "archive_mb": round(os.path.getsize(archive_path) / 1024 / 1024, 2),
+        "pages": len(archive.urls()),
+        "errors": sum(1 for result in results if "error" in result),
+        "index_seconds": round(index_seconds, 3),
+        "extract_seconds": round(elapsed, 3),
+        "pages_per_sec": round(len(results) / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def bench_api(base_url, args):
+    """Concurrent /generate and /api/{id} calls against a local uvicorn server"""
+    import uvicorn
+    import backend.main as api
+
+    # The fixture server lives on loopback, which validate_url rejects by design
+    api.validate_url = lambda url: True
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    api_url = f"http://127.0.0.1:{port}"
+    session = requests.Session()
+
+    def generate(i):
+        name = ("article", "product", "tables")[i % 3]
+        start = time.perf_counter()
+        response = session.post(f"{api_url}/generate", json={
+            "url": f"{base_url}/fixture/{name}", "query": PAGE_QUERIES[name]
+        })
+        return time.perf_counter() - start, response
+
+    def poll(endpoint):
+        start = time.perf_counter()
+        session.get(f"{api_url}{endpoint}")
+        return time.perf_counter() - start
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        generated = list(pool.map(generate, range(args.requests)))
+    generate_wall = time.perf_counter() - wall_start
+    endpoints = [r.json()["api_endpoint"] for _, r in generated if r.status_code == 200]
+    errors = sum(1 for _, r in generated if r.status_code != 200)
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        polls = list(pool.map(poll, endpoints * 5))
+    poll_wall = time.perf_counter() - wall_start
+
+    server.should_exit = True
+    generate_report = summarize([d for d, _ in generated])
+    generate_report["throughput_per_sec"] = round(len(generated) / generate_wall, 2)
+    generate_report["errors"] = errors
+    poll_report = summarize(polls)
+    poll_report["throughput_per_sec"] = round(len(polls) / poll_wall, 2) if poll_wall else 0.0
+    return {"generate": generate_report, "get_data": poll_report}
+
+
+def print_report(report, indent=0):
+    for key, value in report.items():
+        if isinstance(value, dict) and any(isinstance(v, dict) for v in value.values()):
+            print(" " * indent + f"{key}:")
+            print_report(value, indent + 2)
+        elif isinstance(value, dict):
+            fields = "  ".join(f"{k}={v}" for k, v in value.items())
+            print(" " * indent + f"{key:<18} {fields}")
+        else:
+            print(" " * indent + f"{key}: {value}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run offline benchmarks")
+    parser.add_argument("scenarios", nargs="*", help=f"Any of: {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--pages", type=int, default=50, help="Crawl page budget")
+    parser.add_argument("--depth", type=int, default=3, help="Crawl depth")
+    parser.add_argument("--mode", choices=EXTRACTION_MODES, default="precise", help="Crawl extraction mode")
+    parser.add_argument("--site-pages", type=int, default=500)
+    parser.add_argument("--fan-out", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of server latency per page")
+    parser.add_argument("--page-kb", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=60, help="API scenario request count")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--archive", help="WARC archive for the replay scenario (recorded first if missing)")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    logging.basicConfig(level=logging.WARNING)
+    scenarios = args.scenarios or SCENARIOS
+    corpus = load_corpus()
+    config = SiteConfig(args.site_pages, args.fan_out, args.latency, args.page_kb)
+    base_url, server = start_site_server(config)
+
+    report = {}
+    for scenario in scenarios:
+        start = time.perf_counter()
+        if scenario == "stages":
+            report[scenario] = bench_stages(corpus, args)
+        elif scenario == "extract":
+            report[scenario] = bench_extract(base_url, corpus, args)
+        elif scenario == "modes":
+            report[scenario] = bench_modes(corpus, args)
+        elif scenario == "crawl":
+            report[scenario] = bench_crawl(base_url, args)
+        elif scenario == "replay":
+            report[scenario] = bench_replay(base_url, args)
+        elif scenario == "api":
+            report[scenario] = bench_api(base_url, args)
+        print(f"== {scenario} ({time.perf_counter() - start:.1f}s)")
+        print_report(report[scenario], indent=2)
+    report["peak_rss_mb"] = peak_rss_mb()
+    print(f"peak RSS: {report['peak_rss_mb']} MB")
+
+    server.shutdown()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Local HTTP stand-in for real sites: serves the fixture corpus and a generated
+site graph with configurable latency, page size and link fan-out
+"""
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .fixtures import load_corpus
+
+FILLER = (
+    "<p>Filler paragraph with ordinary prose so that pages reach the configured size "
+    "and parsers have realistic work to do on every request.</p>"
+)
+
+SECTION_NAMES = ["products", "news", "contact", "privacy", "terms", "tag", "data", "blog"]
+
+
+class SiteConfig:
+    def __init__(self, pages=200, fan_out=8, latency=0.0, page_kb=20):
+        self.pages = pages
+        self.fan_out = fan_out
+        self.latency = latency
+        self.page_kb = page_kb
+
+
+def render_site_page(config, n):
+    """Page n links to pages n*fan_out+1 .. n*fan_out+fan_out, wrapping around the graph"""
+    links = []
+    for i in range(1, config.fan_out + 1):
+        child = (n * config.fan_out + i) % config.pages
+        section = SECTION_NAMES[child % len(SECTION_NAMES)]
+        links.append(f'<li><a href="/site/{section}/{child}">{section.title()} page {child}</a></li>')
+    nav = '<a href="/site/privacy/0">Privacy policy</a> <a href="/site/terms/0">Terms</a>'
+    filler = FILLER * max(1, (config.page_kb * 1024) // len(FILLER))
+    return (
+        f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>Page {n}</title></head><body>"
+        f"<nav>{nav}</nav><article><h1>Page {n}</h1>"
+        f"<p>Article body for page {n}. Product price $ {n}.99 and contact sales{n}@example.com.</p>"
+        f"{filler}</article><ul>{''.join(links)}</ul></body></html>"
+    )
+
+
+def make_handler(config, corpus):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if config.latency:
+                time.sleep(config.latency)
+            path = self.path.split("?", 1)[0].strip("/")
+            parts = path.split("/")
+            if parts[0] == "fixture" and len(parts) == 2 and parts[1] in corpus:
+                body = corpus[parts[1]]
+            elif parts[0] == "site" and parts[-1].isdigit() and int(parts[-1]) < config.pages:
+                body = render_site_page(config, int(parts[-1]))
+            elif path == "":
+                body = render_site_page(config, 0)
+            else:
+                self.send_error(404)
+                return
+            payload = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_site_server(config=None, host="127.0.0.1", port=0):
+    """Start the server on a background thread; returns (base_url, server)"""
+    config = config or SiteConfig()
+    server = ThreadingHTTPServer((host, port), make_handler(config, load_corpus()))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://{host}:{server.server_address[1]}", server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the benchmark site graph")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--fan-out", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--page-kb", type=int, default=20)
+    args = parser.parse_args()
+    config = SiteConfig(args.pages, args.fan_out, args.latency, args.page_kb)
+    base_url, server = start_site_server(config, port=args.port)
+    print(f"Serving benchmark site at {base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
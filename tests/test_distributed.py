@@ -0,0 +1,67 @@
+import time
+
+import pytest
+
+from backend.distributed import MAX_ATTEMPTS, InMemoryFrontier, SQLiteFrontier
+
+LEASE = 0.05
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def frontier(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryFrontier(lease_seconds=LEASE)
+    return SQLiteFrontier(str(tmp_path / "frontier.db"), lease_seconds=LEASE)
+
+
+def expire():
+    time.sleep(LEASE * 2)
+
+
+def test_finished_url_drains(frontier):
+    frontier.push_new("a", "https://example.com/", 0)
+    url, depth, lease = frontier.pop(["a"])
+    assert (url, depth) == ("https://example.com/", 0)
+    assert not frontier.is_drained()
+    frontier.task_done(url, lease)
+    assert frontier.is_drained()
+
+
+def test_expired_lease_is_requeued(frontier):
+    frontier.push_new("a", "https://example.com/", 0)
+    frontier.pop(["a"])
+    assert frontier.pop(["a"]) is None
+    expire()
+    assert not frontier.is_drained()
+    assert frontier.pop(["a"])[0] == "https://example.com/"
+
+
+def test_url_dropped_after_max_attempts(frontier):
+    frontier.push_new("a", "https://example.com/", 0)
+    for _ in range(MAX_ATTEMPTS):
+        assert frontier.pop(["a"]) is not None
+        expire()
+    assert frontier.pop(["a"]) is None
+    assert frontier.is_drained()
+
+
+def test_stale_lease_cannot_complete_or_renew(frontier):
+    frontier.push_new("a", "https://example.com/", 0)
+    url, _, stale = frontier.pop(["a"])
+    expire()
+    _, _, current = frontier.pop(["a"])
+    frontier.task_done(url, stale)
+    assert not frontier.renew(url, stale)
+    assert not frontier.is_drained()
+    assert frontier.renew(url, current)
+    frontier.task_done(url, current)
+    assert frontier.is_drained()
+
+
+def test_renewed_lease_is_not_handed_out(frontier):
+    frontier.push_new("a", "https://example.com/", 0)
+    url, _, lease = frontier.pop(["a"])
+    for _ in range(4):
+        time.sleep(LEASE / 2)
+        assert frontier.renew(url, lease)
+    assert frontier.pop(["a"]) is None
@@ -0,0 +1,21 @@
+from backend.structured_data import PRODUCT_TYPES, extract_structured_data, find_items
+
+
+def test_itemprop_inside_another_attribute_is_skipped():
+    html = (
+        '<html><head></head><body>'
+        '<img data-note=" itemprop=" content="v">'
+        '<div title= itemprop=name content=x>'
+        '<span itemprop="price" content="9.99"></span>'
+        '</body></html>'
+    )
+    structured = extract_structured_data(html)
+    assert structured["microdata"] == {"price": "9.99"}
+
+
+def test_non_string_type_is_ignored():
+    html = ('<script type="application/ld+json">'
+            '[{"@type": {"name": "x"}}, {"@type": ["Product", 3], "name": "Widget"}]'
+            '</script>')
+    structured = extract_structured_data(html)
+    assert [item["name"] for item in find_items(structured, PRODUCT_TYPES)] == ["Widget"]
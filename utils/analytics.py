@@ -1,48 +1,254 @@
 """
 Analytics and usage tracking utilities
+
+track_usage only puts an event on a queue. A background thread drains the
+queue every FLUSH_INTERVAL seconds into fixed-size per-key counters (a ring of
+hourly buckets covering RETENTION_HOURS) and writes the batch to SQLite. The
+number of keys held in memory is capped; evicted keys are read back from the
+database.
 """
-from datetime import datetime, timedelta
-from collections import defaultdict
+import atexit
 import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
 
 logger = logging.getLogger("webtapi.analytics")
 
-# In-memory storage (replace with database in production)
-usage_data = defaultdict(lambda: {
-    "total_requests": 0,
-    "last_used": None,
-    "endpoints_created": 0,
-    "daily_usage": defaultdict(int)
-})
+FLUSH_INTERVAL = float(os.getenv("WEBTAPI_ANALYTICS_FLUSH_INTERVAL", "5"))
+MAX_TRACKED_KEYS = int(os.getenv("WEBTAPI_ANALYTICS_MAX_KEYS", "10000"))
+RETENTION_HOURS = int(os.getenv("WEBTAPI_ANALYTICS_RETENTION_HOURS", "168"))
+# Empty string keeps analytics in memory only
+ANALYTICS_DB = os.getenv("WEBTAPI_ANALYTICS_DB", ".webtapi_analytics.db")
+
+
+class KeyUsage:
+    """Rolling counters for one API key: totals plus a ring of hourly buckets"""
+
+    __slots__ = ("total_requests", "endpoints_created", "last_used", "counts", "hours")
+
+    def __init__(self, total_requests=0, endpoints_created=0, last_used=None):
+        self.total_requests = total_requests
+        self.endpoints_created = endpoints_created
+        self.last_used = last_used
+        self.counts = [0] * RETENTION_HOURS
+        self.hours = [-1] * RETENTION_HOURS
+
+    def add(self, timestamp, endpoint_created):
+        hour = int(timestamp // 3600)
+        slot = hour % RETENTION_HOURS
+        if self.hours[slot] != hour:
+            self.hours[slot] = hour
+            self.counts[slot] = 0
+        self.counts[slot] += 1
+        self.total_requests += 1
+        if endpoint_created:
+            self.endpoints_created += 1
+        if self.last_used is None or timestamp > self.last_used:
+            self.last_used = timestamp
+
+    def requests_since(self, hour):
+        return sum(count for slot_hour, count in zip(self.hours, self.counts) if slot_hour >= hour)
+
+    def stats(self):
+        today = int(datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp() // 3600)
+        return {
+            "total_requests": self.total_requests,
+            "endpoints_created": self.endpoints_created,
+            "last_used": datetime.fromtimestamp(self.last_used) if self.last_used else None,
+            "daily_usage": self.requests_since(today),
+            "last_24h": self.requests_since(int(time.time() // 3600) - 23),
+        }
+
+
+class UsageStore:
+    """SQLite persistence for flushed batches"""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+        CREATE TABLE IF NOT EXISTS usage (api_key TEXT PRIMARY KEY, total_requests INTEGER,
+                                          endpoints_created INTEGER, last_used REAL);
+        CREATE TABLE IF NOT EXISTS usage_hourly (api_key TEXT, hour INTEGER, count INTEGER,
+                                                 PRIMARY KEY (api_key, hour));
+        """)
+        self._lock = threading.Lock()
+
+    def write_batch(self, totals, hourly):
+        oldest = int(time.time() // 3600) - RETENTION_HOURS
+        with self._lock:
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.executemany("""
+                    INSERT INTO usage (api_key, total_requests, endpoints_created, last_used) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (api_key) DO UPDATE SET
+                        total_requests = total_requests + excluded.total_requests,
+                        endpoints_created = endpoints_created + excluded.endpoints_created,
+                        last_used = MAX(last_used, excluded.last_used)
+                """, [(key, *values) for key, values in totals.items()])
+                self.conn.executemany("""
+                    INSERT INTO usage_hourly (api_key, hour, count) VALUES (?, ?, ?)
+                    ON CONFLICT (api_key, hour) DO UPDATE SET count = count + excluded.count
+                """, [(key, hour, count) for (key, hour), count in hourly.items()])
+                self.conn.execute("DELETE FROM usage_hourly WHERE hour < ?", (oldest,))
+                self.conn.execute("COMMIT")
+            except BaseException:
+                # An open transaction would make every later batch fail (e.g. after "database is locked")
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def load(self, api_key):
+        """Rebuild a KeyUsage for a key that is no longer held in memory"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT total_requests, endpoints_created, last_used FROM usage WHERE api_key = ?", (api_key,)
+            ).fetchone()
+            if row is None:
+                return None
+            hourly = self.conn.execute(
+                "SELECT hour, count FROM usage_hourly WHERE api_key = ? AND hour > ?",
+                (api_key, int(time.time() // 3600) - RETENTION_HOURS)
+            ).fetchall()
+        usage = KeyUsage(*row)
+        for hour, count in hourly:
+            usage.hours[hour % RETENTION_HOURS] = hour
+            usage.counts[hour % RETENTION_HOURS] = count
+        return usage
+
+    def load_all(self):
+        """KeyUsage for every persisted key, as written by all worker processes"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT api_key, total_requests, endpoints_created, last_used FROM usage"
+            ).fetchall()
+            hourly = self.conn.execute(
+                "SELECT api_key, hour, count FROM usage_hourly WHERE hour > ?",
+                (int(time.time() // 3600) - RETENTION_HOURS,)
+            ).fetchall()
+        usages = {api_key: KeyUsage(*values) for api_key, *values in rows}
+        for api_key, hour, count in hourly:
+            usage = usages.get(api_key)
+            if usage is not None:
+                usage.hours[hour % RETENTION_HOURS] = hour
+                usage.counts[hour % RETENTION_HOURS] = count
+        return usages
+
+
+_events = queue.SimpleQueue()
+_usage = OrderedDict()
+_usage_lock = threading.Lock()
+_store = None
+_store_lock = threading.Lock()
+_flusher = None
+_flusher_lock = threading.Lock()
+
+
+def _get_store():
+    """Open the SQLite store on first use, so importing this module creates no files"""
+    global _store
+    if _store is None and ANALYTICS_DB:
+        with _store_lock:
+            if _store is None:
+                try:
+                    _store = UsageStore(ANALYTICS_DB)
+                except sqlite3.Error as e:
+                    logger.warning(f"Usage database {ANALYTICS_DB} unavailable: {e}")
+    return _store
+
+
+def _drain():
+    """Apply queued events to the in-memory counters and persist them as one batch"""
+    totals = {}
+    hourly = {}
+    store = _get_store()
+    with _usage_lock:
+        while True:
+            try:
+                api_key, timestamp, endpoint_created = _events.get_nowait()
+            except queue.Empty:
+                break
+            usage = _usage.get(api_key)
+            if usage is None:
+                usage = (store.load(api_key) if store else None) or KeyUsage()
+                _usage[api_key] = usage
+                if len(_usage) > MAX_TRACKED_KEYS:
+                    _usage.popitem(last=False)
+            else:
+                _usage.move_to_end(api_key)
+            usage.add(timestamp, endpoint_created)
+
+            total = totals.setdefault(api_key, [0, 0, timestamp])
+            total[0] += 1
+            total[1] += 1 if endpoint_created else 0
+            total[2] = max(total[2], timestamp)
+            hour_key = (api_key, int(timestamp // 3600))
+            hourly[hour_key] = hourly.get(hour_key, 0) + 1
+
+    if totals and store is not None:
+        try:
+            store.write_batch(totals, hourly)
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to persist usage batch: {e}")
+    if totals:
+        logger.debug(f"Flushed usage for {len(totals)} API keys")
+
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        _drain()
+
+
+def _ensure_flusher():
+    global _flusher
+    with _flusher_lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_loop, name="webtapi-analytics", daemon=True)
+            _flusher.start()
+            atexit.register(_drain)
+
 
 def track_usage(api_key, endpoint_created=False):
     """Track API usage"""
-    today = datetime.now().strftime("%Y-%m-%d")
-    
-    usage_data[api_key]["total_requests"] += 1
-    usage_data[api_key]["last_used"] = datetime.now()
-    usage_data[api_key]["daily_usage"][today] += 1
-    
-    if endpoint_created:
-        usage_data[api_key]["endpoints_created"] += 1
-    
-    logger.info(f"Usage tracked for API key: {api_key}")
+    if _flusher is None:
+        _ensure_flusher()
+    _events.put((api_key, time.time(), endpoint_created))
+
+
+def flush():
+    """Apply and persist pending usage events now"""
+    _drain()
+
 
 def get_usage_stats(api_key):
     """Get usage statistics for an API key"""
-    if api_key not in usage_data:
-        return None
-    
-    today = datetime.now().strftime("%Y-%m-%d")
-    daily_usage = usage_data[api_key]["daily_usage"].get(today, 0)
-    
-    return {
-        "total_requests": usage_data[api_key]["total_requests"],
-        "endpoints_created": usage_data[api_key]["endpoints_created"],
-        "last_used": usage_data[api_key]["last_used"],
-        "daily_usage": daily_usage
-    }
+    _drain()
+    with _usage_lock:
+        usage = _usage.get(api_key)
+        if usage is not None:
+            return usage.stats()
+    store = _get_store()
+    usage = store.load(api_key) if store else None
+    return usage.stats() if usage else None
+
 
 def get_all_usage_stats():
-    """Get usage statistics for all API keys"""
-    return dict(usage_data)
\ No newline at end of file
+    """
+    Get usage statistics for every API key. Read from the database, which holds
+    every worker's flushed usage; without one, only this worker's in-memory keys.
+    """
+    _drain()
+    store = _get_store()
+    if store is not None:
+        try:
+            return {api_key: usage.stats() for api_key, usage in store.load_all().items()}
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to read usage totals, reporting this worker only: {e}")
+    with _usage_lock:
+        return {api_key: usage.stats() for api_key, usage in _usage.items()}